@@ -0,0 +1,79 @@
+"""Check that the calls hot-path and search queries are planned with the indexes from migrations 0003 and 0006.
+
+Run from backend/ against a migrated database:  python -m benchmarks.explain_indexes
+Sequential scans are disabled for the session so the result doesn't depend on table size.
+"""
+import asyncio
+import json
+import sys
+
+from sqlalchemy import text
+
+from database import dispose_engine, get_engine
+
+QUERIES = [
+    (
+        "webhook lookup by retell_call_id",
+        "SELECT * FROM calls WHERE retell_call_id = 'call_explain_check'",
+        "ix_calls_retell_call_id",
+    ),
+    (
+        "call listing first page",
+        "SELECT id, created_at FROM calls ORDER BY created_at DESC, id DESC LIMIT 51",
+        "ix_calls_created_at_id",
+    ),
+    (
+        "call listing next page",
+        "SELECT id, created_at FROM calls WHERE (created_at, id) < (now(), '00000000-0000-0000-0000-000000000000') "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        "ix_calls_created_at_id",
+    ),
+    (
+        "call listing filtered by status",
+        "SELECT id, created_at FROM calls WHERE status = 'completed' ORDER BY created_at DESC LIMIT 51",
+        "ix_calls_status_created_at",
+    ),
+    (
+        "calls for one configuration",
+        # A literal, not gen_random_uuid(): a volatile call is evaluated per row and can't drive an index scan
+        "SELECT id FROM calls WHERE agent_config_id = '00000000-0000-0000-0000-000000000000'",
+        "ix_calls_agent_config_id",
+    ),
+    (
+        "transcript search",
+        "SELECT call_id FROM call_utterances WHERE search_vector @@ websearch_to_tsquery('english', 'I-40 blowout')",
+        "ix_call_utterances_search_vector",
+    ),
+    (
+        "search filtered by call outcome",
+        "SELECT id FROM calls WHERE (structured_data ->> 'call_outcome') = 'Emergency Detected'",
+        "ix_calls_sd_call_outcome",
+    ),
+]
+
+
+def index_names(plan: dict) -> set:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+async def main() -> int:
+    failures = 0
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+        for label, query, expected in QUERIES:
+            raw = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"))).scalar()
+            plan = (raw if isinstance(raw, list) else json.loads(raw))[0]["Plan"]
+            used = index_names(plan)
+            ok = expected in used
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {label}: expected {expected}, plan uses {sorted(used) or 'no index'}")
+        await conn.rollback()
+    await dispose_engine()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,260 @@
+"""Local stand-ins for the Retell and OpenAI APIs (including the Batch API) and Redis, used by the load test.
+
+Both are plain FastAPI apps that answer with the fields the backend reads, after an injected
+latency of `latency_ms` +/- `jitter_ms`. They keep their state in memory so the load test,
+running in the same process, can look up the Retell call behind each triggered call.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, Response
+
+
+async def _delay(latency_ms: float, jitter_ms: float):
+    delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+    if delay:
+        await asyncio.sleep(delay)
+
+
+def fake_transcript_object(turns: int = 12) -> list:
+    lines = [
+        ("agent", "Hi, this is dispatch checking in on your load. What's your status?"),
+        ("user", "I'm driving on I-10 near exit 42, should arrive tomorrow at 8 AM."),
+        ("agent", "Got it, you're in transit. Anything slowing you down?"),
+        ("user", "No, traffic is moving fine."),
+    ]
+    return [{"role": role, "content": content} for role, content in (lines * turns)[:turns]]
+
+
+class FakeRetell:
+    """create-retell-llm, create-agent, v2/create-web-call and v2/get-call.
+
+    Status codes queued in `fail_next` answer the next requests instead of the endpoint, one each,
+    with `retry_after` as their Retry-After header when set; `requests` records the path of every
+    request received.
+    """
+
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 10, transcript_turns: int = 12):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.transcript_turns = transcript_turns
+        # retell call_id -> create-web-call body
+        self.web_calls: Dict[str, Dict[str, Any]] = {}
+        # our call id -> retell call_id
+        self.by_our_call_id: Dict[str, str] = {}
+        self.fail_next: List[int] = []
+        self.retry_after: Optional[str] = None
+        self.requests: List[str] = []
+        self.app = self._build_app()
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def inject_failures(request: Request, call_next):
+            self.requests.append(request.url.path)
+            if self.fail_next:
+                headers = {"Retry-After": self.retry_after} if self.retry_after else None
+                return JSONResponse({"error": "injected failure"}, status_code=self.fail_next.pop(0), headers=headers)
+            return await call_next(request)
+
+        @app.post("/create-retell-llm")
+        async def create_retell_llm():
+            await _delay(self.latency_ms, self.jitter_ms)
+            return JSONResponse({"llm_id": f"llm_{uuid.uuid4().hex}"}, status_code=201)
+
+        @app.post("/create-agent")
+        async def create_agent(request: Request):
+            await _delay(self.latency_ms, self.jitter_ms)
+            body = await request.json()
+            return JSONResponse({"agent_id": f"agent_{uuid.uuid4().hex}", "voice_id": body.get("voice_id")}, status_code=201)
+
+        @app.post("/v2/create-web-call")
+        async def create_web_call(request: Request):
+            await _delay(self.latency_ms, self.jitter_ms)
+            body = await request.json()
+            call_id = f"call_{uuid.uuid4().hex}"
+            self.web_calls[call_id] = body
+            our_call_id = body.get("metadata", {}).get("our_call_id")
+            if our_call_id:
+                self.by_our_call_id[our_call_id] = call_id
+            return JSONResponse(
+                {"call_id": call_id, "access_token": uuid.uuid4().hex, "agent_id": body.get("agent_id")},
+                status_code=201
+            )
+
+        @app.get("/v2/get-call/{call_id}")
+        async def get_call(call_id: str):
+            await _delay(self.latency_ms, self.jitter_ms)
+            if call_id not in self.web_calls:
+                return JSONResponse({"error": "not found"}, status_code=404)
+            return {
+                "call_id": call_id,
+                "call_status": "ended",
+                "duration_ms": 60000,
+                "transcript_object": fake_transcript_object(self.transcript_turns),
+            }
+
+        return app
+
+
+class FakeOpenAI:
+    """POST /v1/chat/completions returning extraction JSON or a short classification string.
+
+    Also the Batch API subset the extraction batch lane uses: file upload and download, batch
+    create and retrieve. A batch completes `batch_latency_ms` after it's created; requests whose
+    custom_id is in `failing_custom_ids` come back with an error, to exercise the realtime fallback.
+    """
+
+    def __init__(self, latency_ms: float = 400, jitter_ms: float = 100, batch_latency_ms: float = 2000):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.batch_latency_ms = batch_latency_ms
+        self.requests = 0
+        self.batch_requests = 0
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.failing_custom_ids: set = set()
+        self.app = self._build_app()
+
+    @staticmethod
+    def _content(body: Dict[str, Any]) -> str:
+        system = next((m["content"] for m in body.get("messages", []) if m.get("role") == "system"), "")
+        if (body.get("response_format") or {}).get("type") != "json_object":
+            return "Breakdown" if "type of emergency" in system else "I-10, exit 42"
+        if "emergency scenario" in system:
+            return json.dumps({
+                "call_outcome": "Emergency Detected",
+                "emergency_type": "Breakdown",
+                "emergency_location": "I-10, exit 42",
+                "escalation_status": "Escalation Flagged",
+            })
+        return json.dumps({
+            "call_outcome": "In-Transit Update",
+            "driver_status": "Driving",
+            "current_location": "I-10, exit 42",
+            "eta": "Tomorrow, 8:00 AM",
+        })
+
+    def _completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4 + 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": self._content(body)},
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 40, "total_tokens": prompt_tokens + 40},
+        }
+
+    def _file(self, file_id: str, purpose: str) -> Dict[str, Any]:
+        return {
+            "id": file_id, "object": "file", "bytes": len(self.files[file_id]), "created_at": int(time.time()),
+            "filename": f"{file_id}.jsonl", "purpose": purpose, "status": "processed",
+        }
+
+    def _store(self, lines: list) -> str:
+        file_id = f"file-{uuid.uuid4().hex}"
+        self.files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        return file_id
+
+    async def _complete_batch(self, batch: Dict[str, Any]):
+        await _delay(self.batch_latency_ms, 0)
+        outputs, errors = [], []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            request = json.loads(line)
+            self.batch_requests += 1
+            if request["custom_id"] in self.failing_custom_ids:
+                errors.append({
+                    "id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "response": None,
+                    "error": {"code": "server_error", "message": "Injected failure"},
+                })
+                continue
+            outputs.append({
+                "id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "error": None,
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": self._completion(request["body"])},
+            })
+        batch["output_file_id"] = self._store(outputs)
+        if errors:
+            batch["error_file_id"] = self._store(errors)
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            await _delay(self.latency_ms, self.jitter_ms)
+            self.requests += 1
+            return self._completion(body)
+
+        @app.post("/v1/files")
+        async def upload_file(file: UploadFile = File(...), purpose: str = Form(...)):
+            file_id = f"file-{uuid.uuid4().hex}"
+            self.files[file_id] = await file.read()
+            return self._file(file_id, purpose)
+
+        @app.get("/v1/files/{file_id}/content")
+        async def file_content(file_id: str):
+            if file_id not in self.files:
+                return JSONResponse({"error": {"message": "No such file"}}, status_code=404)
+            return Response(self.files[file_id], media_type="application/octet-stream")
+
+        @app.post("/v1/batches")
+        async def create_batch(request: Request):
+            body = await request.json()
+            if body.get("input_file_id") not in self.files:
+                return JSONResponse({"error": {"message": "No such file"}}, status_code=400)
+            batch = {
+                "id": f"batch_{uuid.uuid4().hex}",
+                "object": "batch",
+                "endpoint": body["endpoint"],
+                "input_file_id": body["input_file_id"],
+                "completion_window": body["completion_window"],
+                "status": "in_progress",
+                "created_at": int(time.time()),
+                "metadata": body.get("metadata"),
+                "output_file_id": None,
+                "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            self.batches[batch["id"]] = batch
+            asyncio.create_task(self._complete_batch(batch))
+            return batch
+
+        @app.get("/v1/batches/{batch_id}")
+        async def retrieve_batch(batch_id: str):
+            if batch_id not in self.batches:
+                return JSONResponse({"error": {"message": "No such batch"}}, status_code=404)
+            return self.batches[batch_id]
+
+        return app
+
+
+class FakeRedis:
+    """In-memory subset of redis.asyncio (get/set with ex=) for running StateStore without a server."""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.expiry: Dict[str, float] = {}
+
+    async def get(self, key: str):
+        return self.values.get(key)
+
+    async def set(self, key: str, value: Any, ex: int = None):
+        self.values[key] = value
+        if ex is not None:
+            self.expiry[key] = ex
+        return True
@@ -0,0 +1,81 @@
+"""Compare KeywordMatcher with the previous per-keyword substring scans on a 40-minute transcript.
+
+Run from backend/:  python -m benchmarks.keyword_matcher_bench
+"""
+import random
+import re
+import timeit
+
+from keyword_matcher import DEFAULT_KEYWORDS, get_matcher
+
+WORDS_PER_MINUTE = 150
+CALL_MINUTES = 40
+
+FILLER = (
+    "okay so I am on the interstate heading east the truck is running fine traffic is moving "
+    "we should be there by the evening I will call dispatch when I get closer to the yard "
+    "the weather looks clear and the load is secured everything checks out on my end"
+).split()
+
+
+def build_transcript(minutes: int = CALL_MINUTES, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    lines = []
+    words_left = minutes * WORDS_PER_MINUTE
+    while words_left > 0:
+        n = rng.randint(8, 25)
+        role = rng.choice(["Agent", "User"])
+        lines.append(f"{role}: " + " ".join(rng.choice(FILLER) for _ in range(n)))
+        words_left -= n
+    # One real status keyword near the end, as in a typical check-in
+    lines.append("User: I arrived at the destination about ten minutes ago")
+    return "\n".join(lines)
+
+
+def legacy_scan(text: str) -> set:
+    """The previous detect_emergency + process_check_in logic: lowercase, then one any() per category."""
+    lower = text.lower()
+    found = set()
+    for category, words in DEFAULT_KEYWORDS.items():
+        if any(w in lower for w in words):
+            found.add(category)
+    return found
+
+
+def regex_alternation():
+    """Single word-bounded regex over all keywords, for comparison."""
+    groups = "|".join(
+        f"(?P<{name}>{'|'.join(re.escape(w) for w in words)})" for name, words in DEFAULT_KEYWORDS.items()
+    )
+    pattern = re.compile(rf"\b(?:{groups})\b", re.IGNORECASE)
+    return lambda text: {m.lastgroup for m in pattern.finditer(text)}
+
+
+def main():
+    matcher = get_matcher()
+    regex_scan = regex_alternation()
+    number = 200
+    # The second transcript contains "helpless", "issues", "helpful" and "fired", which the old substring scan
+    # flagged as emergencies
+    transcripts = {
+        "clean": build_transcript(),
+        "near-miss words": (
+            build_transcript()
+            .replace("evening", "helpless").replace("secured", "issues")
+            .replace("clear", "helpful").replace("fine", "fired")
+        ),
+    }
+
+    for label, transcript in transcripts.items():
+        print(f"{label} transcript: {len(transcript.split())} words, {len(transcript)} chars")
+        for name, scan in (
+            ("legacy substring scans", legacy_scan),
+            ("regex alternation", regex_scan),
+            ("KeywordMatcher", matcher.find_categories),
+        ):
+            per_call = timeit.timeit(lambda: scan(transcript), number=number) / number
+            print(f"  {name:<24}{per_call * 1e6:9.1f} us/call -> {sorted(scan(transcript))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Replay scripted driver turns against the /llm-websocket endpoint, the way Retell drives it.
+
+Start the backend (python main.py), then from backend/:
+
+    python -m benchmarks.llm_websocket_replay --url ws://localhost:8000/llm-websocket
+    python -m benchmarks.llm_websocket_replay --scenario emergency --our-call-id <calls.id>
+
+Each turn is sent as a response_required event carrying the transcript so far; the time to the
+first content frame and to content_complete is printed per turn. Without --our-call-id the session
+has no agent config, so fallback turns run without a system prompt.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import websockets
+
+SCENARIOS: Dict[str, List[str]] = {
+    "check_in": [
+        "Hi, yes I'm driving right now, on the I-10 near Phoenix",
+        "Should be there around 6 PM",
+        "yes",
+        "Delivery is done, I've arrived at the dock",
+    ],
+    "emergency": [
+        "I just had an accident, the truck is blocking a lane",
+        "I'm on the I-40 westbound near exit 155",
+    ],
+    "fallback": [
+        "Do you know if the receiver has a lumper fee at this facility?",
+        "Okay, and who should I call if the gate is closed when I get there?",
+    ],
+}
+
+
+async def receive_response(ws, response_id: int) -> Dict:
+    """Wait for the response to response_id; returns its text and first/complete timings."""
+    started = time.perf_counter()
+    first: Optional[float] = None
+    parts: List[str] = []
+    while True:
+        event = json.loads(await ws.recv())
+        if event.get("response_type") != "response" or event.get("response_id") != response_id:
+            continue
+        if event.get("content") and first is None:
+            first = time.perf_counter() - started
+        parts.append(event.get("content", ""))
+        if event.get("content_complete"):
+            return {
+                "content": "".join(parts),
+                "first_ms": round((first if first is not None else time.perf_counter() - started) * 1000, 2),
+                "complete_ms": round((time.perf_counter() - started) * 1000, 2),
+                "end_call": event.get("end_call", False),
+            }
+
+
+async def replay(url: str, scenario: str, our_call_id: Optional[str]) -> List[Dict]:
+    retell_call_id = f"replay_{uuid.uuid4().hex[:12]}"
+    results = []
+    async with websockets.connect(f"{url.rstrip('/')}/{retell_call_id}") as ws:
+        config = json.loads(await ws.recv())
+        assert config.get("response_type") == "config", config
+
+        metadata = {"our_call_id": our_call_id} if our_call_id else {}
+        await ws.send(json.dumps({"interaction_type": "call_details", "call": {"call_id": retell_call_id, "metadata": metadata}}))
+        begin = await receive_response(ws, 0)
+        transcript = [{"role": "agent", "content": begin["content"]}] if begin["content"] else []
+
+        for response_id, message in enumerate(SCENARIOS[scenario], start=1):
+            transcript.append({"role": "user", "content": message})
+            await ws.send(json.dumps({"interaction_type": "response_required", "response_id": response_id, "transcript": transcript}))
+            result = await receive_response(ws, response_id)
+            transcript.append({"role": "agent", "content": result["content"]})
+            results.append({"turn": response_id, "user": message, **result})
+            if result["end_call"]:
+                break
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000/llm-websocket")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--our-call-id", help="calls.id to load the agent prompt, keywords and state from")
+    args = parser.parse_args()
+
+    scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    for scenario in scenarios:
+        print(f"\n== {scenario}")
+        print(f"{'turn':>4}  {'first ms':>9}  {'done ms':>9}  reply")
+        for row in await replay(args.url, scenario, args.our_call_id):
+            reply = row["content"].replace("\n", " ")
+            print(f"{row['turn']:>4}  {row['first_ms']:>9.2f}  {row['complete_ms']:>9.2f}  {reply[:80]}{' [end_call]' if row['end_call'] else ''}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,312 @@
+"""Load test main.app against a local Postgres, with fake Retell and OpenAI servers in the same process.
+
+Run from backend/ with SUPABASE_URL pointing at a throwaway, migrated database:
+
+    python -m benchmarks.load_test --duration 60 --concurrency 20 --mix trigger=1,webhook=1,list=3,poll=4,stats=1
+    python -m benchmarks.load_test --compare benchmarks/results/before.json benchmarks/results/after.json
+
+Each virtual user picks operations by weight until the duration is up. Per-endpoint p50/p95/p99
+latency and requests/sec are printed and written to a JSON file for comparing runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_services import FakeOpenAI, FakeRetell, fake_transcript_object
+
+DEFAULT_MIX = "trigger=1,webhook=1,list=3,poll=4,stats=1"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(LoadTest.OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def serve(app, port: int):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+class LoadTest:
+    OPERATIONS = ("trigger", "webhook", "list", "poll", "stats")
+
+    def __init__(self, client: httpx.AsyncClient, retell: FakeRetell, agent_config_id: str, mix: Dict[str, float], transcript_rate: float):
+        self.client = client
+        self.retell = retell
+        self.agent_config_id = agent_config_id
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.transcript_rate = transcript_rate
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        # Calls started but not yet ended by a webhook, and every call we can poll
+        self.in_progress: List[str] = []
+        self.known_calls: List[str] = []
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.latencies[endpoint].append(time.perf_counter() - start)
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+        return response
+
+    async def trigger(self):
+        response = await self.request(
+            "POST /api/calls/trigger", "POST", "/api/calls/trigger",
+            json={"agent_config_id": self.agent_config_id, "driver_name": "Mike", "load_number": f"LT-{random.randint(1000, 9999)}"}
+        )
+        if response is not None and response.status_code == 200:
+            call_id = response.json()["call_id"]
+            self.in_progress.append(call_id)
+            self.known_calls.append(call_id)
+
+    async def webhook(self):
+        if not self.in_progress:
+            return await self.trigger()
+        our_call_id = self.in_progress.pop(random.randrange(len(self.in_progress)))
+        call = {
+            "call_id": self.retell.by_our_call_id.get(our_call_id),
+            "call_status": "ended",
+            "duration_ms": 60000,
+            "metadata": {"our_call_id": our_call_id},
+        }
+        # Without a transcript the backend fetches it from v2/get-call
+        if random.random() < self.transcript_rate:
+            call["transcript"] = "\n".join(
+                f"{ut['role'].capitalize()}: {ut['content']}" for ut in fake_transcript_object(self.retell.transcript_turns)
+            )
+        await self.request("POST /retell-webhook", "POST", "/retell-webhook", json={"event": "call_ended", "call": call})
+
+    async def list_calls(self):
+        await self.request("GET /api/calls", "GET", "/api/calls", params={"limit": 50})
+
+    async def poll(self):
+        if not self.known_calls:
+            return await self.list_calls()
+        call_id = random.choice(self.known_calls)
+        await self.request("GET /api/calls/{call_id}", "GET", f"/api/calls/{call_id}")
+
+    async def stats(self):
+        await self.request("GET /api/stats", "GET", "/api/stats")
+
+    async def user(self, deadline: float):
+        while time.perf_counter() < deadline:
+            operation = random.choices(self.operations, self.weights)[0]
+            await getattr(self, "list_calls" if operation == "list" else operation)()
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            endpoints[endpoint] = {
+                "count": len(ordered),
+                "errors": self.errors.get(endpoint, 0),
+                "rps": round(len(ordered) / elapsed, 2),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return endpoints
+
+
+def stage_summary(histogram) -> Dict[str, dict]:
+    return {
+        ",".join(key): {"count": series["count"], "mean_ms": round(series["sum"] / series["count"] * 1000, 2)}
+        for key, series in sorted(histogram.snapshot().items()) if series["count"]
+    }
+
+
+async def run(args) -> dict:
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    retell = FakeRetell(latency_ms=args.retell_latency_ms, jitter_ms=args.retell_jitter_ms, transcript_turns=args.transcript_turns)
+    openai = FakeOpenAI(latency_ms=args.openai_latency_ms, jitter_ms=args.openai_jitter_ms, batch_latency_ms=args.batch_latency_ms)
+    retell_port, openai_port, app_port = free_port(), free_port(), free_port()
+
+    # Point the backend at the fakes before main (and its client singletons) is imported
+    os.environ["RETELL_BASE_URL"] = f"http://127.0.0.1:{retell_port}"
+    os.environ["RETELL_API_KEY"] = "load-test"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{openai_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "load-test"
+    os.environ["BACKEND_URL"] = f"http://127.0.0.1:{app_port}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Submit and poll check-in batches within the run instead of after the production 15-minute wait
+    os.environ.setdefault("EXTRACTION_BATCH_MAX_WAIT", "2")
+    os.environ.setdefault("EXTRACTION_BATCH_CHECK_INTERVAL", "1")
+    os.environ.setdefault("EXTRACTION_BATCH_POLL_INTERVAL", "1")
+    import main
+    import jobs
+    import metrics
+
+    servers = [
+        await serve(retell.app, retell_port),
+        await serve(openai.app, openai_port),
+        await serve(main.app, app_port),
+    ]
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=30.0) as client:
+            response = await client.post("/api/configurations", json={
+                "name": f"load test {datetime.now(timezone.utc).isoformat(timespec='seconds')}",
+                "system_prompt": "You are a dispatcher checking in with {driver_name} about load {load_number}.",
+                "initial_message": "Hi {driver_name}, this is dispatch.",
+            })
+            response.raise_for_status()
+            test = LoadTest(client, retell, response.json()["id"], parse_mix(args.mix), args.transcript_rate)
+
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*[test.user(deadline) for _ in range(args.concurrency)])
+            elapsed = time.perf_counter() - start
+
+        # Let queued webhook and extraction jobs finish so the stage histograms include them
+        drain_deadline = time.perf_counter() + args.drain_timeout
+        while True:
+            pending = sum(n for (_, status), n in (await jobs.queue_depth()).items() if status != "dead")
+            if not pending:
+                break
+            if time.perf_counter() > drain_deadline:
+                print(f"Job queue still had {pending} jobs after {args.drain_timeout}s")
+                break
+            await asyncio.sleep(0.5)
+    finally:
+        for server, task in reversed(servers):
+            server.should_exit = True
+            await task
+
+    endpoints = test.summary(elapsed)
+    total = sum(e["count"] for e in endpoints.values())
+    return {
+        "started_at": started_at,
+        "config": {
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "transcript_rate": args.transcript_rate,
+            "transcript_turns": args.transcript_turns,
+            "retell_latency_ms": args.retell_latency_ms,
+            "retell_jitter_ms": args.retell_jitter_ms,
+            "openai_latency_ms": args.openai_latency_ms,
+            "openai_jitter_ms": args.openai_jitter_ms,
+            "batch_latency_ms": args.batch_latency_ms,
+        },
+        "total": {
+            "requests": total,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "rps": round(total / elapsed, 2),
+        },
+        "endpoints": endpoints,
+        "stages": {
+            "trigger_call": stage_summary(metrics.trigger_call_stage_seconds),
+            "webhook": stage_summary(metrics.webhook_stage_seconds),
+            "jobs": stage_summary(metrics.job_seconds),
+            "extraction_lag": stage_summary(metrics.extraction_lag_seconds),
+        },
+        "openai_requests": openai.requests,
+        "openai_batch_requests": openai.batch_requests,
+    }
+
+
+def print_report(result: dict):
+    print(f"{result['total']['requests']} requests, {result['total']['errors']} errors, {result['total']['rps']} req/s")
+    print(f"{'endpoint':<28}{'count':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, e in result["endpoints"].items():
+        print(f"{endpoint:<28}{e['count']:>7}{e['errors']:>5}{e['rps']:>9}{e['p50_ms']:>9}{e['p95_ms']:>9}{e['p99_ms']:>9}")
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def change(old: float, new: float) -> str:
+        return f"{old:>9} -> {new:<9}" + (f"({(new - old) / old * 100:+.0f}%)" if old else "")
+
+    print(f"{'endpoint':<28}{'metric':<8}before -> after")
+    for endpoint in sorted(set(before["endpoints"]) | set(after["endpoints"])):
+        old, new = before["endpoints"].get(endpoint), after["endpoints"].get(endpoint)
+        if not old or not new:
+            print(f"{endpoint:<28}only in {'after' if new else 'before'}")
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            print(f"{endpoint:<28}{metric:<8}{change(old[metric], new[metric])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--transcript-rate", type=float, default=0.5, help="share of webhooks that carry the transcript")
+    parser.add_argument("--transcript-turns", type=int, default=12)
+    parser.add_argument("--retell-latency-ms", type=float, default=50.0)
+    parser.add_argument("--retell-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--openai-latency-ms", type=float, default=400.0)
+    parser.add_argument("--openai-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--batch-latency-ms", type=float, default=2000.0, help="time for the fake Batch API to complete a batch")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="seconds to wait for queued webhook and extraction jobs")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load_test-<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_test-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Serialisation time and bytes on the wire for a 10k-call GET /api/calls response.
+
+Run from backend/:  python -m benchmarks.serialization_bench [--calls 10000] [--transcript-lines 0]
+
+Compares the previous path (jsonable_encoder + json.dumps, as FastAPI's default JSONResponse does),
+validating every row through the CallListItem response model, and handing the dicts straight to
+orjson as the endpoint now does. Sizes are reported raw, gzipped and (if brotli is installed) brotli'd
+at the levels the CompressionMiddleware uses.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from compression import COMPRESSION_BROTLI_QUALITY, COMPRESSION_GZIP_LEVEL
+from models import CallListResponse
+
+STATUSES = ["completed", "completed", "completed", "in_progress", "failed"]
+DRIVER_STATUSES = ["Driving", "Delayed", "Arrived", "Unloading"]
+CITIES = ["Phoenix, AZ", "Dallas, TX", "El Paso, TX", "Albuquerque, NM", "Tucson, AZ"]
+
+
+def build_calls(count: int, transcript_lines: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    config = {"id": uuid.uuid4(), "name": "Driver Check-in"}
+    started = datetime(2025, 1, 1, 8, 0, 0)
+    calls = []
+    for i in range(count):
+        created_at = started + timedelta(minutes=i)
+        status = rng.choice(STATUSES)
+        call = {
+            "id": uuid.uuid4(),
+            "retell_call_id": f"call_{uuid.uuid4().hex}",
+            "status": status,
+            "structured_data_status": "done" if status == "completed" else None,
+            "structured_data": {
+                "call_outcome": "In-Transit Update",
+                "driver_status": rng.choice(DRIVER_STATUSES),
+                "current_location": f"I-10 near exit {rng.randint(1, 400)}, {rng.choice(CITIES)}",
+                "eta": "Tomorrow, 8:00 AM",
+                "delay_reason": None,
+                "pod_reminder_acknowledged": rng.random() < 0.5,
+            } if status == "completed" else None,
+            "driver_name": f"Driver {i}",
+            "load_number": f"LD-{100000 + i}",
+            "created_at": created_at,
+            "updated_at": created_at + timedelta(minutes=rng.randint(2, 9)),
+            "duration_ms": rng.randint(30_000, 600_000),
+            "agent_config": config,
+        }
+        if transcript_lines:
+            call["transcript"] = "\n".join(
+                f"{'Agent' if n % 2 == 0 else 'User'}: I'm on I-10 near exit {n}, should arrive tomorrow morning."
+                for n in range(transcript_lines)
+            )
+        calls.append(call)
+    return calls
+
+
+def legacy(payload: dict) -> bytes:
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def response_model(payload: dict) -> bytes:
+    return orjson.dumps(CallListResponse(**payload).dict(exclude_unset=True))
+
+
+def direct(payload: dict) -> bytes:
+    return orjson.dumps(payload)
+
+
+def best_of(fn, arg, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10_000)
+    parser.add_argument("--transcript-lines", type=int, default=0, help="Include a transcript of this many lines per call")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = {"items": build_calls(args.calls, args.transcript_lines), "next_cursor": None}
+    print(f"{args.calls} calls, transcript lines per call: {args.transcript_lines}")
+    print(f"{'encoder':<32}{'ms':>10}{'bytes':>14}")
+    body = None
+    for name, fn in (
+        ("jsonable_encoder + json.dumps", legacy),
+        ("CallListResponse + orjson", response_model),
+        ("orjson (current endpoint)", direct),
+    ):
+        ms, body = best_of(fn, payload, args.repeat)
+        print(f"{name:<32}{ms:>10.1f}{len(body):>14,}")
+
+    print(f"\n{'compression':<32}{'ms':>10}{'bytes':>14}{'ratio':>8}")
+    codecs = [(f"gzip level {COMPRESSION_GZIP_LEVEL}", lambda data: gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL))]
+    try:
+        import brotli
+        codecs.append((f"brotli quality {COMPRESSION_BROTLI_QUALITY}", lambda data: brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)))
+    except ImportError:
+        print("(brotli not installed, skipping)")
+    for name, compress in codecs:
+        ms, compressed = best_of(compress, body, args.repeat)
+        print(f"{name:<32}{ms:>10.1f}{len(compressed):>14,}{len(body) / len(compressed):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Count database round-trips per triggered call for the previous and current trigger_call write paths.
+
+Run from backend/ against a local, migrated Postgres:  python -m benchmarks.trigger_call_roundtrips
+Retell is replaced with canned responses so only database traffic is counted. Every statement,
+BEGIN, COMMIT and ROLLBACK sent on the engine counts as one round-trip.
+"""
+import asyncio
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import delete, event, select
+
+import main
+from database import AsyncSessionLocal, dispose_engine, get_engine
+from models import AgentConfiguration, Call, CallTrigger
+
+CALLS = 50
+
+
+class RoundTripCounter:
+    def __init__(self, engine):
+        self.counts = Counter()
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._statement)
+        for name in ("begin", "commit", "rollback"):
+            event.listen(sync_engine, name, self._make_listener(name))
+
+    def _statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.counts[statement.split(None, 1)[0].upper()] += 1
+
+    def _make_listener(self, name):
+        def listener(conn):
+            self.counts[name.upper()] += 1
+        return listener
+
+    def reset(self):
+        self.counts.clear()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+async def fake_ensure_retell_agent(agent_config, db):
+    return "agent_roundtrip_bench"
+
+
+async def fake_create_web_call(db_call, agent_id):
+    return {"call_id": f"call_{uuid.uuid4().hex}", "access_token": "token"}
+
+
+async def legacy_trigger_call(call_data: CallTrigger, db):
+    """trigger_call's write path before the INSERT/UPDATE ... RETURNING rewrite (success branch)."""
+    result = await db.execute(select(AgentConfiguration).where(AgentConfiguration.id == call_data.agent_config_id))
+    agent_config = result.scalar_one_or_none()
+    db_call = Call(
+        agent_config_id=call_data.agent_config_id,
+        driver_name=call_data.driver_name,
+        load_number=call_data.load_number,
+        status="pending"
+    )
+    db.add(db_call)
+    await db.commit()
+    await db.refresh(db_call)
+    agent_id = await fake_ensure_retell_agent(agent_config, db)
+    web_call_info = await fake_create_web_call(db_call, agent_id)
+    db_call.retell_call_id = web_call_info["call_id"]
+    db_call.status = "in_progress"
+    db_call.updated_at = datetime.now()
+    await db.commit()
+    await db.refresh(db_call)
+    return {"call_id": str(db_call.id), "access_token": web_call_info["access_token"], "status": "initiated"}
+
+
+async def measure(label: str, trigger, call_data: CallTrigger, counter: RoundTripCounter):
+    totals = Counter()
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        async with AsyncSessionLocal() as db:
+            counter.reset()
+            await trigger(call_data, db)
+            totals.update(counter.counts)
+    elapsed = time.perf_counter() - start
+    per_call = {kind: count / CALLS for kind, count in sorted(totals.items())}
+    print(
+        f"{label:<10}{sum(totals.values()) / CALLS:5.1f} round-trips/call  "
+        f"{elapsed / CALLS * 1000:6.2f} ms/call  {per_call}"
+    )
+
+
+async def run():
+    main.ensure_retell_agent = fake_ensure_retell_agent
+    main.create_web_call = fake_create_web_call
+    counter = RoundTripCounter(get_engine())
+
+    async with AsyncSessionLocal() as db:
+        agent_config = AgentConfiguration(
+            name="round-trip benchmark",
+            system_prompt="Check in with {driver_name} about load {load_number}.",
+            initial_message="Hi {driver_name}",
+            voice_settings={"voice_id": "11labs-Adrian"},
+        )
+        db.add(agent_config)
+        await db.commit()
+        config_id = agent_config.id
+
+    call_data = CallTrigger(agent_config_id=str(config_id), driver_name="Mike", load_number="7891-B")
+    try:
+        await measure("before", legacy_trigger_call, call_data, counter)
+        await measure("after", main.start_call, call_data, counter)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Call).where(Call.agent_config_id == config_id))
+            await db.execute(delete(AgentConfiguration).where(AgentConfiguration.id == config_id))
+            await db.commit()
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
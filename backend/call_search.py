@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Call, CallUtterance
+
+# Inlined rather than bound: a varchar parameter doesn't resolve to the regconfig overloads
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+# ts_headline output; clients split on the markers instead of rendering it as HTML
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=\" ... \""
+STRUCTURED_FILTERS = ("call_outcome", "driver_status", "emergency_type")
+
+
+def structured_field(field: str):
+    # Spelled exactly like the ix_calls_sd_* index expressions (a bound key parameter wouldn't match them)
+    if field not in STRUCTURED_FILTERS:
+        raise ValueError(f"Unknown structured_data filter: {field}")
+    return literal_column(f"(calls.structured_data ->> '{field}')")
+
+
+def _filtered(
+    query, structured: Dict[str, str], status: Optional[str], agent_config_id: Optional[str],
+    created_from: Optional[datetime], created_to: Optional[datetime]
+):
+    for field, value in structured.items():
+        query = query.where(structured_field(field) == value)
+    if status:
+        query = query.where(Call.status == status)
+    if agent_config_id:
+        query = query.where(Call.agent_config_id == agent_config_id)
+    if created_from:
+        query = query.where(Call.created_at >= created_from)
+    if created_to:
+        query = query.where(Call.created_at < created_to)
+    return query
+
+
+async def search_calls(
+    db: AsyncSession,
+    q: Optional[str],
+    structured: Dict[str, str],
+    status: Optional[str] = None,
+    agent_config_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """Calls whose transcript matches `q` (websearch syntax), best match first, with a highlighted snippet.
+
+    Without `q` this is a filter-only search over structured_data fields, newest first.
+    """
+    columns = [
+        Call.id, Call.agent_config_id, Call.driver_name, Call.load_number, Call.status, Call.structured_data,
+        Call.created_at, Call.duration_ms
+    ]
+    if q:
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.max(func.ts_rank_cd(CallUtterance.search_vector, tsquery)).label("rank")
+        query = (
+            select(*columns, rank, func.count().label("matches"))
+            .join(CallUtterance, CallUtterance.call_id == Call.id)
+            .where(CallUtterance.search_vector.op("@@")(tsquery))
+            .group_by(Call.id)
+            .order_by(rank.desc(), Call.created_at.desc(), Call.id.desc())
+        )
+    else:
+        query = select(*columns).order_by(Call.created_at.desc(), Call.id.desc())
+    query = _filtered(query, structured, status, agent_config_id, created_from, created_to).offset(offset).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    next_offset = offset + limit if len(rows) > limit else None
+    rows = rows[:limit]
+    items: List[Dict[str, Any]] = [dict(row._mapping) for row in rows]
+
+    if q and items:
+        # Highlight only the page's calls: ts_headline re-parses the text, so it's kept off the ranking query
+        snippets = await db.execute(
+            select(
+                CallUtterance.call_id,
+                CallUtterance.seq,
+                CallUtterance.role,
+                func.ts_headline(SEARCH_CONFIG, CallUtterance.content, tsquery, HEADLINE_OPTIONS).label("text"),
+            )
+            .where(CallUtterance.call_id.in_([item["id"] for item in items]), CallUtterance.search_vector.op("@@")(tsquery))
+            .order_by(CallUtterance.call_id, func.ts_rank_cd(CallUtterance.search_vector, tsquery).desc(), CallUtterance.seq)
+            .distinct(CallUtterance.call_id)
+        )
+        by_call = {row.call_id: {"seq": row.seq, "role": row.role, "text": row.text} for row in snippets}
+        for item in items:
+            item["snippet"] = by_call.get(item["id"])
+
+    return {"items": items, "next_offset": next_offset}
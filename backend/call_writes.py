@@ -0,0 +1,43 @@
+import uuid
+from typing import Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from events import commit_call_changes
+from models import Call
+
+
+async def insert_call(db: AsyncSession, **values) -> Call:
+    """Create a call with a client-generated id in one INSERT ... RETURNING and commit it.
+
+    The returned Call carries the server defaults (created_at), so no refresh SELECT is needed.
+    """
+    values.setdefault("id", uuid.uuid4())
+    result = await db.scalars(insert(Call).values(**values).returning(Call))
+    db_call = result.one()
+    await commit_call_changes(db, db_call)
+    return db_call
+
+
+async def transition_call(db: AsyncSession, call_id, from_status: Optional[str] = None, **values) -> Optional[Call]:
+    """Apply a status transition in one UPDATE ... RETURNING and commit it; None if the call is gone.
+
+    With `from_status` the update only applies to a call in that status (None otherwise), so
+    concurrent callers can use it to claim a call.
+    """
+    query = update(Call).where(Call.id == call_id)
+    if from_status is not None:
+        query = query.where(Call.status == from_status)
+    result = await db.scalars(
+        query
+        .values(updated_at=func.now(), **values)
+        .returning(Call)
+        .execution_options(populate_existing=True)
+    )
+    db_call = result.one_or_none()
+    if db_call is None:
+        await db.commit()
+        return None
+    await commit_call_changes(db, db_call)
+    return db_call
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, update
+
+from database import AsyncSessionLocal
+from call_writes import transition_call
+from metrics import calls_in_flight
+from models import AgentConfiguration, Call
+from retell_client import RetellAPIError
+from retell_provisioning import ensure_retell_agent, create_web_call
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def is_permanent(error: Exception) -> bool:
+    """Retell rejected the request itself (a 4xx other than 429), so a retry would fail the same way."""
+    cause = error if isinstance(error, RetellAPIError) else error.__cause__
+    return isinstance(cause, RetellAPIError) and 400 <= cause.status_code < 500 and cause.status_code != 429
+
+
+class CampaignDispatcher:
+    """Starts campaign calls from a queue under a token-bucket rate limit and a concurrency cap."""
+
+    def __init__(
+        self,
+        rate_per_second: float = None,
+        burst: int = None,
+        concurrency: int = None,
+        max_retries: int = None,
+        retry_base_delay: float = None,
+        stale_dispatch_seconds: float = None,
+    ):
+        self.rate_per_second = rate_per_second or float(os.getenv("CAMPAIGN_RATE_PER_SECOND", "5"))
+        self.burst = burst or int(os.getenv("CAMPAIGN_BURST", "5"))
+        self.concurrency = concurrency or int(os.getenv("CAMPAIGN_CONCURRENCY", "10"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("CAMPAIGN_MAX_RETRIES", "3"))
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else float(os.getenv("CAMPAIGN_RETRY_BASE_DELAY", "2.0"))
+        self.stale_dispatch_seconds = stale_dispatch_seconds or float(os.getenv("CAMPAIGN_STALE_DISPATCH_SECONDS", "300"))
+        self.queue: Optional[asyncio.Queue] = None
+        self.bucket: Optional[TokenBucket] = None
+        self._attempts: Dict[str, int] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        self.queue = asyncio.Queue()
+        self.bucket = TokenBucket(self.rate_per_second, self.burst)
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+        await self._recover()
+        logger.info("Campaign dispatcher started", extra={"concurrency": self.concurrency, "rate_per_second": self.rate_per_second})
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _recover(self):
+        # Campaign calls still pending after a restart were queued in the previous process. Every process
+        # re-queues them, but only the one whose claim moves a call out of pending dials it.
+        async with AsyncSessionLocal() as db:
+            # A process that died between claiming a call and recording the result may have dialed it already,
+            # so those calls fail rather than being dialed again
+            interrupted = await db.execute(
+                update(Call)
+                .where(
+                    Call.campaign_id.isnot(None),
+                    Call.status == "dispatching",
+                    Call.updated_at < func.now() - timedelta(seconds=self.stale_dispatch_seconds),
+                )
+                .values(status="failed", transcript="Campaign dispatch interrupted", updated_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if interrupted.rowcount:
+                logger.warning("Failed campaign calls interrupted mid-dispatch", extra={"count": interrupted.rowcount})
+            result = await db.execute(
+                select(Call.id)
+                .where(Call.campaign_id.isnot(None), Call.status == "pending")
+                .order_by(Call.created_at)
+            )
+            pending = [str(call_id) for call_id in result.scalars().all()]
+        if pending:
+            logger.info("Re-queueing pending campaign calls", extra={"count": len(pending)})
+            self.submit(pending)
+
+    def submit(self, call_ids: List[str]):
+        for call_id in call_ids:
+            self.queue.put_nowait(call_id)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def _run(self, worker_id: int):
+        while True:
+            call_id = await self.queue.get()
+            try:
+                await self.bucket.acquire()
+                with calls_in_flight.track_inprogress("starting"):
+                    await self._dispatch(call_id)
+            except Exception:
+                logger.exception("Campaign dispatch failed", extra={"worker_id": worker_id, "call_id": call_id})
+            finally:
+                self.queue.task_done()
+
+    async def _dispatch(self, call_id: str):
+        db_call = await self._claim(call_id)
+        if db_call is None:
+            return
+        try:
+            agent_id = await self._agent_id(db_call)
+            # No session is open here, so a slow Retell response doesn't hold a pooled connection
+            web_call_info = await create_web_call(db_call, agent_id)
+        except Exception as e:
+            await self._retry_or_fail(call_id, e)
+            return
+
+        self._attempts.pop(call_id, None)
+        async with AsyncSessionLocal() as db:
+            await transition_call(db, db_call.id, status="in_progress", retell_call_id=web_call_info["call_id"])
+
+    async def _claim(self, call_id: str) -> Optional[Call]:
+        """Move the call from pending to dispatching; None if it's gone or another worker or process claimed it."""
+        async with AsyncSessionLocal() as db:
+            return await transition_call(db, call_id, from_status="pending", status="dispatching")
+
+    async def _agent_id(self, db_call: Call) -> str:
+        async with AsyncSessionLocal() as db:
+            agent_config = await db.get(AgentConfiguration, db_call.agent_config_id)
+            # Hand the connection back; ensure_retell_agent only needs one again to provision on a cache miss
+            await db.commit()
+            return await ensure_retell_agent(agent_config, db)
+
+    async def _retry_or_fail(self, call_id: str, error: Exception):
+        err_text = getattr(error, "detail", None) or str(error)
+        attempt = self._attempts.get(call_id, 0)
+        async with AsyncSessionLocal() as db:
+            if attempt < self.max_retries and not is_permanent(error):
+                self._attempts[call_id] = attempt + 1
+                delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                logger.warning(
+                    "Campaign call start failed, retrying",
+                    extra={"call_id": call_id, "attempt": attempt + 1, "error": err_text, "retry_in": round(delay, 2)}
+                )
+                # Released back to pending, so recovery after a restart picks it up if the retry never runs
+                await transition_call(db, call_id, from_status="dispatching", status="pending")
+                asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, call_id)
+                return
+            self._attempts.pop(call_id, None)
+            logger.warning("Campaign call start failed", extra={"call_id": call_id, "attempts": attempt + 1, "error": err_text})
+            await transition_call(db, call_id, status="failed", transcript=f"Campaign dispatch failed: {err_text}")
+
+
+campaign_dispatcher = CampaignDispatcher()
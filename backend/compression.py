@@ -0,0 +1,34 @@
+import os
+from typing import Sequence
+
+from starlette.middleware.gzip import GZipMiddleware
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Streams must reach the client as they're written, which a compressor's buffering would prevent
+UNCOMPRESSED_PATHS = ("/api/events",)
+
+
+def _compressor(app, minimum_size: int):
+    try:
+        from brotli_asgi import BrotliMiddleware
+    except ImportError:
+        return GZipMiddleware(app, minimum_size=minimum_size, compresslevel=COMPRESSION_GZIP_LEVEL)
+    # Brotli for clients that accept it, gzip for the rest
+    return BrotliMiddleware(app, quality=COMPRESSION_BROTLI_QUALITY, minimum_size=minimum_size, gzip_fallback=True)
+
+
+class CompressionMiddleware:
+    """Brotli (when brotli-asgi is installed) or gzip for responses of at least minimum_size bytes."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, exclude_paths: Sequence[str] = UNCOMPRESSED_PATHS):
+        self.app = app
+        self.compressed = _compressor(app, minimum_size)
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith(self.exclude_paths):
+            await self.compressed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
@@ -1,33 +1,112 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+import logging
 import os
-from dotenv import load_dotenv
-from models import Base
+import uuid
+from typing import Optional
 
-load_dotenv()
+import settings  # noqa: F401 - loads .env
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("SUPABASE_URL")
 if not DATABASE_URL or not DATABASE_URL.startswith("postgresql://"):
     raise ValueError("Invalid SUPABASE_URL: Must start with postgresql://. Check your .env file.")
 
-# Sync engine for migrations/setup
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=20,
-    max_overflow=15,
-    echo=True
-)
-print(f"[DB] Connected to: {DATABASE_URL.split('@')[-1]}")  # Mask credentials
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+DB_ECHO = _env_bool("DB_ECHO", "false")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "true")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# Supabase's pooler (pgbouncer in transaction mode) can't keep named prepared statements between transactions
+DB_PGBOUNCER = _env_bool("DB_PGBOUNCER", "true" if "pooler.supabase.com" in DATABASE_URL else "false")
+DB_NULL_POOL = _env_bool("DB_NULL_POOL", "false")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "0" if DB_PGBOUNCER else "100"))
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that also counts callers currently waiting to check out a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+
+    def _do_get(self):
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+
+
+def _connect_args() -> dict:
+    args = {
+        "command_timeout": DB_STATEMENT_TIMEOUT_MS / 1000,
+        # asyncpg's own cache and SQLAlchemy's prepared statement cache
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+    if DB_PGBOUNCER:
+        # Unique names so a statement prepared on one backend never collides on another
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    else:
+        # pgbouncer rejects unknown startup parameters, so only set the server-side timeout on direct connections
+        args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    return args
+
+
+def _pool_args() -> dict:
+    if DB_NULL_POOL:
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+_engine: Optional[AsyncEngine] = None
+
+
+def get_engine() -> AsyncEngine:
+    """The async engine for FastAPI, workers and scripts, created on first use; schema changes go through Alembic."""
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+            echo=DB_ECHO,
+            connect_args=_connect_args(),
+            **_pool_args()
+        )
+        logger.info("Database engine configured", extra={"database": DATABASE_URL.split("@")[-1]})  # Mask credentials
+    return _engine
+
+
+async def dispose_engine():
+    """Close the pool's connections; the next get_engine() builds a new engine."""
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+class LazySessionmaker(async_sessionmaker):
+    """Binds sessions to get_engine() when they're opened rather than when this module is imported."""
+
+    def __call__(self, **local_kw) -> AsyncSession:
+        local_kw.setdefault("bind", get_engine())
+        return super().__call__(**local_kw)
 
-# Async engine for FastAPI
-async_engine = create_async_engine(
-    DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=True
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+AsyncSessionLocal = LazySessionmaker(class_=AsyncSession, expire_on_commit=False)
 
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
@@ -36,9 +115,19 @@ async def get_db() -> AsyncSession:
         finally:
             await session.close()
 
-def create_tables():
-    try:
-        Base.metadata.create_all(bind=engine)
-        print("[DB] Tables created successfully.")
-    except Exception as e:
-        print(f"[DB] Error creating tables: {e}")
+def pool_status() -> dict:
+    """Connection pool usage for the metrics endpoint."""
+    if _engine is None:
+        return {"pool": "not_started"}
+    pool = _engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "waiting": getattr(pool, "waiting", 0),
+    }
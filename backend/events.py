@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Set, List
+
+from sqlalchemy import ARRAY, Text, bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from jobs import listen
+from read_cache import read_cache
+from stats import stats_cache
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "1000"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_SUBSCRIBER_QUEUE_SIZE", "100"))
+# Changes are broadcast on these channels, so every process hears about writes made by the others
+CALL_CHANGED_CHANNEL = "call_changed"
+CONFIGURATION_CHANGED_CHANNEL = "configuration_changed"
+# Marks this process's own notifications, which it has already applied
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: Dict[str, Any]
+    call_id: Optional[str] = None
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscription:
+    def __init__(self, call_id: Optional[str] = None):
+        self.call_id = call_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def wants(self, event: Event) -> bool:
+        return self.call_id is None or self.call_id == event.call_id
+
+
+class EventHub:
+    """In-process pub/sub for call updates, with a replay buffer for Last-Event-ID resume."""
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self._next_id = 1
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+
+    def publish(self, event_type: str, data: Dict[str, Any], call_id: Optional[str] = None) -> Event:
+        event = Event(id=self._next_id, type=event_type, data=data, call_id=call_id)
+        self._next_id += 1
+        self._buffer.append(event)
+        for sub in list(self._subscribers):
+            if not sub.wants(event):
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(sub)
+        return event
+
+    def _drop(self, sub: Subscription):
+        # Slow client: end its stream, the browser reconnects and resumes from Last-Event-ID
+        self._subscribers.discard(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    def subscribe(self, call_id: Optional[str] = None) -> Subscription:
+        sub = Subscription(call_id)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
+
+    def replay(self, last_event_id: int, call_id: Optional[str] = None) -> List[Event]:
+        """Buffered events after last_event_id that the subscriber would have received."""
+        return [e for e in self._buffer if e.id > last_event_id and (call_id is None or e.call_id == call_id)]
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+event_hub = EventHub()
+
+
+def call_event(call) -> Dict[str, Any]:
+    return {
+        "id": str(call.id),
+        "status": call.status,
+        "structured_data_status": call.structured_data_status,
+        "retell_call_id": call.retell_call_id,
+        "duration_ms": call.duration_ms,
+        "updated_at": call.updated_at,
+    }
+
+
+def call_changed(data: Dict[str, Any]):
+    """Invalidate stats and the read cache and tell event subscribers that a Call row changed."""
+    stats_cache.invalidate()
+    read_cache.invalidate(("call", data["id"]))
+    event_hub.publish("call_updated", data, call_id=data["id"])
+
+
+async def commit_call_changes(db: AsyncSession, *calls):
+    """Commit the session and announce the changed calls to every process.
+
+    The NOTIFYs are part of the transaction, so other processes only hear about committed
+    changes; this process applies them straight after the commit.
+    """
+    events = [call_event(call) for call in calls]
+    if events:
+        payloads = [json.dumps({"origin": PROCESS_ID, "call": event}, default=str) for event in events]
+        payload = func.unnest(bindparam("payloads", payloads, type_=ARRAY(Text))).column_valued("payload")
+        await db.execute(select(func.pg_notify(CALL_CHANGED_CHANNEL, payload)))
+    await db.commit()
+    for event in events:
+        call_changed(event)
+
+
+def configuration_changed(config_id: str):
+    """Drop the cached configuration list, the configuration and the call details that embed it."""
+    read_cache.invalidate(("configurations",), ("agent_config", config_id))
+    read_cache.invalidate_namespace("call")
+
+
+async def commit_configuration_change(db: AsyncSession, config_id):
+    """Commit the session and drop every process's cached copies of the configuration, like commit_call_changes."""
+    config_id = str(config_id)
+    payload = json.dumps({"origin": PROCESS_ID, "id": config_id})
+    await db.execute(select(func.pg_notify(CONFIGURATION_CHANGED_CHANNEL, payload)))
+    await db.commit()
+    configuration_changed(config_id)
+
+
+class ChangeListener:
+    """Applies call and configuration changes committed by other processes to this process's caches and subscribers."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(listen(
+                {CALL_CHANGED_CHANNEL: self._call_changed, CONFIGURATION_CHANGED_CHANNEL: self._configuration_changed},
+                on_connect=self._resync,
+            ))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _call_changed(self, payload: str):
+        message = self._foreign(payload)
+        if message is not None:
+            call_changed(message["call"])
+
+    def _configuration_changed(self, payload: str):
+        message = self._foreign(payload)
+        if message is not None:
+            configuration_changed(message["id"])
+
+    def _foreign(self, payload: str) -> Optional[Dict[str, Any]]:
+        """The notification's message, or None if it's unreadable or this process sent it (already applied)."""
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Unreadable change notification", extra={"payload": payload[:200]})
+            return None
+        return None if message.get("origin") == PROCESS_ID else message
+
+    def _resync(self):
+        # Changes made while we weren't listening were never heard, so drop everything they could have touched
+        stats_cache.invalidate()
+        read_cache.invalidate_namespace("call")
+        read_cache.invalidate_namespace("agent_config")
+        read_cache.invalidate(("configurations",))
+
+
+change_listener = ChangeListener()
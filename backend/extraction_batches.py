@@ -0,0 +1,275 @@
+"""OpenAI Batch API lane for routine check-in extraction.
+
+Check-ins are queued as extract_batched jobs (see extraction_worker.enqueue_extraction). The
+BatchScheduler claims them in bulk once EXTRACTION_BATCH_MIN_SIZE are waiting or the oldest has
+waited EXTRACTION_BATCH_MAX_WAIT seconds, uploads one JSONL request per call and creates a batch.
+An extraction_batch job then polls the batch and writes all of its results back in one
+transaction. Check-ins the batch didn't answer, and batches that fail or expire, move to the
+realtime lane as ordinary extract jobs.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from database import AsyncSessionLocal
+from events import commit_call_changes
+from extraction_worker import BATCHED_KIND, lane_stats, observe_lag
+from jobs import JOBS_CHANNEL, JobDeferred, claim_jobs, enqueue_job, job_handler
+from metrics import openai_tokens_total
+from models import Call, Job
+from retell_handler import CHECK_IN_EXTRACTION_PROMPT, EXTRACTION_MODEL
+from services import services
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_BATCH_MIN_SIZE = int(os.getenv("EXTRACTION_BATCH_MIN_SIZE", "100"))
+# OpenAI accepts up to 50,000 requests per batch
+EXTRACTION_BATCH_MAX_SIZE = int(os.getenv("EXTRACTION_BATCH_MAX_SIZE", "5000"))
+# Submit a smaller batch once its oldest check-in has waited this many seconds
+EXTRACTION_BATCH_MAX_WAIT = float(os.getenv("EXTRACTION_BATCH_MAX_WAIT", "900"))
+EXTRACTION_BATCH_CHECK_INTERVAL = float(os.getenv("EXTRACTION_BATCH_CHECK_INTERVAL", "30"))
+EXTRACTION_BATCH_POLL_INTERVAL = float(os.getenv("EXTRACTION_BATCH_POLL_INTERVAL", "60"))
+EXTRACTION_BATCH_COMPLETION_WINDOW = "24h"
+# Submitted check-ins stay leased past the completion window; if their poll job is lost they're batched again
+BATCH_LEASE_SECONDS = 26 * 3600
+SUBMIT_LEASE_SECONDS = 300
+BATCH_POLL_KIND = "extraction_batch"
+PENDING_BATCH_STATUSES = ("validating", "in_progress", "finalizing", "cancelling")
+
+
+def batch_owner(batch_id: str) -> str:
+    """locked_by of the check-in jobs submitted in a batch."""
+    return f"batch:{batch_id}"
+
+
+def check_in_request(job: Job) -> Dict[str, Any]:
+    return {
+        "custom_id": str(job.id),
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": services.handler.json_request(CHECK_IN_EXTRACTION_PROMPT, job.payload["transcript"]),
+    }
+
+
+def cache_key(job: Job) -> str:
+    return services.handler.cache.make_key(CHECK_IN_EXTRACTION_PROMPT, EXTRACTION_MODEL, job.payload["transcript"])
+
+
+def parse_output(text: str) -> Dict[str, Dict[str, Any]]:
+    """Extraction JSON by custom_id (the job id) from a batch output file; failed requests are left out."""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                continue
+            body = response["body"]
+            usage = body.get("usage")
+            if usage:
+                openai_tokens_total.inc("check_in_batch", "prompt", amount=usage["prompt_tokens"])
+                openai_tokens_total.inc("check_in_batch", "completion", amount=usage["completion_tokens"])
+            results[item["custom_id"]] = json.loads(body["choices"][0]["message"]["content"])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.warning("Unreadable batch output line", extra={"error": str(e)})
+    return results
+
+
+async def move_to_realtime(db: AsyncSession, owner: str) -> int:
+    """Turn the check-ins still leased to owner into ordinary extract jobs, in the caller's transaction."""
+    result = await db.execute(
+        update(Job)
+        .where(Job.kind == BATCHED_KIND, Job.locked_by == owner)
+        .values(kind="extract", status="queued", priority=0, attempts=0, locked_by=None, visible_at=func.now(), updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        await db.execute(select(func.pg_notify(JOBS_CHANNEL, "extract")))
+    return result.rowcount
+
+
+async def write_back(owner: str, results: Dict[str, Dict[str, Any]], remember: bool = True) -> Tuple[int, int]:
+    """Save the results for the check-ins leased to owner in one transaction, and cache them if `remember`.
+
+    Those without a result move to the realtime lane. Returns (saved, moved to realtime).
+    """
+    now = datetime.now()
+    async with AsyncSessionLocal() as db:
+        jobs = (await db.scalars(select(Job).where(Job.kind == BATCHED_KIND, Job.locked_by == owner))).all()
+        done = [job for job in jobs if str(job.id) in results]
+        if done:
+            # ORM bulk UPDATE by primary key: one executemany for the whole batch
+            await db.execute(update(Call), [
+                {
+                    "id": uuid.UUID(job.payload["call_id"]),
+                    "structured_data": {**results[str(job.id)], "state": job.payload["state"]},
+                    "structured_data_status": "done",
+                    "state": job.payload["state"],
+                    "updated_at": now,
+                }
+                for job in done
+            ])
+            await db.execute(
+                delete(Job).where(Job.id.in_([job.id for job in done])).execution_options(synchronize_session=False)
+            )
+        moved = await move_to_realtime(db, owner)
+
+        calls = []
+        if done:
+            calls = (await db.scalars(
+                select(Call)
+                .options(load_only(Call.status, Call.structured_data_status, Call.retell_call_id, Call.duration_ms, Call.updated_at))
+                .where(Call.id.in_([uuid.UUID(job.payload["call_id"]) for job in done]))
+            )).all()
+        await commit_call_changes(db, *calls)
+    if done and remember:
+        await services.handler.cache.set_many(
+            {cache_key(job): results[str(job.id)] for job in done}, "check_in", EXTRACTION_MODEL
+        )
+    for job in done:
+        observe_lag(job, "batch")
+    return len(done), moved
+
+
+async def create_batch(requests: List[Dict[str, Any]]) -> str:
+    openai = services.openai
+    body = "".join(json.dumps(request) + "\n" for request in requests).encode("utf-8")
+    input_file = await openai.files.create(file=("check_in_extractions.jsonl", body), purpose="batch")
+    batch = await openai.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=EXTRACTION_BATCH_COMPLETION_WINDOW,
+        metadata={"lane": "check_in"},
+    )
+    return batch.id
+
+
+async def release_batch(job: Job, error: str):
+    """A poll job that ran out of attempts hands its batch's check-ins to the realtime lane."""
+    async with AsyncSessionLocal() as db:
+        moved = await move_to_realtime(db, batch_owner(job.payload["batch_id"]))
+        await db.commit()
+    logger.warning("Extraction batch abandoned", extra={"batch_id": job.payload["batch_id"], "moved_to_realtime": moved, "error": error})
+
+
+@job_handler(BATCH_POLL_KIND, on_dead=release_batch)
+async def poll_extraction_batch(job: Job):
+    batch_id = job.payload["batch_id"]
+    batch = await services.openai.batches.retrieve(batch_id)
+    if batch.status in PENDING_BATCH_STATUSES:
+        raise JobDeferred(EXTRACTION_BATCH_POLL_INTERVAL, f"batch {batch.status}")
+
+    results = {}
+    if batch.status == "completed" and batch.output_file_id:
+        content = await services.openai.files.content(batch.output_file_id)
+        results = parse_output(content.text)
+    saved, moved = await write_back(batch_owner(batch_id), results)
+    logger.info(
+        "Extraction batch written back",
+        extra={"batch_id": batch_id, "batch_status": batch.status, "saved": saved, "moved_to_realtime": moved}
+    )
+
+
+class BatchScheduler:
+    """Submits waiting check-ins as Batch API jobs and keeps per-lane depth and lag for the metrics.
+
+    Claims use SKIP LOCKED, so any number of processes can run one.
+    """
+
+    def __init__(
+        self,
+        min_size: int = EXTRACTION_BATCH_MIN_SIZE,
+        max_size: int = EXTRACTION_BATCH_MAX_SIZE,
+        max_wait: float = EXTRACTION_BATCH_MAX_WAIT,
+        check_interval: float = EXTRACTION_BATCH_CHECK_INTERVAL,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.check_interval = check_interval
+        self.owner = f"batch-submitter:{socket.gethostname()}:{os.getpid()}"
+        # lane -> (waiting extractions, seconds the oldest has waited), as of the last check
+        self.lanes: Dict[str, Tuple[int, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.lanes = await lane_stats()
+                while await self.submit_ready():
+                    pass
+            except Exception:
+                logger.exception("Extraction batch scheduling failed")
+            await asyncio.sleep(self.check_interval)
+
+    async def ready(self) -> bool:
+        async with AsyncSessionLocal() as db:
+            waiting, oldest_wait = (await db.execute(
+                select(func.count(), func.extract("epoch", func.now() - func.min(Job.created_at)))
+                .where(Job.kind == BATCHED_KIND, Job.status.in_(("queued", "running")), Job.visible_at <= func.now())
+            )).one()
+        return waiting >= self.min_size or (waiting > 0 and oldest_wait >= self.max_wait)
+
+    async def submit_ready(self) -> bool:
+        """Submit one batch if enough check-ins are waiting; True if any were claimed."""
+        if not await self.ready():
+            return False
+        jobs = await claim_jobs(BATCHED_KIND, self.max_size, self.owner, SUBMIT_LEASE_SECONDS)
+        if not jobs:
+            return False
+
+        # Transcripts extracted before are answered from the cache instead of being sent again
+        cache = services.handler.cache
+        keys = {job.id: cache_key(job) for job in jobs}
+        cached = await cache.get_many(list(keys.values()), "check_in")
+        results = {str(job.id): cached[keys[job.id]] for job in jobs if keys[job.id] in cached}
+        requests = [check_in_request(job) for job in jobs if str(job.id) not in results]
+
+        batch_id = None
+        if requests:
+            try:
+                batch_id = await create_batch(requests)
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(Job)
+                        .where(Job.id.in_([uuid.UUID(r["custom_id"]) for r in requests]), Job.locked_by == self.owner)
+                        .values(locked_by=batch_owner(batch_id), visible_at=func.now() + timedelta(seconds=BATCH_LEASE_SECONDS))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await enqueue_job(db, BATCH_POLL_KIND, {"batch_id": batch_id, "requests": len(requests)})
+                    await db.commit()
+            except Exception as e:
+                # Whatever is still leased to us falls back to the realtime lane in write_back below
+                logger.warning("Extraction batch submission failed", extra={"requests": len(requests), "error": str(e)})
+                batch_id = None
+
+        saved, moved = await write_back(self.owner, results, remember=False)
+        logger.info(
+            "Extraction batch submitted" if batch_id else "Extraction batch not submitted",
+            extra={"batch_id": batch_id, "requests": len(requests) if batch_id else 0, "cached": saved, "moved_to_realtime": moved}
+        )
+        return True
+
+
+batch_scheduler = BatchScheduler()
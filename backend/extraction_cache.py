@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import AsyncSessionLocal
+from metrics import extraction_cache_requests_total
+from models import ExtractionCacheEntry
+
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+EXTRACTION_CACHE_PERSIST = os.getenv("EXTRACTION_CACHE_PERSIST", "true").lower() == "true"
+
+
+class ExtractionCache:
+    """Two-tier cache for extraction results: an in-memory LRU bounded by bytes, backed by Postgres."""
+
+    def __init__(self, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES, persist: bool = EXTRACTION_CACHE_PERSIST):
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def make_key(prompt: str, model: str, transcript: str) -> str:
+        digest = hashlib.sha256()
+        for part in (prompt, model, transcript):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get(self, key: str, extraction_type: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            extraction_cache_requests_total.inc(extraction_type, "memory", "hit")
+            return entry[0]
+        extraction_cache_requests_total.inc(extraction_type, "memory", "miss")
+
+        if not self.persist:
+            return None
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(ExtractionCacheEntry.result).where(ExtractionCacheEntry.key == key))
+            value = result.scalar_one_or_none()
+        extraction_cache_requests_total.inc(extraction_type, "db", "hit" if value is not None else "miss")
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    async def set(self, key: str, extraction_type: str, model: str, value: Dict[str, Any]):
+        self._remember(key, value)
+        if not self.persist:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                pg_insert(ExtractionCacheEntry)
+                .values(key=key, extraction_type=extraction_type, model=model, result=value)
+                .on_conflict_do_nothing(index_elements=["key"])
+            )
+            await db.commit()
+
+    async def get_many(self, keys: List[str], extraction_type: str) -> Dict[str, Dict[str, Any]]:
+        """Bulk get: the memory tier, then one query for all the keys it missed."""
+        found = {}
+        missing = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                found[key] = entry[0]
+            else:
+                missing.append(key)
+        extraction_cache_requests_total.inc(extraction_type, "memory", "hit", amount=len(found))
+        extraction_cache_requests_total.inc(extraction_type, "memory", "miss", amount=len(missing))
+        if not missing or not self.persist:
+            return found
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ExtractionCacheEntry.key, ExtractionCacheEntry.result).where(ExtractionCacheEntry.key.in_(missing))
+            )
+            rows = dict(result.all())
+        extraction_cache_requests_total.inc(extraction_type, "db", "hit", amount=len(rows))
+        extraction_cache_requests_total.inc(extraction_type, "db", "miss", amount=len(missing) - len(rows))
+        for key, value in rows.items():
+            self._remember(key, value)
+        return {**found, **rows}
+
+    async def set_many(self, values: Dict[str, Dict[str, Any]], extraction_type: str, model: str):
+        """Bulk set with a single INSERT."""
+        for key, value in values.items():
+            self._remember(key, value)
+        if not values or not self.persist:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                pg_insert(ExtractionCacheEntry)
+                .values([
+                    {"key": key, "extraction_type": extraction_type, "model": model, "result": value}
+                    for key, value in values.items()
+                ])
+                .on_conflict_do_nothing(index_elements=["key"])
+            )
+            await db.commit()
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+extraction_cache = ExtractionCache()
@@ -0,0 +1,147 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from jobs import enqueue_job, job_handler
+from models import Call, Job
+from services import services
+from events import commit_call_changes
+from metrics import calls_in_flight, extraction_lag_seconds, webhook_stage_seconds
+from transcript_chunks import EXTRACTION_CHUNK_THRESHOLD_TOKENS, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_MAX_RETRIES = int(os.getenv("EXTRACTION_MAX_RETRIES", "3"))
+# Opt-in: routine check-ins wait for an OpenAI Batch API submission (extraction_batches.py), which can
+# take up to 24 hours, instead of a live request
+EXTRACTION_BATCH_ENABLED = os.getenv("EXTRACTION_BATCH_ENABLED", "false").lower() == "true"
+# Job priority of emergency extractions; everything else is 0
+EXTRACTION_URGENT_PRIORITY = 100
+# Job kind of check-ins waiting for a batch; claimed in bulk by the batch scheduler, not by job workers
+BATCHED_KIND = "extract_batched"
+LANES = ("urgent", "realtime", "batch")
+
+
+@dataclass
+class ExtractionJob:
+    call_id: str
+    transcript: str
+    state: Dict[str, Any] = field(default_factory=dict)
+    keyword_overrides: Optional[Dict[str, List[str]]] = None
+    attempt: int = 0
+
+
+class ExtractionWorker:
+    """Runs OpenAI extraction for durable "extract" jobs; retries and backoff are the job queue's."""
+
+    async def process(self, job: ExtractionJob, final_attempt: bool):
+        """Extract and save; failures raise for a retry, except on the final attempt, which saves fallback data."""
+        handler = services.handler.with_keywords(job.keyword_overrides)
+        try:
+            with webhook_stage_seconds.time("extraction"):
+                structured_data = await handler.extract_structured_data(job.transcript, job.state, raise_errors=True)
+            status = "done"
+        except Exception as e:
+            if not final_attempt:
+                logger.warning(
+                    "Extraction failed, retrying",
+                    extra={"call_id": job.call_id, "attempt": job.attempt + 1, "error": str(e)}
+                )
+                raise
+            logger.error(
+                "Extraction failed, saving fallback data",
+                extra={"call_id": job.call_id, "attempts": job.attempt + 1, "error": str(e)}
+            )
+            structured_data = handler.fallback_structured_data(job.transcript, job.state)
+            structured_data["error"] = str(e)
+            status = "failed"
+
+        await self._save(job, structured_data, status)
+
+    async def _save(self, job: ExtractionJob, structured_data: Dict[str, Any], status: str):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Call).where(Call.id == job.call_id))
+            db_call = result.scalar_one_or_none()
+            if not db_call:
+                logger.warning("Call disappeared before extraction finished", extra={"call_id": job.call_id})
+                return
+            db_call.structured_data = structured_data
+            db_call.structured_data_status = status
+            db_call.state = job.state
+            db_call.updated_at = datetime.now()
+            with webhook_stage_seconds.time("extraction_commit"):
+                await commit_call_changes(db, db_call)
+        logger.info("Structured data saved", extra={"call_id": job.call_id, "structured_data_status": status})
+
+
+extraction_worker = ExtractionWorker()
+
+
+def extraction_lane(job: ExtractionJob) -> str:
+    """urgent for emergencies, batch for routine check-ins that fit one request, realtime for the rest."""
+    handler = services.handler.with_keywords(job.keyword_overrides)
+    if job.state.get("emergency_detected") or handler.detect_emergency(job.transcript):
+        return "urgent"
+    # Long transcripts are extracted window by window, which a single batch request can't do
+    if EXTRACTION_BATCH_ENABLED and estimate_tokens(job.transcript) <= EXTRACTION_CHUNK_THRESHOLD_TOKENS:
+        return "batch"
+    return "realtime"
+
+
+async def enqueue_extraction(db: AsyncSession, job: ExtractionJob) -> str:
+    """Queue extraction in the caller's transaction, so it commits together with the transcript; returns the lane."""
+    lane = extraction_lane(job)
+    payload = {"call_id": job.call_id, "transcript": job.transcript, "state": job.state, "keyword_overrides": job.keyword_overrides}
+    if lane == "batch":
+        await enqueue_job(db, BATCHED_KIND, payload, max_attempts=EXTRACTION_MAX_RETRIES + 1)
+    else:
+        await enqueue_job(
+            db, "extract", payload,
+            max_attempts=EXTRACTION_MAX_RETRIES + 1,
+            priority=EXTRACTION_URGENT_PRIORITY if lane == "urgent" else 0,
+        )
+    return lane
+
+
+def job_lane(job: Job) -> str:
+    if job.kind == BATCHED_KIND:
+        return "batch"
+    return "urgent" if job.priority >= EXTRACTION_URGENT_PRIORITY else "realtime"
+
+
+def observe_lag(job: Job, lane: str = None):
+    """Time from queueing the extraction to saving its result."""
+    extraction_lag_seconds.observe((datetime.now(timezone.utc) - job.created_at).total_seconds(), lane or job_lane(job))
+
+
+async def lane_stats() -> Dict[str, Tuple[int, float]]:
+    """(waiting extractions, seconds the oldest has waited) for each lane."""
+    lane = case(
+        (Job.kind == BATCHED_KIND, "batch"),
+        (Job.priority >= EXTRACTION_URGENT_PRIORITY, "urgent"),
+        else_="realtime",
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(lane, func.count(), func.extract("epoch", func.now() - func.min(Job.created_at)))
+            .where(and_(Job.kind.in_(("extract", BATCHED_KIND)), Job.status != "dead"))
+            .group_by(lane)
+        )
+        rows = {name: (count, float(lag or 0)) for name, count, lag in result}
+    return {name: rows.get(name, (0, 0.0)) for name in LANES}
+
+
+@job_handler("extract")
+async def run_extraction_job(job: Job):
+    with calls_in_flight.track_inprogress("extracting"):
+        await extraction_worker.process(
+            ExtractionJob(**job.payload, attempt=job.attempts - 1),
+            final_attempt=job.attempts >= job.max_attempts,
+        )
+    observe_lag(job)
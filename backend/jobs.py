@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+from sqlalchemy import Select, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import DATABASE_URL, AsyncSessionLocal
+from metrics import job_seconds
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+# A running job's lease: workers renew it while the job runs, so only a job whose worker died or hung
+# is handed to another worker, this many seconds after its last renewal
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "2.0"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "300"))
+# Safety net for missed notifications, retries coming due and expired visibility timeouts
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5.0"))
+# LISTEN needs a session-level connection: use the direct database URL when SUPABASE_URL is a transaction pooler
+JOB_LISTEN_URL = os.getenv("JOB_LISTEN_URL", DATABASE_URL)
+JOBS_CHANNEL = "jobs"
+
+
+@dataclass
+class JobKind:
+    run: Callable[[Job], Awaitable[None]]
+    # Called once a job has used up its attempts, with the last error
+    on_dead: Optional[Callable[[Job, str], Awaitable[None]]] = None
+
+
+HANDLERS: Dict[str, JobKind] = {}
+
+
+class JobDeferred(Exception):
+    """Raised by a handler that can't finish yet, e.g. while waiting on an external batch.
+
+    The job is queued again after `delay` seconds and the attempt isn't counted.
+    """
+
+    def __init__(self, delay: float, reason: str = "deferred"):
+        super().__init__(reason)
+        self.delay = delay
+
+
+def job_handler(kind: str, on_dead: Optional[Callable[[Job, str], Awaitable[None]]] = None):
+    """Register the coroutine that runs jobs of `kind`; it must be safe to run more than once."""
+    def register(run: Callable[[Job], Awaitable[None]]):
+        HANDLERS[kind] = JobKind(run, on_dead)
+        return run
+    return register
+
+
+async def enqueue_job(db: AsyncSession, kind: str, payload: dict, max_attempts: Optional[int] = None, priority: int = 0):
+    """Add a job in the caller's transaction (no commit); listening workers are notified when it commits.
+
+    Claimable jobs with a higher priority are claimed first.
+    """
+    result = await db.execute(
+        insert(Job)
+        .values(kind=kind, payload=payload, max_attempts=max_attempts or JOB_MAX_ATTEMPTS, priority=priority)
+        .returning(Job.id)
+    )
+    await db.execute(select(func.pg_notify(JOBS_CHANNEL, kind)))
+    return result.scalar_one()
+
+
+async def listen(
+    callbacks: Dict[str, Callable[[str], None]],
+    interval: float = JOB_POLL_INTERVAL,
+    on_connect: Optional[Callable[[], None]] = None,
+):
+    """Call `callbacks[channel](payload)` for every NOTIFY on those channels until cancelled, reconnecting when
+    the connection drops. All channels share one connection.
+
+    `on_connect` runs each time the LISTEN is (re)established, to catch up on notifications missed meanwhile.
+    """
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(JOB_LISTEN_URL)
+            for channel, callback in callbacks.items():
+                await conn.add_listener(channel, lambda _conn, _pid, _channel, payload, callback=callback: callback(payload))
+            if on_connect is not None:
+                on_connect()
+            while True:
+                await asyncio.sleep(interval)
+                await conn.execute("SELECT 1")  # notices a dead connection
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("LISTEN connection lost, reconnecting", extra={"channels": sorted(callbacks), "error": str(e)})
+        finally:
+            if conn is not None:
+                await conn.close(timeout=5)
+        await asyncio.sleep(interval)
+
+
+def claimable(kinds) -> Select:
+    """Ids of jobs of the given kinds that may be claimed now, highest priority and longest waiting first."""
+    return (
+        select(Job.id)
+        .where(Job.kind.in_(list(kinds)), Job.status.in_(("queued", "running")), Job.visible_at <= func.now())
+        .order_by(Job.priority.desc(), Job.visible_at)
+    )
+
+
+async def claim_jobs(kind: str, limit: int, owner: str, lease: float) -> List[Job]:
+    """Claim up to `limit` jobs of `kind` at once for a consumer that handles them together.
+
+    They're leased to `owner` for `lease` seconds, after which they can be claimed again.
+    """
+    ids = claimable([kind]).limit(limit).with_for_update(skip_locked=True).scalar_subquery()
+    async with AsyncSessionLocal() as db:
+        result = await db.scalars(
+            update(Job)
+            .where(Job.id.in_(ids))
+            .values(
+                status="running",
+                attempts=Job.attempts + 1,
+                visible_at=func.now() + timedelta(seconds=lease),
+                locked_by=owner,
+                updated_at=func.now(),
+            )
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = result.all()
+        await db.commit()
+    return jobs
+
+
+async def queue_depth() -> Dict[Tuple[str, str], int]:
+    """Job counts by (kind, status), dead jobs included."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status))
+        return {(kind, status): count for kind, status, count in result}
+
+
+class JobWorker:
+    """Consumes the jobs table with FOR UPDATE SKIP LOCKED, so any number of processes can share it.
+
+    Workers sleep until a NOTIFY on the jobs channel (or the poll interval) instead of polling in a
+    tight loop, and only claim kinds with a registered handler, highest priority first. Failed jobs
+    are retried with jittered exponential backoff and dead-lettered (status 'dead') after max_attempts.
+    """
+
+    def __init__(self, concurrency: int = None, visibility_timeout: float = None, poll_interval: float = None):
+        self.concurrency = concurrency or JOB_CONCURRENCY
+        self.visibility_timeout = visibility_timeout or JOB_VISIBILITY_TIMEOUT
+        self.poll_interval = poll_interval or JOB_POLL_INTERVAL
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.depth: Dict[Tuple[str, str], int] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._monitor())]
+        self._tasks += [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+        logger.info("Job worker started", extra={"worker_id": self.worker_id, "concurrency": self.concurrency, "kinds": sorted(HANDLERS)})
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _listen(self):
+        # Woken on (re)connect too, for jobs committed while we weren't listening
+        await listen({JOBS_CHANNEL: lambda payload: self._wake.set()}, self.poll_interval, on_connect=self._wake.set)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self._wake.set()
+            try:
+                self.depth = await queue_depth()
+            except Exception as e:
+                logger.warning("Failed to read job queue depth", extra={"error": str(e)})
+
+    async def _run(self, worker_id: int):
+        while True:
+            # Cleared before claiming, so a notification that arrives mid-claim isn't lost
+            self._wake.clear()
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Failed to claim a job", extra={"worker_id": worker_id})
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    async def _claim(self) -> Optional[Job]:
+        # Kinds without a handler here (e.g. jobs waiting for an extraction batch) are left to their own consumer
+        next_job = claimable(HANDLERS).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+        async with AsyncSessionLocal() as db:
+            result = await db.scalars(
+                update(Job)
+                .where(Job.id == next_job)
+                .values(
+                    status="running",
+                    attempts=Job.attempts + 1,
+                    visible_at=func.now() + timedelta(seconds=self.visibility_timeout),
+                    locked_by=self.worker_id,
+                    updated_at=func.now(),
+                )
+                .returning(Job)
+                .execution_options(synchronize_session=False)
+            )
+            job = result.one_or_none()
+            await db.commit()
+        return job
+
+    async def _process(self, job: Job):
+        kind = HANDLERS.get(job.kind)
+        started = time.perf_counter()
+        try:
+            if kind is None:
+                raise LookupError(f"No handler registered for job kind {job.kind!r}")
+            if job.attempts > job.max_attempts:
+                # Its last attempt's worker died or hung without finishing it
+                raise TimeoutError(f"Job exceeded {job.max_attempts} attempts")
+            await self._run_leased(kind, job)
+        except JobDeferred as e:
+            outcome = "deferred"
+            await self._update_owned(job, update(Job).values(
+                status="queued",
+                locked_by=None,
+                attempts=Job.attempts - 1,
+                visible_at=func.now() + timedelta(seconds=e.delay),
+                updated_at=func.now(),
+            ))
+        except Exception as e:
+            outcome = await self._fail(job, kind, e)
+            logger.warning(
+                "Job failed",
+                extra={"job_id": str(job.id), "kind": job.kind, "attempt": job.attempts, "outcome": outcome, "error": str(e)}
+            )
+        else:
+            outcome = "done"
+            await self._update_owned(job, delete(Job))
+        job_seconds.observe(time.perf_counter() - started, job.kind, outcome)
+
+    def _retry_delay(self, attempts: int) -> float:
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * (2 ** attempts)))
+
+    async def _fail(self, job: Job, kind: Optional[JobKind], error: Exception) -> str:
+        dead = kind is None or job.attempts >= job.max_attempts
+        if dead:
+            values = {"status": "dead", "locked_by": None, "last_error": str(error)}
+        else:
+            values = {
+                "status": "queued",
+                "locked_by": None,
+                "last_error": str(error),
+                "visible_at": func.now() + timedelta(seconds=self._retry_delay(job.attempts)),
+            }
+        await self._update_owned(job, update(Job).values(updated_at=func.now(), **values))
+        if dead and kind and kind.on_dead:
+            try:
+                await kind.on_dead(job, str(error))
+            except Exception:
+                logger.exception("Dead-letter handler failed", extra={"job_id": str(job.id), "kind": job.kind})
+        return "dead" if dead else "retry"
+
+    async def _run_leased(self, kind: JobKind, job: Job):
+        renewal = asyncio.create_task(self._renew_lease(job))
+        try:
+            await kind.run(job)
+        finally:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+
+    async def _renew_lease(self, job: Job):
+        """Push the job's visible_at out while it runs, so a slow job isn't claimed by another worker."""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                renewed = await self._update_owned(job, update(Job).values(
+                    visible_at=func.now() + timedelta(seconds=self.visibility_timeout),
+                ))
+            except Exception as e:
+                logger.warning("Failed to renew job lease", extra={"job_id": str(job.id), "kind": job.kind, "error": str(e)})
+                continue
+            if not renewed:
+                logger.warning("Job lease lost to another worker", extra={"job_id": str(job.id), "kind": job.kind})
+                return
+
+    async def _update_owned(self, job: Job, statement) -> int:
+        # Only while we still own this attempt; after a visibility timeout the job belongs to its new claimer
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                statement
+                .where(Job.id == job.id, Job.locked_by == self.worker_id, Job.attempts == job.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return result.rowcount
+
+
+job_worker = JobWorker()
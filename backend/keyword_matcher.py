@@ -0,0 +1,88 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+# Keyword categories recognised in driver messages and transcripts. Keywords match whole words only,
+# so inflected forms are listed explicitly ("help" and "helps", but not "helpful" or "helping").
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    "emergency": [
+        "accident", "accidents", "crash", "crashed", "crashes", "blowout", "blowouts", "blew out",
+        "emergency", "hurt", "hurts", "injured", "injury", "injuries",
+        "breakdown", "broke down", "broken down", "break down", "fire", "fires", "on fire",
+        "medical", "help", "helps", "911", "issue"
+    ],
+    "repeat": ["repeat"],
+    "in_transit": ["driving", "transit"],
+    "arrived": ["arrived", "destination"],
+    "delayed": ["delayed", "late"],
+}
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _contains_word(lower: str, keyword: str) -> bool:
+    """Whole-word occurrence of keyword in already-lowercased text ("help" doesn't match "helpless")."""
+    n = len(keyword)
+    end = len(lower)
+    i = lower.find(keyword)
+    while i != -1:
+        if (i == 0 or not _is_word_char(lower[i - 1])) and (i + n == end or not _is_word_char(lower[i + n])):
+            return True
+        i = lower.find(keyword, i + 1)
+    return False
+
+
+class KeywordMatcher:
+    """Precompiled keyword categories, all detected from one lowercased copy of the text.
+
+    Candidate positions come from str.find (a C-level substring search), and only those
+    positions are checked for word boundaries. On CPython this is faster than a regex
+    alternation or a pure-Python Aho-Corasick automaton over long transcripts.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = {name: list(words) for name, words in categories.items() if words}
+        self._compiled: Tuple[Tuple[str, Tuple[str, ...]], ...] = tuple(
+            (name, tuple(dict.fromkeys(" ".join(w.lower().split()) for w in words if w.strip())))
+            for name, words in self.categories.items()
+        )
+
+    def find_categories(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        if not text:
+            return found
+        lower = text.lower()
+        for name, keywords in self._compiled:
+            for keyword in keywords:
+                if _contains_word(lower, keyword):
+                    found.add(name)
+                    break
+        return found
+
+    def matches(self, text: str, category: str) -> bool:
+        if not text:
+            return False
+        lower = text.lower()
+        for name, keywords in self._compiled:
+            if name == category:
+                return any(_contains_word(lower, keyword) for keyword in keywords)
+        return False
+
+
+def _freeze(overrides: Optional[Dict[str, List[str]]]) -> Tuple:
+    if not overrides:
+        return ()
+    return tuple(sorted((name, tuple(words or ())) for name, words in overrides.items()))
+
+
+@lru_cache(maxsize=128)
+def _compiled(frozen_overrides: Tuple) -> KeywordMatcher:
+    categories = dict(DEFAULT_KEYWORDS)
+    categories.update({name: list(words) for name, words in frozen_overrides})
+    return KeywordMatcher(categories)
+
+
+def get_matcher(overrides: Optional[Dict[str, List[str]]] = None) -> KeywordMatcher:
+    """Matcher for the default keywords with per-configuration category overrides, compiled once per distinct set."""
+    return _compiled(_freeze(overrides))
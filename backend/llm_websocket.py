@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Dict, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from database import AsyncSessionLocal
+from metrics import calls_in_flight, llm_turn_seconds
+from models import Call
+from retell_handler import RetellHandler
+from services import services
+from retell_provisioning import DYNAMIC_VARIABLES
+from state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gpt-4o-mini")
+LLM_FALLBACK_MAX_TOKENS = int(os.getenv("LLM_FALLBACK_MAX_TOKENS", "150"))
+# Transcript turns sent with a fallback request; older turns rarely change the answer
+LLM_FALLBACK_HISTORY_TURNS = int(os.getenv("LLM_FALLBACK_HISTORY_TURNS", "20"))
+
+REMINDER_RESPONSE = "Are you still there? Are you driving, delayed, or arrived?"
+FALLBACK_ERROR_RESPONSE = "Sorry, could you say that again?"
+
+def fill_variables(text: str, variables: Dict[str, str]) -> str:
+    """Substitute {var} and {{var}} placeholders with the call's dynamic variables."""
+    for var, value in variables.items():
+        text = text.replace(f"{{{{{var}}}}}", value).replace(f"{{{var}}}", value)
+    return text
+
+
+class LLMSession:
+    """One Retell custom LLM websocket: scripted turns answered by RetellHandler, the rest streamed from OpenAI.
+
+    Conversation state is kept in state_store after every turn, which persists it to Call.state in the background.
+    """
+
+    def __init__(self, websocket: WebSocket, retell_call_id: str):
+        self.websocket = websocket
+        self.retell_call_id = retell_call_id
+        self.our_call_id: Optional[str] = None
+        self.handler = services.handler
+        self.state: Dict[str, Any] = {}
+        self.system_prompt = ""
+        self.begin_message = ""
+        self._turn: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+
+    async def run(self):
+        await self.websocket.accept()
+        await self.send({"response_type": "config", "config": {"auto_reconnect": True, "call_details": True}})
+        try:
+            with calls_in_flight.track_inprogress("conversation"):
+                while True:
+                    await self.dispatch(await self.websocket.receive_json())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self.cancel_turn()
+            self.save_state()
+
+    async def send(self, event: Dict[str, Any]):
+        async with self._send_lock:
+            await self.websocket.send_json(event)
+
+    async def send_response(self, response_id: int, content: str, complete: bool = True, end_call: bool = False):
+        await self.send({
+            "response_type": "response",
+            "response_id": response_id,
+            "content": content,
+            "content_complete": complete,
+            "end_call": end_call,
+        })
+
+    async def dispatch(self, event: Dict[str, Any]):
+        interaction_type = event.get("interaction_type")
+        if interaction_type == "call_details":
+            await self.load_call(event.get("call") or {})
+            await self.send_response(0, self.begin_message)
+        elif interaction_type == "ping_pong":
+            await self.send({"response_type": "ping_pong", "timestamp": event.get("timestamp")})
+        elif interaction_type in ("response_required", "reminder_required"):
+            # A newer response_id supersedes whatever is still being generated
+            await self.cancel_turn()
+            self._turn = asyncio.create_task(self.respond(event))
+
+    async def cancel_turn(self):
+        if self._turn and not self._turn.done():
+            self._turn.cancel()
+            await asyncio.gather(self._turn, return_exceptions=True)
+        self._turn = None
+
+    async def load_call(self, call_details: Dict[str, Any]):
+        """Pick up the prompt, keywords and any saved state for the call; keeps the defaults if it's unknown."""
+        # Only set once the call is found, so an unknown id never gets state saved under it
+        metadata_call_id = (call_details.get("metadata") or {}).get("our_call_id")
+        try:
+            call_id = uuid.UUID(str(metadata_call_id)) if metadata_call_id else None
+        except ValueError:
+            call_id = None
+        query = select(Call).options(selectinload(Call.agent_config))
+        if call_id:
+            query = query.where(Call.id == call_id)
+        else:
+            query = query.where(Call.retell_call_id == self.retell_call_id)
+        async with AsyncSessionLocal() as db:
+            db_call = (await db.execute(query)).scalar_one_or_none()
+        if not db_call:
+            logger.warning("Call not found for LLM websocket", extra={"retell_call_id": self.retell_call_id, "our_call_id": metadata_call_id})
+            return
+
+        self.our_call_id = str(db_call.id)
+        self.state = await state_store.get(db_call.id, default=db_call.state)
+        variables = {var: str(getattr(db_call, var) or "") for var in DYNAMIC_VARIABLES}
+        config = db_call.agent_config
+        if config:
+            self.handler = services.handler.with_keywords(config.keyword_overrides)
+            self.system_prompt = fill_variables(config.system_prompt, variables)
+            # An auto-reconnected socket resumes mid-call and must not greet the driver again
+            if not self.state:
+                self.begin_message = fill_variables(config.initial_message or "", variables)
+
+    async def respond(self, event: Dict[str, Any]):
+        response_id = event["response_id"]
+        transcript = event.get("transcript") or []
+        started = time.perf_counter()
+        if event.get("interaction_type") == "reminder_required":
+            await self.send_response(response_id, REMINDER_RESPONSE)
+            llm_turn_seconds.observe(time.perf_counter() - started, "local")
+            return
+
+        last_message = next((ut.get("content", "") for ut in reversed(transcript) if ut.get("role") == "user"), "")
+        if not self.handler.handles_locally(last_message, self.state):
+            await self.stream_fallback(response_id, transcript, started)
+            return
+
+        # Slow follow-ups (classifying the emergency type) run after the reply is on its way
+        background: List[Awaitable] = []
+        result = await self.handler.process_conversation(last_message, transcript, self.state, background)
+        await self.send_response(response_id, result["response"], end_call=result["end_conversation"])
+        llm_turn_seconds.observe(time.perf_counter() - started, "local")
+        self.save_state()
+        if background:
+            await asyncio.gather(*background)
+            self.save_state()
+
+    async def stream_fallback(self, response_id: int, transcript: List[Dict[str, Any]], started: float):
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        messages += [
+            {"role": "assistant" if ut.get("role") == "agent" else "user", "content": ut.get("content", "")}
+            for ut in transcript[-LLM_FALLBACK_HISTORY_TURNS:]
+        ]
+        first = True
+        try:
+            stream = await self.handler.openai_client.chat.completions.create(
+                model=LLM_FALLBACK_MODEL,
+                messages=messages,
+                max_tokens=LLM_FALLBACK_MAX_TOKENS,
+                temperature=0.2,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    RetellHandler.record_usage("conversation_fallback", chunk)
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if not content:
+                    continue
+                await self.send_response(response_id, content, complete=False)
+                if first:
+                    llm_turn_seconds.observe(time.perf_counter() - started, "fallback")
+                    first = False
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("OpenAI error in LLM fallback", extra={"retell_call_id": self.retell_call_id, "error": str(e)})
+            if first:
+                await self.send_response(response_id, FALLBACK_ERROR_RESPONSE)
+                return
+        await self.send_response(response_id, "", complete=True)
+
+    def save_state(self):
+        if self.our_call_id and self.state:
+            state_store.put(self.our_call_id, self.state)
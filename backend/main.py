@@ -1,28 +1,88 @@
-from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi import FastAPI, HTTPException, Request, Depends, Query, UploadFile, File, Form, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import select
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, PlainTextResponse, ORJSONResponse as _ORJSONResponse
+from sqlalchemy import select, insert, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, load_only, undefer
 import os
-from dotenv import load_dotenv
-import httpx
-from httpx import RequestError, HTTPStatusError, TimeoutException
+import io
+import csv
+import asyncio
+import json
+import uuid
+import base64
+import hashlib
+import logging
+import orjson
+from contextlib import asynccontextmanager
+from httpx import RequestError, TimeoutException
 from datetime import datetime
-import traceback
 
-from database import get_db, create_tables
-from models import AgentConfiguration, Call, AgentConfigurationPydantic, CallTrigger
-from retell_handler import RetellHandler
-from pydantic import BaseModel
-from typing import Dict, Any
-
-# Load environment variables
-load_dotenv()
+import settings  # noqa: F401 - loads .env
+from logging_config import configure_logging
 
-# Create tables on startup (no-op if already created)
-create_tables()
+# Set up logging before the modules below log at import
+configure_logging()
 
-app = FastAPI()
+from database import get_db, pool_status
+from models import (
+    AgentConfiguration, Call, Campaign, WebhookEvent, AgentConfigurationPydantic, CallTrigger, CampaignCreate,
+    CallDetailsResponse, CallListResponse
+)
+from compression import CompressionMiddleware
+from jobs import enqueue_job, job_worker
+from campaign_dispatcher import campaign_dispatcher
+from stats import stats_cache
+from retell_provisioning import ensure_retell_agent, create_web_call
+from events import change_listener, commit_configuration_change, event_hub
+from call_writes import insert_call, transition_call
+from call_search import search_calls
+from read_cache import READ_CACHE_ACTIVE_TTL, READ_CACHE_TTL, conditional_response, read_cache
+from llm_websocket import LLMSession
+from services import services
+from state_store import state_store
+from transcripts import load_utterances
+import webhook_jobs  # noqa: F401 - registers the retell_webhook and extract job handlers
+from extraction_batches import batch_scheduler
+import metrics
+from metrics import Gauge, calls_in_flight, trigger_call_stage_seconds, webhook_stage_seconds
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Run job consumers inside the API process; set to false when `python -m worker` processes do it
+JOB_WORKER_IN_PROCESS = os.getenv("JOB_WORKER_IN_PROCESS", "true").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Only the background loops start here; the engine and API clients are opened by their first use
+    await state_store.start()
+    # Writes by other API processes and `python -m worker` reach this process's caches and SSE clients through NOTIFY
+    await change_listener.start()
+    if JOB_WORKER_IN_PROCESS:
+        await job_worker.start()
+        await batch_scheduler.start()
+    await campaign_dispatcher.start()
+    try:
+        yield
+    finally:
+        await campaign_dispatcher.stop()
+        await batch_scheduler.stop()
+        await job_worker.stop()
+        await change_listener.stop()
+        await state_store.stop()
+        await services.close()
+
+class ORJSONResponse(_ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        # asyncpg's UUIDs aren't uuid.UUID to orjson, so like read_cache, whatever orjson can't encode goes through jsonable_encoder
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+# orjson for every JSON response; the hot endpoints return ORJSONResponse themselves to skip jsonable_encoder
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -31,31 +91,89 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(CompressionMiddleware)
 
 retell_api_key = os.getenv("RETELL_API_KEY")
-base_url = os.getenv("BACKEND_URL", "http://localhost:8000")
 
 if not retell_api_key:
     raise RuntimeError("RETELL_API_KEY is not set in environment")
 
-DEFAULT_HTTPX_TIMEOUT = 10.0
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 3000
+
+CAMPAIGN_MAX_ROWS = int(os.getenv("CAMPAIGN_MAX_ROWS", "5000"))
+CAMPAIGN_MAX_UPLOAD_BYTES = int(os.getenv("CAMPAIGN_MAX_UPLOAD_BYTES", "1048576"))
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+TRANSCRIPT_PAGE_SIZE = 200
+MAX_TRANSCRIPT_PAGE_SIZE = 1000
+
+# Fields the call listing can project; the transcript note is opt-in via fields=,
+# full transcripts are paged from /api/calls/{id}/transcript
+CALL_LIST_FIELDS = (
+    "id", "retell_call_id", "status", "transcript", "structured_data", "structured_data_status",
+    "driver_name", "load_number", "created_at", "updated_at", "duration_ms", "agent_config"
+)
+DEFAULT_CALL_FIELDS = tuple(f for f in CALL_LIST_FIELDS if f != "transcript")
 
 class WebhookPayload(BaseModel):
     event: str
     call: Dict[str, Any]
 
+def parse_call_fields(fields: Optional[str]) -> List[str]:
+    """Resolve the fields= projection for call listings; id and created_at are always included for the cursor."""
+    if not fields:
+        return list(DEFAULT_CALL_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in CALL_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id", "created_at"] + [f for f in requested if f not in ("id", "created_at")]
+
+def encode_cursor(call: Call) -> str:
+    raw = json.dumps({"created_at": call.created_at.isoformat(), "id": str(call.id)})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(raw["created_at"]), uuid.UUID(raw["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 # Agent Configuration Endpoints
 @app.get("/api/configurations")
-async def get_configurations(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(AgentConfiguration))
-    return result.scalars().all()
+async def get_configurations(request: Request, db: AsyncSession = Depends(get_db)):
+    async def load():
+        result = await db.execute(select(AgentConfiguration))
+        return jsonable_encoder(result.scalars().all())
+
+    return conditional_response(request, await read_cache.get_or_load(("configurations",), load))
+
+async def get_agent_config(db: AsyncSession, config_id: str) -> Optional[AgentConfiguration]:
+    """The configuration attached to db, from the read cache when possible (merge(load=False) issues no SELECT)."""
+    async def load():
+        result = await db.execute(select(AgentConfiguration).where(AgentConfiguration.id == config_id))
+        config = result.scalar_one_or_none()
+        if config is not None:
+            # The cached copy must not stay bound to this request's session
+            db.expunge(config)
+        return config
+
+    entry = await read_cache.get_or_load(("agent_config", str(config_id).lower()), load)
+    return await db.merge(entry.value, load=False) if entry else None
 
 @app.post("/api/configurations")
 async def create_configuration(config: AgentConfigurationPydantic, db: AsyncSession = Depends(get_db)):
     db_config = AgentConfiguration(**config.dict())
     db.add(db_config)
-    await db.commit()
+    await db.flush()
+    await commit_configuration_change(db, db_config.id)
     await db.refresh(db_config)
     return db_config
 
@@ -65,329 +183,460 @@ async def update_configuration(config_id: str, config: AgentConfigurationPydanti
     db_config = result.scalar_one_or_none()
     if not db_config:
         raise HTTPException(status_code=404, detail="Configuration not found")
+    previous_hash = db_config.content_hash()
     for key, value in config.dict().items():
         setattr(db_config, key, value)
+    if db_config.content_hash() != previous_hash:
+        # Cached Retell agent no longer matches; re-provisioned lazily on the next call
+        db_config.invalidate_provisioning()
     db_config.updated_at = datetime.now()
-    await db.commit()
+    # Other processes drop their cached copy too, so none keeps starting calls on the old Retell agent
+    await commit_configuration_change(db, db_config.id)
     await db.refresh(db_config)
     return db_config
 
 # Call Management Endpoints
 @app.post("/api/calls/trigger")
 async def trigger_call(call_data: CallTrigger, db: AsyncSession = Depends(get_db)):
-    # Create call record early so we always have an id to reference
-    result = await db.execute(select(AgentConfiguration).where(AgentConfiguration.id == call_data.agent_config_id))
-    agent_config = result.scalar_one_or_none()
+    with calls_in_flight.track_inprogress("starting"):
+        return await start_call(call_data, db)
+
+async def start_call(call_data: CallTrigger, db: AsyncSession):
+    agent_config = await get_agent_config(db, call_data.agent_config_id)
     if not agent_config:
         raise HTTPException(status_code=404, detail="Agent configuration not found")
 
-    db_call = Call(
-        agent_config_id=call_data.agent_config_id,
-        driver_name=call_data.driver_name,
-        load_number=call_data.load_number,
-        status="pending"
-    )
-    db.add(db_call)
-    await db.commit()
-    await db.refresh(db_call)
-    our_call_id = str(db_call.id)
-
-    headers = {"Authorization": f"Bearer {retell_api_key}", "Content-Type": "application/json"}
+    call_values = {
+        "agent_config_id": agent_config.id,
+        "driver_name": call_data.driver_name,
+        "load_number": call_data.load_number,
+    }
 
-    # Defensive access to voice settings
+    # Defensive access to voice settings; the failed call is still recorded so it shows up in the list
     voice_settings = agent_config.voice_settings or {}
-    voice_id = voice_settings.get("voice_id")
-    if not voice_id:
-        db_call.status = "failed"
-        db_call.transcript = "Missing voice_settings.voice_id in agent configuration"
-        db_call.updated_at = datetime.now()
-        await db.commit()
-        await db.refresh(db_call)
+    if not voice_settings.get("voice_id"):
+        await insert_call(db, status="failed", transcript="Missing voice_settings.voice_id in agent configuration", **call_values)
         raise HTTPException(status_code=500, detail="Agent configuration missing voice_id")
 
+    # Create call record early so we always have an id to reference; each transition below is one UPDATE ... RETURNING
+    with trigger_call_stage_seconds.time("db_insert"):
+        db_call = await insert_call(db, status="pending", **call_values)
+
     try:
-        async with httpx.AsyncClient(timeout=DEFAULT_HTTPX_TIMEOUT) as client:
-            # 1) Create Retell LLM
-            llm_data = {
-                "version": 0,
-                "model": "gpt-4o",
-                "model_temperature": 0.0,
-                "model_high_priority": False,
-                "tool_call_strict_mode": False,
-                "general_prompt": agent_config.system_prompt,
-                "general_tools": [
-                    {
-                        "type": "end_call",
-                        "name": "end_call",
-                        "description": "End the call with user."
-                    }
-                ],
-                "states": [],
-                "starting_state": None,
-                "begin_message": (agent_config.initial_message or "").format(
-                    driver_name=call_data.driver_name,
-                    load_number=call_data.load_number
-                ),
-                "default_dynamic_variables": {
-                    "driver_name": call_data.driver_name,
-                    "load_number": call_data.load_number
-                },
-                "knowledge_base_ids": [],
-                "kb_config": {
-                    "top_k": 3,
-                    "filter_score": 0.6
-                }
-            }
-            llm_res = await client.post(
-                "https://api.retellai.com/create-retell-llm",
-                headers=headers,
-                json=llm_data
-            )
-            if llm_res.status_code != 201:
-                raise HTTPException(status_code=500, detail=f"Failed to create LLM: {llm_res.status_code} - {llm_res.text}")
-            llm_id = llm_res.json().get("llm_id")
-            if not llm_id:
-                raise HTTPException(status_code=500, detail="Retell LLM response missing llm_id")
-
-            # 2) Create Agent
-            agent_data = {
-                "response_engine": {
-                    "llm_id": llm_id,
-                    "type": "retell-llm"
-                },
-                "voice_id": voice_id,
-                "agent_name": agent_config.name,
-                "language": "en-US",
-                "responsiveness": voice_settings.get("responsiveness"),
-                "interruption_sensitivity": voice_settings.get("interruption_sensitivity"),
-                "enable_backchannel": voice_settings.get("enable_backchannel", False),
-                "backchannel_frequency": voice_settings.get("backchannel_frequency", 0),
-                "backchannel_words": ["yeah", "uh-huh", "okay", "got it", "I see"],
-                "reminder_trigger_ms": 10000,
-                "reminder_max_count": 2,
-                "normalize_for_speech": True,
-                "end_call_after_silence_ms": 10000,
-                "max_call_duration_ms": 600000,
-                "webhook_url": f"{base_url}/retell-webhook"
-            }
-            agent_res = await client.post(
-                "https://api.retellai.com/create-agent",
-                headers=headers,
-                json=agent_data
-            )
-            if agent_res.status_code != 201:
-                raise HTTPException(status_code=500, detail=f"Failed to create agent: {agent_res.status_code} - {agent_res.text}")
-            agent_id = agent_res.json().get("agent_id")
-            if not agent_id:
-                raise HTTPException(status_code=500, detail="Retell agent response missing agent_id")
-
-            # 3) Create web call
-            web_call_data = {
-                "agent_id": agent_id,
-                "metadata": {
-                    "our_call_id": our_call_id,
-                    "driver_name": call_data.driver_name,
-                    "load_number": call_data.load_number
-                }
-            }
-            web_call_res = await client.post(
-                "https://api.retellai.com/v2/create-web-call",
-                headers=headers,
-                json=web_call_data
-            )
-            if web_call_res.status_code != 201:
-                raise HTTPException(status_code=500, detail=f"Failed to create web call: {web_call_res.status_code} - {web_call_res.text}")
-            web_call_info = web_call_res.json()
-            retell_call_id = web_call_info.get("call_id")
-            access_token = web_call_info.get("access_token")
-            if not retell_call_id or not access_token:
-                raise HTTPException(status_code=500, detail="Retell web call response missing call_id or access_token")
-
-            # Update call to in_progress
-            db_call.retell_call_id = retell_call_id
-            db_call.status = "in_progress"
-            db_call.updated_at = datetime.now()
-            await db.commit()
-            await db.refresh(db_call)
-
-            return {
-                "call_id": our_call_id,
-                "access_token": access_token,
-                "status": "initiated"
-            }
+        # 1) Reuse the cached Retell LLM/agent, provisioning them only when the config changed
+        agent_id = await ensure_retell_agent(agent_config, db)
 
+        # 2) Create web call
+        web_call_info = await create_web_call(db_call, agent_id)
     except (RequestError, TimeoutException) as e:
         err_text = f"HTTP request to Retell failed: {str(e)}"
-        db_call.status = "failed"
-        db_call.transcript = err_text
-        db_call.updated_at = datetime.now()
-        await db.commit()
-        await db.refresh(db_call)
+        await transition_call(db, db_call.id, status="failed", transcript=err_text)
         raise HTTPException(status_code=502, detail=err_text)
     except HTTPException:
         raise
     except Exception as e:
         err_text = f"Unexpected error: {str(e)}"
-        db_call.status = "failed"
-        db_call.transcript = err_text
-        db_call.updated_at = datetime.now()
-        await db.commit()
-        await db.refresh(db_call)
+        await transition_call(db, db_call.id, status="failed", transcript=err_text)
         raise HTTPException(status_code=500, detail=err_text)
 
-@app.get("/api/calls/{call_id}")
-async def get_call_details(call_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Call)
-        .where(Call.id == call_id)
-        .options(selectinload(Call.agent_config))
-    )
-    call = result.scalar_one_or_none()
-    if not call:
-        raise HTTPException(status_code=404, detail="Call not found")
-    
-    # Return call details without scenario_type
+    with trigger_call_stage_seconds.time("db_update"):
+        await transition_call(db, db_call.id, status="in_progress", retell_call_id=web_call_info["call_id"])
+
     return {
-        "id": call.id,
-        "retell_call_id": call.retell_call_id,
-        "status": call.status,
-        "transcript": call.transcript,
-        "structured_data": call.structured_data,
-        "driver_name": call.driver_name,
-        "load_number": call.load_number,
-        "created_at": call.created_at,
-        "updated_at": call.updated_at,
-        "duration_ms": call.duration_ms,
-        "agent_config": {
-            "id": call.agent_config.id if call.agent_config else None,
-            "name": call.agent_config.name if call.agent_config else "Unknown",
-            "system_prompt": call.agent_config.system_prompt if call.agent_config else "Not Available",
-            "initial_message": call.agent_config.initial_message if call.agent_config else "Not Available"
-        },
-        "voice_settings": call.agent_config.voice_settings if call.agent_config else None
+        "call_id": str(db_call.id),
+        "access_token": web_call_info["access_token"],
+        "status": "initiated"
     }
 
-@app.get("/api/calls")
-async def get_all_calls(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
+# Declared before /api/calls/{call_id} so "search" isn't taken for a call id
+@app.get("/api/calls/search")
+async def search_call_transcripts(
+    q: Optional[str] = None,
+    call_outcome: Optional[str] = None,
+    driver_status: Optional[str] = None,
+    emergency_type: Optional[str] = None,
+    status: Optional[str] = None,
+    agent_config_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """Ranked transcript search, e.g. q="I-40 blowout" with created_from for "last week".
+
+    Each item has a `snippet` from its best-matching utterance, with matches wrapped in <mark></mark>.
+    """
+    structured = {
+        field: value for field, value in (
+            ("call_outcome", call_outcome), ("driver_status", driver_status), ("emergency_type", emergency_type)
+        ) if value
+    }
+    if not (q and q.strip()) and not structured:
+        raise HTTPException(status_code=400, detail="Provide q or a structured_data filter")
+    return ORJSONResponse(await search_calls(
+        db, q.strip() if q else None, structured,
+        status=status, agent_config_id=agent_config_id, created_from=created_from, created_to=created_to, limit=limit, offset=offset
+    ))
+
+@app.get("/api/calls/{call_id}", response_model=CallDetailsResponse)
+async def get_call_details(call_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    async def load():
+        result = await db.execute(
+            select(Call)
+            .where(Call.id == call_id)
+            .options(selectinload(Call.agent_config), undefer(Call.transcript))
+        )
+        call = result.scalar_one_or_none()
+        if not call:
+            return None
+
+        return CallDetailsResponse.from_call(call).dict()
+
+    entry = await read_cache.get_or_load(("call", call_id.lower()), load, ttl=call_details_ttl)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Call not found")
+    return conditional_response(request, entry)
+
+def call_details_ttl(details: Dict[str, Any]) -> float:
+    # Finished calls no longer change; live ones may be updated by a worker process this cache doesn't hear from
+    finished = details["status"] == "failed" or (
+        details["status"] == "completed" and details["structured_data_status"] in ("done", "failed")
+    )
+    return READ_CACHE_TTL if finished else READ_CACHE_ACTIVE_TTL
+
+@app.get("/api/calls/{call_id}/transcript")
+async def get_call_transcript(
+    call_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(TRANSCRIPT_PAGE_SIZE, ge=1, le=MAX_TRANSCRIPT_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """A page of utterances (role, content, start_ms, end_ms) starting at utterance `offset`."""
+    result = await db.execute(select(Call.utterance_count).where(Call.id == call_id))
+    total = result.scalar_one_or_none()
+    if total is None:
+        raise HTTPException(status_code=404, detail="Call not found")
+    items = await load_utterances(db, call_id, offset, limit) if offset < total else []
+    next_offset = offset + len(items)
+    return ORJSONResponse({
+        "call_id": call_id,
+        "total": total,
+        "offset": offset,
+        "items": items,
+        "next_offset": next_offset if next_offset < total else None
+    })
+
+@app.get("/api/calls", response_model=CallListResponse)
+async def get_all_calls(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    agent_config_id: Optional[str] = None,
+    driver_name: Optional[str] = None,
+    load_number: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    selected = parse_call_fields(fields)
+    columns = [getattr(Call, f) for f in selected if f != "agent_config"]
+    if "agent_config" in selected:
+        # selectinload needs the foreign key on the parent row
+        columns.append(Call.agent_config_id)
+
+    query = (
         select(Call)
-        .options(selectinload(Call.agent_config))
-        .order_by(Call.created_at.desc())
+        .options(load_only(*columns))
+        .order_by(Call.created_at.desc(), Call.id.desc())
+        .limit(limit + 1)
     )
+    if "agent_config" in selected:
+        query = query.options(selectinload(Call.agent_config).load_only(AgentConfiguration.id, AgentConfiguration.name))
+    if status:
+        query = query.where(Call.status == status)
+    if agent_config_id:
+        query = query.where(Call.agent_config_id == agent_config_id)
+    if driver_name:
+        query = query.where(Call.driver_name == driver_name)
+    if load_number:
+        query = query.where(Call.load_number == load_number)
+    if created_from:
+        query = query.where(Call.created_at >= created_from)
+    if created_to:
+        query = query.where(Call.created_at < created_to)
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(Call.created_at, Call.id) < tuple_(cursor_created_at, cursor_id))
+
+    result = await db.execute(query)
     calls = result.scalars().all()
-    return [
-        {
-            "id": call.id,
-            "retell_call_id": call.retell_call_id,
-            "status": call.status,
-            "transcript": call.transcript,
-            "structured_data": call.structured_data,
-            "driver_name": call.driver_name,
-            "load_number": call.load_number,
-            "created_at": call.created_at,
-            "updated_at": call.updated_at,
-            "duration_ms": call.duration_ms,
-            "agent_config": {
-                "id": call.agent_config.id if call.agent_config else None,
-                "name": call.agent_config.name if call.agent_config else "Unknown"
+    next_cursor = None
+    if len(calls) > limit:
+        calls = calls[:limit]
+        next_cursor = encode_cursor(calls[-1])
+
+    items = []
+    for call in calls:
+        item = {}
+        for f in selected:
+            if f == "agent_config":
+                item[f] = {
+                    "id": call.agent_config.id if call.agent_config else None,
+                    "name": call.agent_config.name if call.agent_config else "Unknown"
+                }
+            else:
+                item[f] = getattr(call, f)
+        items.append(item)
+    # Plain dicts straight to orjson: validating every row through CallListItem would cost more than encoding it
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
+# Campaign Endpoints
+async def create_campaign(db: AsyncSession, agent_config_id: str, name: Optional[str], rows: List[Dict[str, str]]):
+    """Insert the campaign and all of its calls in one statement, then hand the calls to the dispatcher."""
+    if not rows:
+        raise HTTPException(status_code=400, detail="Campaign has no rows")
+    if len(rows) > CAMPAIGN_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Campaign exceeds {CAMPAIGN_MAX_ROWS} rows")
+    result = await db.execute(select(AgentConfiguration).where(AgentConfiguration.id == agent_config_id))
+    agent_config = result.scalar_one_or_none()
+    if not agent_config:
+        raise HTTPException(status_code=404, detail="Agent configuration not found")
+    if not (agent_config.voice_settings or {}).get("voice_id"):
+        raise HTTPException(status_code=400, detail="Agent configuration missing voice_id")
+
+    campaign = Campaign(agent_config_id=agent_config.id, name=name, total_calls=len(rows))
+    db.add(campaign)
+    await db.flush()
+    result = await db.execute(
+        insert(Call).returning(Call.id),
+        [
+            {
+                "agent_config_id": agent_config.id,
+                "campaign_id": campaign.id,
+                "driver_name": row["driver_name"],
+                "load_number": row["load_number"],
+                "status": "pending",
+                "state": {}
             }
-        }
-        for call in calls
+            for row in rows
+        ]
+    )
+    call_ids = [str(call_id) for call_id in result.scalars().all()]
+    await db.commit()
+
+    stats_cache.invalidate()
+    event_hub.publish("campaign_created", {"id": str(campaign.id), "total_calls": len(call_ids)})
+    campaign_dispatcher.submit(call_ids)
+    return {"campaign_id": str(campaign.id), "total_calls": len(call_ids), "status": "running"}
+
+@app.post("/api/campaigns")
+async def create_campaign_from_rows(campaign_data: CampaignCreate, db: AsyncSession = Depends(get_db)):
+    rows = [row.dict() for row in campaign_data.rows]
+    return await create_campaign(db, campaign_data.agent_config_id, campaign_data.name, rows)
+
+@app.post("/api/campaigns/upload")
+async def create_campaign_from_csv(
+    file: UploadFile = File(...),
+    agent_config_id: str = Form(...),
+    name: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """CSV upload with driver_name and load_number columns."""
+    # One byte past the limit is enough to tell the file is too large, without reading all of it into memory
+    content = await file.read(CAMPAIGN_MAX_UPLOAD_BYTES + 1)
+    if len(content) > CAMPAIGN_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"CSV exceeds {CAMPAIGN_MAX_UPLOAD_BYTES} bytes")
+    try:
+        content = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(content))
+    missing = {"driver_name", "load_number"} - set(reader.fieldnames or [])
+    if missing:
+        raise HTTPException(status_code=400, detail=f"CSV missing columns: {', '.join(sorted(missing))}")
+    rows = [
+        {"driver_name": row["driver_name"].strip(), "load_number": row["load_number"].strip()}
+        for row in reader
+        if (row.get("driver_name") or "").strip() and (row.get("load_number") or "").strip()
     ]
+    return await create_campaign(db, agent_config_id, name or file.filename, rows)
+
+@app.get("/api/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Campaign).where(Campaign.id == campaign_id))
+    campaign = result.scalar_one_or_none()
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    result = await db.execute(
+        select(Call.status, func.count())
+        .where(Call.campaign_id == campaign.id)
+        .group_by(Call.status)
+    )
+    counts = {status: count for status, count in result.all()}
+    return {
+        "id": campaign.id,
+        "name": campaign.name,
+        "agent_config_id": campaign.agent_config_id,
+        "created_at": campaign.created_at,
+        "total_calls": campaign.total_calls,
+        "status_counts": counts,
+        "status": "running" if counts.get("pending") or counts.get("dispatching") else "dispatched"
+    }
+
+@app.get("/api/stats")
+async def get_stats(db: AsyncSession = Depends(get_db)):
+    return await stats_cache.get(db)
+
+@app.get("/api/metrics/db-pool")
+async def get_db_pool_metrics():
+    """Connection pool usage: checked-out connections, overflow and callers waiting for one."""
+    return pool_status()
+
+# Scrape-time gauges for state owned by the background services
+Gauge(
+    "jobs", "Durable jobs by kind and status, as last counted by this process's job worker", labels=("kind", "status"),
+    callback=lambda: dict(job_worker.depth)
+)
+Gauge(
+    "extraction_queue_depth", "Extractions waiting per lane (urgent / realtime / batch)", labels=("lane",),
+    callback=lambda: {(lane,): depth for lane, (depth, _) in batch_scheduler.lanes.items()}
+)
+Gauge(
+    "extraction_queue_lag_seconds", "Age of the oldest waiting extraction per lane", labels=("lane",),
+    callback=lambda: {(lane,): lag for lane, (_, lag) in batch_scheduler.lanes.items()}
+)
+Gauge(
+    "campaign_queue_depth", "Campaign calls waiting to be started",
+    callback=lambda: {(): campaign_dispatcher.queue_depth}
+)
+Gauge(
+    "call_state_dirty", "Conversation states waiting to be flushed to Postgres",
+    callback=lambda: {(): state_store.dirty_count}
+)
+Gauge(
+    "db_pool_connections", "Database pool connections by state", labels=("state",),
+    callback=lambda: {
+        (state,): value for state, value in pool_status().items()
+        if state in ("checked_in", "checked_out", "overflow", "waiting")
+    }
+)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of every metric in metrics.REGISTRY."""
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/events")
+async def stream_events(request: Request, call_id: Optional[str] = None):
+    """Server-Sent Events stream of call updates, optionally limited to one call."""
+    last_event_id = request.headers.get("last-event-id")
+    sub = event_hub.subscribe(call_id)
+    backlog = []
+    if last_event_id and last_event_id.isdigit():
+        backlog = event_hub.replay(int(last_event_id), call_id)
+
+    async def event_stream():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            for event in backlog:
+                yield event.to_sse()
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield event.to_sse()
+        finally:
+            event_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def record_webhook_event(db: AsyncSession, retell_call_id: str, event: str, payload_hash: str):
+    """Add the event to the ledger in the current transaction; returns None if it was already processed."""
+    result = await db.execute(
+        pg_insert(WebhookEvent)
+        .values(retell_call_id=retell_call_id, event=event, payload_hash=payload_hash)
+        .on_conflict_do_nothing(constraint="uq_webhook_events_call_event_payload")
+        .returning(WebhookEvent.id)
+    )
+    return result.scalar_one_or_none()
 
 @app.post("/retell-webhook")
 async def retell_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         body = await request.json()
-        print(f"Webhook received: {body}")
         event = body.get("event")
         call_data = body.get("call", {})
         retell_call_id = call_data.get("call_id")
+        logger.info("Webhook received", extra={"event": event, "retell_call_id": retell_call_id})
+        logger.debug("Webhook payload", extra={"payload": body})
 
         if not retell_call_id:
-            print("Webhook missing call.call_id")
+            logger.warning("Webhook missing call.call_id", extra={"event": event})
             raise HTTPException(status_code=400, detail="Missing call_id")
 
-        # Get call record with agent_config preloaded
-        result = await db.execute(
-            select(Call)
-            .options(selectinload(Call.agent_config))  # Preload relationship
-            .where(Call.retell_call_id == retell_call_id)
-        )
-        db_call = result.scalar_one_or_none()
-        if not db_call:
-            # Fallback: Try our_call_id from metadata
-            our_call_id = call_data.get("metadata", {}).get("our_call_id")
-            if our_call_id:
-                result = await db.execute(
-                    select(Call)
-                    .options(selectinload(Call.agent_config))
-                    .where(Call.id == our_call_id)
-                )
-                db_call = result.scalar_one_or_none()
-            if not db_call:
-                print(f"Call not found for retell_call_id: {retell_call_id}, our_call_id: {our_call_id}")
-                raise HTTPException(status_code=404, detail=f"Call not found for retell_call_id: {retell_call_id}")
-
-        # Initialize RetellHandler
-        retell_handler = RetellHandler()
-
-        # Process call_ended or call_analyzed
-        if event in ["call_ended", "call_analyzed"]:
-            print(f"Processing {event} for retell_call_id: {retell_call_id}, our_call_id: {db_call.id}")
-            
-            # Unified handling: Prefer webhook data
-            transcript = call_data.get("transcript", None)
-            duration_ms = call_data.get("duration_ms", 0)
-            call_status = call_data.get("call_status", "ended")
-            
-            if not transcript and event == "call_ended":
-                headers = {"Authorization": f"Bearer {retell_api_key}"}
-                async with httpx.AsyncClient(timeout=DEFAULT_HTTPX_TIMEOUT) as client:
-                    res = await client.get(f"https://api.retellai.com/v2/get-call/{retell_call_id}", headers=headers)
-                    if res.status_code != 200:
-                        print(f"Failed to get call details: {res.status_code} - {res.text}")
-                        db_call.status = "failed"
-                        db_call.transcript = f"Failed to fetch call details: {res.status_code} - {res.text[:200]}..."
-                        db_call.updated_at = datetime.now()
-                        await db.commit()
-                        await db.refresh(db_call)
-                        raise HTTPException(status_code=502, detail=f"Failed to get call: {res.status_code}")
-                    
-                    call_info = res.json()
-                    transcript_obj = call_info.get("transcript_object", [])
-                    transcript = "\n".join([f"{ut.get('role','Agent').capitalize()}: {ut.get('content','')}" for ut in transcript_obj]) or "No transcript available"
-                    duration_ms = call_info.get("duration_ms", 0)
-            
-            # Extract structured data
-            state = getattr(db_call, "state", {}) or {}
-            structured_data = retell_handler.extract_structured_data(transcript, state)
-            
-            # Update database
-            db_call.status = "completed" if call_status == "ended" else call_status
-            db_call.transcript = transcript
-            db_call.structured_data = structured_data
-            db_call.state = state  # Persist state
-            db_call.duration_ms = duration_ms
-            db_call.updated_at = datetime.now()
-            
-            await db.commit()
-            await db.refresh(db_call)
-            print(f"Updated call {db_call.id}: status={db_call.status}, transcript_length={len(transcript)}, structured_data={structured_data}")
-        
-        else:
-            print(f"Ignored unknown event: {event}")
-            return {"status": "ignored_unknown_event"}
-
-        return {"status": "ok"}
+        payload_hash = hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return await accept_webhook_event(db, event, call_data, retell_call_id, payload_hash)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Webhook error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Webhook error", extra={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"Webhook error: {str(e)}")
 
+async def accept_webhook_event(db: AsyncSession, event: str, call_data: Dict[str, Any], retell_call_id: str, payload_hash: str):
+    """Record the event and queue a durable job for it; the transcript fetch and extraction run in a worker."""
+    our_call_id = call_data.get("metadata", {}).get("our_call_id")
+    with webhook_stage_seconds.time("lookup"):
+        call_id = (await db.execute(select(Call.id).where(Call.retell_call_id == retell_call_id))).scalar_one_or_none()
+        if not call_id and our_call_id:
+            # Fallback: Try our_call_id from metadata
+            call_id = (await db.execute(select(Call.id).where(Call.id == our_call_id))).scalar_one_or_none()
+    if not call_id:
+        logger.warning("Call not found for webhook", extra={"retell_call_id": retell_call_id, "our_call_id": our_call_id})
+        raise HTTPException(status_code=404, detail=f"Call not found for retell_call_id: {retell_call_id}")
+
+    # Process call_ended or call_analyzed
+    if event not in ["call_ended", "call_analyzed"]:
+        logger.info("Ignored unknown event", extra={"event": event, "retell_call_id": retell_call_id})
+        return {"status": "ignored_unknown_event"}
+
+    with webhook_stage_seconds.time("ledger"):
+        ledger_id = await record_webhook_event(db, retell_call_id, event, payload_hash)
+    if ledger_id is None:
+        await db.rollback()
+        logger.info("Duplicate webhook event skipped", extra={"event": event, "retell_call_id": retell_call_id})
+        return {"status": "duplicate"}
+
+    # Ledger entry and job commit together: a redelivery is either a duplicate or gets its own job
+    with webhook_stage_seconds.time("enqueue"):
+        job_id = await enqueue_job(db, "retell_webhook", {
+            "event": event,
+            "call": call_data,
+            "retell_call_id": retell_call_id,
+            "call_id": str(call_id),
+        })
+    with webhook_stage_seconds.time("commit"):
+        await db.commit()
+    logger.info("Webhook event queued", extra={"event": event, "retell_call_id": retell_call_id, "call_id": str(call_id), "job_id": str(job_id)})
+    return {"status": "queued"}
+
+@app.websocket("/llm-websocket/{call_id}")
+async def llm_websocket(websocket: WebSocket, call_id: str):
+    # Retell's custom LLM protocol; only used by agents provisioned with RETELL_RESPONSE_ENGINE=custom-llm
+    await LLMSession(websocket, call_id).run()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
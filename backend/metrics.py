@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple, Sequence
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Every metric registers itself here so /metrics can render them all
+REGISTRY: List = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Prometheus-style histogram with cumulative buckets, keyed by a tuple of label values."""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], dict] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values: str):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """Observe the duration of the with-block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], dict]:
+        """Cumulative bucket counts per label set."""
+        with self._lock:
+            result = {}
+            for key, series in self._series.items():
+                cumulative, running = [], 0
+                for count in series["counts"]:
+                    running += count
+                    cumulative.append(running)
+                result[key] = {
+                    "buckets": dict(zip([*self.buckets, float("inf")], cumulative)),
+                    "sum": series["sum"],
+                    "count": series["count"],
+                }
+            return result
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            for bound, count in series["buckets"].items():
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', _format_value(bound)))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series['count']}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *label_values: str, amount: float = 1):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Value that goes up and down, keyed by a tuple of label values.
+
+    A gauge built with `callback` is read at scrape time instead; the callback returns
+    {label_values_tuple: value}, which suits queue depths and pool sizes owned by other objects.
+    """
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), callback: Callable[[], Dict[Tuple[str, ...], float]] = None):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def set(self, value: float, *label_values: str):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *label_values: str, amount: float = 1):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    @contextmanager
+    def track_inprogress(self, *label_values: str):
+        self.inc(*label_values)
+        try:
+            yield
+        finally:
+            self.dec(*label_values)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        if self.callback is not None:
+            return {tuple(str(v) for v in key): value for key, value in self.callback().items()}
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+def render_latest() -> str:
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+retell_request_seconds = Histogram(
+    "retell_request_seconds",
+    "Latency of Retell API requests",
+    labels=("endpoint", "status"),
+)
+
+extraction_cache_requests_total = Counter(
+    "extraction_cache_requests_total",
+    "Extraction cache lookups by tier and result",
+    labels=("extraction_type", "tier", "result"),
+)
+
+trigger_call_stage_seconds = Histogram(
+    "trigger_call_stage_seconds",
+    "Latency of each stage of starting a call (trigger_call and campaign dispatch)",
+    labels=("stage",),
+)
+
+webhook_stage_seconds = Histogram(
+    "webhook_stage_seconds",
+    "Latency of each stage of handling a Retell webhook and its background extraction",
+    labels=("stage",),
+)
+
+openai_tokens_total = Counter(
+    "openai_tokens_total",
+    "OpenAI tokens used, by extraction type and prompt/completion",
+    labels=("extraction_type", "kind"),
+)
+
+calls_in_flight = Gauge(
+    "calls_in_flight",
+    "Calls currently being started, handled by a webhook or extracted",
+    labels=("stage",),
+)
+
+llm_turn_seconds = Histogram(
+    "llm_turn_seconds",
+    "Time from a Retell response_required to the first content sent back, by local/fallback path",
+    labels=("path",),
+    # Local replies are sub-millisecond, so the default buckets would put them all in the first one
+    buckets=(0.0005, 0.001, 0.0025) + DEFAULT_LATENCY_BUCKETS,
+)
+
+job_seconds = Histogram(
+    "job_seconds",
+    "Duration of durable jobs by kind and outcome (done / retry / dead / deferred)",
+    labels=("kind", "outcome"),
+)
+
+read_cache_requests_total = Counter(
+    "read_cache_requests_total",
+    "API read cache lookups by namespace and result, plus 304 responses",
+    labels=("namespace", "result"),
+)
+
+extraction_lag_seconds = Histogram(
+    "extraction_lag_seconds",
+    "Time from queueing a call's extraction to saving its structured data, by lane (urgent / realtime / batch)",
+    labels=("lane",),
+    # The batch lane can take up to the Batch API's 24h completion window
+    buckets=(0.5, 1, 2.5, 5, 15, 60, 300, 900, 3600, 4 * 3600, 12 * 3600, 24 * 3600),
+)
@@ -0,0 +1,56 @@
+"""provisioning cache, extraction status, webhook ledger and extraction cache
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("agent_configurations", sa.Column("keyword_overrides", sa.JSON(), nullable=True))
+    op.add_column("agent_configurations", sa.Column("retell_llm_id", sa.String(), nullable=True))
+    op.add_column("agent_configurations", sa.Column("retell_agent_id", sa.String(), nullable=True))
+    op.add_column("agent_configurations", sa.Column("provisioned_hash", sa.String(length=64), nullable=True))
+    op.add_column("calls", sa.Column("structured_data_status", sa.String(), nullable=True))
+
+    op.create_table(
+        "webhook_events",
+        sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("retell_call_id", sa.String(), nullable=False),
+        sa.Column("event", sa.String(), nullable=False),
+        sa.Column("payload_hash", sa.String(length=64), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("retell_call_id", "event", "payload_hash", name="uq_webhook_events_call_event_payload"),
+    )
+    op.create_table(
+        "extraction_cache",
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("extraction_type", sa.String(), nullable=False),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("extraction_cache")
+    op.drop_table("webhook_events")
+    op.drop_column("calls", "structured_data_status")
+    op.drop_column("agent_configurations", "provisioned_hash")
+    op.drop_column("agent_configurations", "retell_agent_id")
+    op.drop_column("agent_configurations", "retell_llm_id")
+    op.drop_column("agent_configurations", "keyword_overrides")
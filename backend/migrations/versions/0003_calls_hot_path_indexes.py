@@ -0,0 +1,38 @@
+"""indexes for webhook lookups and call listings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:10:00
+
+Indexes are built CONCURRENTLY so a live calls table keeps taking writes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_calls_retell_call_id", ["retell_call_id"], True),
+    ("ix_calls_created_at_id", ["created_at", "id"], False),
+    ("ix_calls_status_created_at", ["status", "created_at"], False),
+    ("ix_calls_agent_config_id", ["agent_config_id"], False),
+    ("ix_calls_driver_name", ["driver_name"], False),
+    ("ix_calls_load_number", ["load_number"], False),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns, unique in INDEXES:
+            op.create_index(name, "calls", columns, unique=unique, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="calls", postgresql_concurrently=True, if_exists=True)
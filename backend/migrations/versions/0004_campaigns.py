@@ -0,0 +1,41 @@
+"""campaigns for bulk call dispatch
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:15:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "campaigns",
+        sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("agent_config_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("total_calls", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["agent_config_id"], ["agent_configurations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.add_column("calls", sa.Column("campaign_id", postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key("calls_campaign_id_fkey", "calls", "campaigns", ["campaign_id"], ["id"])
+    op.create_index("ix_calls_campaign_id_status", "calls", ["campaign_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_calls_campaign_id_status", table_name="calls")
+    op.drop_constraint("calls_campaign_id_fkey", "calls", type_="foreignkey")
+    op.drop_column("calls", "campaign_id")
+    op.drop_table("campaigns")
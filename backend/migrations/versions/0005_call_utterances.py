@@ -0,0 +1,93 @@
+"""call_utterances table; move flattened transcripts off the calls row
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 11:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "call_utterances",
+        sa.Column("call_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("start_ms", sa.Integer(), nullable=True),
+        sa.Column("end_ms", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["call_id"], ["calls.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("call_id", "seq"),
+    )
+    op.add_column("calls", sa.Column("transcript_hash", sa.String(length=64), nullable=True))
+    op.add_column("calls", sa.Column("utterance_count", sa.Integer(), server_default="0", nullable=False))
+
+    # Split completed calls' "Role: content" transcripts into utterances (no timings for old calls), parsed
+    # like transcripts.utterances_from_text: a line starts an utterance when the text before its first ": " is
+    # a role without spaces; other non-blank lines continue the previous utterance. The transcripts are kept
+    # until 0009, once the split has been checked.
+    op.execute(
+        """
+        INSERT INTO call_utterances (call_id, seq, role, content)
+        SELECT call_id, utterance - 1, max(role), string_agg(content, E'\\n' ORDER BY ord)
+        FROM (
+            SELECT call_id, ord, line, is_head,
+                   sum(is_head::int) OVER (PARTITION BY call_id ORDER BY ord) AS utterance,
+                   CASE WHEN is_head THEN lower(split_part(line, ': ', 1)) END AS role,
+                   CASE WHEN is_head THEN substr(line, strpos(line, ': ') + 2) ELSE line END AS content
+            FROM (
+                SELECT c.id AS call_id, t.ord, t.line,
+                       strpos(t.line, ': ') > 1 AND strpos(split_part(t.line, ': ', 1), ' ') = 0 AS is_head
+                FROM calls c
+                CROSS JOIN LATERAL regexp_split_to_table(c.transcript, E'\\n') WITH ORDINALITY AS t(line, ord)
+                WHERE c.status = 'completed'
+                  AND c.transcript IS NOT NULL
+                  AND c.transcript <> 'No transcript available'
+            ) lines
+        ) numbered
+        -- Lines before the first role line, and blank continuation lines, are dropped
+        WHERE utterance > 0 AND (is_head OR line ~ '\\S')
+        GROUP BY call_id, utterance
+        """
+    )
+    # Same hash the webhook computes, so redelivered events for old calls aren't re-extracted
+    op.execute(
+        """
+        UPDATE calls SET transcript_hash = encode(sha256(convert_to(transcript, 'UTF8')), 'hex')
+        WHERE status = 'completed' AND transcript IS NOT NULL
+        """
+    )
+    op.execute(
+        """
+        UPDATE calls c SET utterance_count = u.n
+        FROM (SELECT call_id, count(*) AS n FROM call_utterances GROUP BY call_id) u
+        WHERE u.call_id = c.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE calls c SET transcript = coalesce(c.transcript, u.text)
+        FROM (
+            SELECT call_id, string_agg(initcap(role) || ': ' || content, E'\\n' ORDER BY seq) AS text
+            FROM call_utterances GROUP BY call_id
+        ) u
+        WHERE u.call_id = c.id
+        """
+    )
+    op.drop_column("calls", "utterance_count")
+    op.drop_column("calls", "transcript_hash")
+    op.drop_table("call_utterances")
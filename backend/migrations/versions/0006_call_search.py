@@ -0,0 +1,54 @@
+"""full-text search over utterances and indexes on extracted fields
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 12:30:00
+
+Converting calls.structured_data to jsonb rewrites the table under an exclusive lock; the
+expression indexes on it are then built CONCURRENTLY.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STRUCTURED_FIELDS = ["call_outcome", "driver_status", "emergency_type"]
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "calls", "structured_data",
+        type_=postgresql.JSONB(), existing_type=sa.JSON(), postgresql_using="structured_data::jsonb"
+    )
+    op.add_column(
+        "call_utterances",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed("to_tsvector('english', content)", persisted=True)),
+    )
+    op.create_index("ix_call_utterances_search_vector", "call_utterances", ["search_vector"], postgresql_using="gin")
+
+    with op.get_context().autocommit_block():
+        for field in STRUCTURED_FIELDS:
+            op.create_index(
+                f"ix_calls_sd_{field}", "calls", [sa.text(f"(structured_data ->> '{field}')")],
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for field in reversed(STRUCTURED_FIELDS):
+            op.drop_index(f"ix_calls_sd_{field}", table_name="calls", postgresql_concurrently=True, if_exists=True)
+
+    op.drop_index("ix_call_utterances_search_vector", table_name="call_utterances")
+    op.drop_column("call_utterances", "search_vector")
+    op.alter_column(
+        "calls", "structured_data",
+        type_=sa.JSON(), existing_type=postgresql.JSONB(), postgresql_using="structured_data::json"
+    )
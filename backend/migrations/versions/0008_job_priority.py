@@ -0,0 +1,36 @@
+"""job priority, claimed highest first
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("priority", sa.SmallInteger(), server_default="0", nullable=False))
+    # The claim scan orders by priority first, so the partial index leads with it
+    op.drop_index("ix_jobs_claimable", table_name="jobs")
+    op.create_index(
+        "ix_jobs_claimable", "jobs", [sa.text("priority DESC"), "visible_at"],
+        postgresql_where=sa.text("status IN ('queued', 'running')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_claimable", table_name="jobs")
+    op.create_index(
+        "ix_jobs_claimable", "jobs", ["visible_at"],
+        postgresql_where=sa.text("status IN ('queued', 'running')")
+    )
+    op.drop_column("jobs", "priority")
@@ -0,0 +1,40 @@
+"""clear transcripts that 0005 split into call_utterances
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 19:00:00
+
+Kept apart from 0005 so the split can be checked (and 0005 re-run) before the flattened copies go.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        UPDATE calls SET transcript = NULL
+        WHERE utterance_count > 0 AND transcript IS NOT NULL AND transcript <> 'No transcript available'
+        """
+    )
+
+
+def downgrade() -> None:
+    # Rebuilt in the "Role: content" form transcripts.flatten produces
+    op.execute(
+        """
+        UPDATE calls c SET transcript = u.text
+        FROM (
+            SELECT call_id, string_agg(initcap(role) || ': ' || content, E'\\n' ORDER BY seq) AS text
+            FROM call_utterances GROUP BY call_id
+        ) u
+        WHERE u.call_id = c.id AND c.transcript IS NULL
+        """
+    )
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, String, Text, JSON, DateTime, ForeignKey, func, Integer
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, JSON, DateTime, ForeignKey, func, Integer, SmallInteger, Index, UniqueConstraint, Computed, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import hashlib
+import uuid
+import json
 from pydantic import BaseModel as PydanticBaseModel
 
 Base = declarative_base()
@@ -24,23 +27,58 @@ class AgentConfiguration(Base):
         "ambient_sound": None,
         "ambient_sound_volume": 0.5
     })
+    # Per-category keyword lists overriding keyword_matcher.DEFAULT_KEYWORDS, e.g. {"emergency": [...]}
+    keyword_overrides = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Retell provisioning cache: LLM/agent created for the content identified by provisioned_hash
+    retell_llm_id = Column(String, nullable=True)
+    retell_agent_id = Column(String, nullable=True)
+    provisioned_hash = Column(String(64), nullable=True)
+
     # Relationship
     calls = relationship("Call", back_populates="agent_config")
 
+    def content_hash(self, response_engine: str = "retell-llm") -> str:
+        """Hash of the fields that end up in the Retell LLM/agent definitions."""
+        fields = {
+            "system_prompt": self.system_prompt,
+            "initial_message": self.initial_message,
+            "voice_settings": self.voice_settings or {},
+        }
+        # Only non-default engines are hashed, so agents provisioned before the switch stay cached
+        if response_engine != "retell-llm":
+            fields["response_engine"] = response_engine
+        payload = json.dumps(
+            fields,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def invalidate_provisioning(self):
+        self.retell_llm_id = None
+        self.retell_agent_id = None
+        self.provisioned_hash = None
+
 class Call(Base):
     __tablename__ = "calls"
 
     id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
     agent_config_id = Column(UUID(as_uuid=True), ForeignKey("agent_configurations.id"), nullable=False)
+    campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id"), nullable=True)
     driver_name = Column(String, nullable=False)
     load_number = Column(String, nullable=False)
     retell_call_id = Column(String, nullable=True)
     status = Column(String, default="pending", nullable=False)
-    transcript = Column(Text, nullable=True)
-    structured_data = Column(JSON, nullable=True)
+    # Utterances live in call_utterances; this only holds short notes (failure reasons, "No transcript available")
+    # and transcripts of calls that weren't completed before migration 0005. Deferred so call listings never read it.
+    transcript = deferred(Column(Text, nullable=True))
+    transcript_hash = Column(String(64), nullable=True)  # sha256 of the flattened transcript last extracted
+    utterance_count = Column(Integer, nullable=False, default=0, server_default="0")
+    structured_data = Column(JSONB, nullable=True)
+    structured_data_status = Column(String, nullable=True)  # pending / done / failed
     state = Column(JSON, nullable=False, default={})  # Added to persist conversation state
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -49,6 +87,95 @@ class Call(Base):
     # Relationship
     agent_config = relationship("AgentConfiguration", back_populates="calls")
 
+    # Webhook lookups by retell_call_id, plus the keyset-paginated, filtered call listing
+    __table_args__ = (
+        Index("ix_calls_retell_call_id", "retell_call_id", unique=True),
+        Index("ix_calls_created_at_id", "created_at", "id"),
+        Index("ix_calls_status_created_at", "status", "created_at"),
+        Index("ix_calls_agent_config_id", "agent_config_id"),
+        Index("ix_calls_driver_name", "driver_name"),
+        Index("ix_calls_load_number", "load_number"),
+        Index("ix_calls_campaign_id_status", "campaign_id", "status"),
+        # Search filters on extracted fields
+        Index("ix_calls_sd_call_outcome", text("(structured_data ->> 'call_outcome')")),
+        Index("ix_calls_sd_driver_status", text("(structured_data ->> 'driver_status')")),
+        Index("ix_calls_sd_emergency_type", text("(structured_data ->> 'emergency_type')")),
+    )
+
+class CallUtterance(Base):
+    """One turn of a call transcript, paged by (call_id, seq)."""
+    __tablename__ = "call_utterances"
+
+    call_id = Column(UUID(as_uuid=True), ForeignKey("calls.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    start_ms = Column(Integer, nullable=True)
+    end_ms = Column(Integer, nullable=True)
+    # Kept up to date by Postgres whenever utterances are written
+    search_vector = deferred(Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True)))
+
+    __table_args__ = (
+        Index("ix_call_utterances_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+class Campaign(Base):
+    """A bulk run of calls for one AgentConfiguration, dispatched at a controlled rate."""
+    __tablename__ = "campaigns"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+    agent_config_id = Column(UUID(as_uuid=True), ForeignKey("agent_configurations.id"), nullable=False)
+    name = Column(String, nullable=True)
+    total_calls = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class WebhookEvent(Base):
+    """Ledger of processed Retell webhooks, used to drop redeliveries and duplicate events."""
+    __tablename__ = "webhook_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+    retell_call_id = Column(String, nullable=False)
+    event = Column(String, nullable=False)
+    payload_hash = Column(String(64), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("retell_call_id", "event", "payload_hash", name="uq_webhook_events_call_event_payload"),
+    )
+
+class ExtractionCacheEntry(Base):
+    """Persistent tier of the extraction cache, keyed by hash(prompt, model, transcript)."""
+    __tablename__ = "extraction_cache"
+
+    key = Column(String(64), primary_key=True)
+    extraction_type = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Job(Base):
+    """Durable background job, claimed by workers with FOR UPDATE SKIP LOCKED (see jobs.py)."""
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String, nullable=False, default="queued", server_default="queued")  # queued / running / dead
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False)
+    # Higher is claimed first among claimable jobs
+    priority = Column(SmallInteger, nullable=False, default=0, server_default="0")
+    # Next time the job may be claimed: the retry time when queued, the visibility timeout when running
+    visible_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_jobs_claimable", priority.desc(), "visible_at", postgresql_where=text("status IN ('queued', 'running')")),
+    )
+
 # Pydantic Models for API
 class AgentConfigurationPydantic(PydanticBaseModel):
     name: str
@@ -63,8 +190,76 @@ class AgentConfigurationPydantic(PydanticBaseModel):
         "ambient_sound": None,
         "ambient_sound_volume": 0.5
     }
+    keyword_overrides: Optional[Dict[str, List[str]]] = None
 
 class CallTrigger(PydanticBaseModel):
     agent_config_id: str
     driver_name: str
-    load_number: str
\ No newline at end of file
+    load_number: str
+
+class CampaignRow(PydanticBaseModel):
+    driver_name: str
+    load_number: str
+
+class CampaignCreate(PydanticBaseModel):
+    agent_config_id: str
+    name: Optional[str] = None
+    rows: List[CampaignRow]
+
+# Response models. Listings are encoded straight to orjson (see main.get_all_calls), so these
+# document their shape; call details are built and validated through CallDetailsResponse.
+class AgentConfigSummary(PydanticBaseModel):
+    id: Optional[uuid.UUID] = None
+    name: str = "Unknown"
+
+    class Config:
+        orm_mode = True
+
+class CallListItem(PydanticBaseModel):
+    """One row of GET /api/calls; only the fields= projection (plus id and created_at) is present."""
+    id: uuid.UUID
+    created_at: datetime
+    retell_call_id: Optional[str]
+    status: Optional[str]
+    transcript: Optional[str]
+    structured_data: Optional[Dict[str, Any]]
+    structured_data_status: Optional[str]
+    driver_name: Optional[str]
+    load_number: Optional[str]
+    updated_at: Optional[datetime]
+    duration_ms: Optional[int]
+    agent_config: Optional[AgentConfigSummary]
+
+class CallListResponse(PydanticBaseModel):
+    items: List[CallListItem]
+    next_cursor: Optional[str] = None
+
+class AgentConfigDetails(AgentConfigSummary):
+    system_prompt: str = "Not Available"
+    initial_message: str = "Not Available"
+
+class CallDetailsResponse(PydanticBaseModel):
+    id: uuid.UUID
+    retell_call_id: Optional[str]
+    status: str
+    transcript: Optional[str]
+    utterance_count: int
+    structured_data: Optional[Dict[str, Any]]
+    structured_data_status: Optional[str]
+    driver_name: str
+    load_number: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    duration_ms: Optional[int]
+    agent_config: AgentConfigDetails
+    voice_settings: Optional[Dict[str, Any]]
+
+    @classmethod
+    def from_call(cls, call: Call) -> "CallDetailsResponse":
+        """From a Call loaded with its agent_config and transcript."""
+        config = call.agent_config
+        return cls(
+            **{field: getattr(call, field) for field in cls.__fields__ if field not in ("agent_config", "voice_settings")},
+            agent_config=AgentConfigDetails.from_orm(config) if config else AgentConfigDetails(),
+            voice_settings=config.voice_settings if config else None,
+        )
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from metrics import read_cache_requests_total
+
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "2000"))
+# Bounds staleness for writes made by other processes, which can't invalidate this one's entries
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "60"))
+READ_CACHE_ACTIVE_TTL = float(os.getenv("READ_CACHE_ACTIVE_TTL", "2"))
+
+
+class CacheEntry:
+    """A cached value; its JSON body and ETag are built on first use and reused by every hit.
+
+    The ETag is weak: CompressionMiddleware may send the body gzip or brotli encoded, and a strong
+    ETag must differ between representations that aren't byte-for-byte identical.
+    """
+
+    def __init__(self, value: Any, ttl: float):
+        self.value = value
+        self.expires_at = time.monotonic() + ttl
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.monotonic()
+
+    def serialized(self) -> Tuple[bytes, str]:
+        if self._body is None:
+            # orjson handles datetimes and UUIDs natively; jsonable_encoder only sees what it can't
+            self._body = orjson.dumps(self.value, default=jsonable_encoder)
+            self._etag = 'W/"' + hashlib.sha256(self._body).hexdigest()[:32] + '"'
+        return self._body, self._etag
+
+
+class ReadCache:
+    """Versioned read-through LRU with per-entry TTL for API responses.
+
+    Every invalidation bumps the version, and a load only fills the cache if no invalidation
+    happened while it ran, so a read racing a write can't cache the pre-write value.
+    """
+
+    def __init__(self, max_entries: int = READ_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+
+    async def get_or_load(
+        self,
+        key: tuple,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[Callable[[Any], float]] = None,
+    ) -> Optional[CacheEntry]:
+        """Cached entry for key, calling loader on a miss; None (not cached) when loader returns None."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.fresh:
+            self._entries.move_to_end(key)
+            read_cache_requests_total.inc(key[0], "hit")
+            return entry
+        read_cache_requests_total.inc(key[0], "miss")
+
+        version = self.version
+        value = await loader()
+        if value is None:
+            return None
+        entry = CacheEntry(value, ttl(value) if ttl else READ_CACHE_TTL)
+        if version == self.version:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *keys: tuple):
+        self.version += 1
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def invalidate_namespace(self, namespace: str):
+        self.version += 1
+        for key in [k for k in self._entries if k[0] == namespace]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison: only the opaque tags are compared
+    candidates = [_opaque_tag(tag) for tag in header.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in candidates
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def conditional_response(request: Request, entry: CacheEntry) -> Response:
+    """200 with the cached body, or an empty 304 when the client already has this ETag."""
+    body, etag = entry.serialized()
+    # no-cache: clients may store the body but must revalidate it on every use
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        read_cache_requests_total.inc("http", "not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+read_cache = ReadCache()
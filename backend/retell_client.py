@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+import httpx
+
+from metrics import retell_request_seconds
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetellAPIError(Exception):
+    def __init__(self, endpoint: str, status_code: int, text: str):
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.text = text
+        super().__init__(f"{status_code} - {text}")
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds from now, in either its delay-seconds or HTTP-date form; None if absent or unreadable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetellClient:
+    """Long-lived, pooled HTTP client for the Retell API. Opened on first use, closed by services.close()."""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        timeout: float = None,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        keepalive_expiry: float = None,
+        http2: bool = None,
+        max_retries: int = None,
+        retry_base_delay: float = None,
+        max_backoff: float = None,
+    ):
+        self.api_key = api_key or os.getenv("RETELL_API_KEY")
+        self.base_url = base_url or os.getenv("RETELL_BASE_URL", "https://api.retellai.com")
+        self.timeout = timeout or float(os.getenv("RETELL_TIMEOUT", "10.0"))
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("RETELL_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=max_keepalive_connections or int(os.getenv("RETELL_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=keepalive_expiry or float(os.getenv("RETELL_KEEPALIVE_EXPIRY", "30")),
+        )
+        self.http2 = http2 if http2 is not None else os.getenv("RETELL_HTTP2", "false").lower() == "true"
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("RETELL_MAX_RETRIES", "3"))
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else float(os.getenv("RETELL_RETRY_BASE_DELAY", "0.25"))
+        # Longest wait before a retry; a Retry-After beyond it fails the request instead of stalling the caller
+        self.max_backoff = max_backoff if max_backoff is not None else float(os.getenv("RETELL_MAX_BACKOFF", "5.0"))
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        self._open()
+
+    def _open(self) -> httpx.AsyncClient:
+        if self._client is not None:
+            return self._client
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("RETELL_HTTP2 requested but the h2 package is not installed; using HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+        )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Opened on first use when nothing called start(); close() is still up to the owner
+        return self._open()
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """Seconds to wait before retrying, or None when the server's Retry-After is longer than max_backoff."""
+        retry_after = retry_after_seconds(response.headers.get("retry-after")) if response is not None else None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+        return min(self.max_backoff, random.uniform(0, self.retry_base_delay * (2 ** attempt)))
+
+    async def _request(self, method: str, path: str, endpoint: str, expected_status: int, idempotent: bool, **kwargs) -> Dict[str, Any]:
+        """Send a request, retrying 429s always and 5xx/transport errors only for idempotent calls."""
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                retell_request_seconds.observe(time.perf_counter() - start, endpoint, "error")
+                # Connect failures never reached Retell, so they are safe to retry even for POSTs
+                retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                logger.warning("Retell request failed, retrying", extra={"endpoint": endpoint, "attempt": attempt + 1, "error": repr(e)})
+                await asyncio.sleep(self._retry_delay(attempt))
+                attempt += 1
+                continue
+            retell_request_seconds.observe(time.perf_counter() - start, endpoint, response.status_code)
+
+            if response.status_code == expected_status:
+                return response.json()
+            retryable = response.status_code == 429 or (idempotent and response.status_code in RETRYABLE_STATUS_CODES)
+            if not retryable or attempt >= self.max_retries:
+                raise RetellAPIError(endpoint, response.status_code, response.text)
+            delay = self._retry_delay(attempt, response)
+            if delay is None:
+                logger.warning(
+                    "Retell asked for a retry later than RETELL_MAX_BACKOFF, giving up",
+                    extra={"endpoint": endpoint, "status_code": response.status_code, "retry_after": response.headers.get("retry-after")}
+                )
+                raise RetellAPIError(endpoint, response.status_code, response.text)
+            logger.warning("Retell request failed, retrying", extra={"endpoint": endpoint, "attempt": attempt + 1, "status_code": response.status_code})
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def create_retell_llm(self, llm_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("POST", "/create-retell-llm", "create-retell-llm", 201, idempotent=False, json=llm_data)
+
+    async def create_agent(self, agent_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("POST", "/create-agent", "create-agent", 201, idempotent=False, json=agent_data)
+
+    async def create_web_call(self, web_call_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("POST", "/v2/create-web-call", "create-web-call", 201, idempotent=False, json=web_call_data)
+
+    async def get_call(self, retell_call_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/v2/get-call/{retell_call_id}", "get-call", 200, idempotent=True)
+
+
+retell_client = RetellClient()
@@ -1,30 +1,85 @@
 import re
 import os
-from typing import Dict, Any
-import openai
-from openai import OpenAI
-from dotenv import load_dotenv
+import logging
+import asyncio
+import copy
+import json
+from typing import TYPE_CHECKING, Awaitable, Dict, Any, List, Optional
 
-# Load environment variables
-load_dotenv()
+import settings  # noqa: F401 - loads .env
+from keyword_matcher import get_matcher
+from metrics import openai_tokens_total
+from transcript_chunks import (
+    EXTRACTION_CHUNK_THRESHOLD_TOKENS, MERGERS, estimate_tokens, relevant_windows, split_windows
+)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_MODEL = "gpt-4o-mini"
+EXTRACTION_WINDOW_CONCURRENCY = int(os.getenv("EXTRACTION_WINDOW_CONCURRENCY", "4"))
+
+# Keyword categories process_check_in has a scripted reply for
+SCRIPTED_CATEGORIES = {"emergency", "repeat", "in_transit", "arrived", "delayed"}
+
+EMERGENCY_EXTRACTION_PROMPT = (
+    "You are an assistant that extracts structured data from a call transcript in an emergency scenario. "
+    "Return a JSON object with the following fields:\n"
+    "- call_outcome: Always 'Emergency Detected'\n"
+    "- emergency_type: One of 'Accident', 'Breakdown', 'Medical', or 'Other'\n"
+    "- emergency_location: The specific location mentioned (e.g., 'M2 Road, Lahore') or 'Not specified'\n"
+    "- escalation_status: Always 'Escalation Flagged'\n"
+    "Analyze the transcript and extract the most relevant information. If no clear information is available, use 'Not specified' for location and 'Other' for emergency_type."
+)
+
+CHECK_IN_EXTRACTION_PROMPT = (
+    "You are an assistant that extracts structured data from a call transcript in a driver check-in scenario. "
+    "Return a JSON object with the following fields:\n"
+    "- call_outcome: One of 'In-Transit Update', 'Arrival Confirmation', or 'Status Unknown'\n"
+    "- driver_status: One of 'Driving', 'Delayed', 'Arrived', or 'Unknown'\n"
+    "- current_location: The specific location mentioned (e.g., 'M2 Road, Lahore') or 'Not specified'\n"
+    "- eta: The estimated time of arrival (e.g., 'Tomorrow, 8:00 AM') or 'Not specified'\n"
+    "Analyze the transcript and extract the most relevant information. If no clear information is available, use 'Status Unknown' for call_outcome, 'Unknown' for driver_status, and 'Not specified' for other fields."
+)
 
 class RetellHandler:
-    def __init__(self):
-        self.emergency_keywords = [
-            "accident", "crash", "blowout", "emergency", "hurt", "injured",
-            "breakdown", "broke down", "fire", "medical", "help", "911", "issue"
-        ]
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        if not os.getenv("OPENAI_API_KEY"):
-            raise ValueError("OPENAI_API_KEY environment variable not set")
+    def __init__(self, openai_client: "AsyncOpenAI", cache=None, keyword_overrides: Optional[Dict[str, List[str]]] = None):
+        # The process-wide client from services; its connection pool is shared by every handler copy
+        self.openai_client = openai_client
+        # Optional ExtractionCache; repeated transcripts skip the OpenAI round-trip
+        self.cache = cache
+        self.matcher = get_matcher(keyword_overrides)
+
+    @property
+    def emergency_keywords(self) -> List[str]:
+        return self.matcher.categories.get("emergency", [])
+
+    def with_keywords(self, keyword_overrides: Optional[Dict[str, List[str]]]) -> "RetellHandler":
+        """Copy sharing this handler's clients and cache, matching an AgentConfiguration's keywords."""
+        handler = copy.copy(self)
+        handler.matcher = get_matcher(keyword_overrides)
+        return handler
+
+    @staticmethod
+    def record_usage(extraction_type: str, response):
+        usage = getattr(response, "usage", None)
+        if usage:
+            openai_tokens_total.inc(extraction_type, "prompt", amount=usage.prompt_tokens)
+            openai_tokens_total.inc(extraction_type, "completion", amount=usage.completion_tokens)
 
     def detect_emergency(self, message: str) -> bool:
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in self.emergency_keywords)
+        return self.matcher.matches(message, "emergency")
 
-    def handle_emergency(self, message: str, state: Dict) -> Dict:
+    async def handle_emergency(self, message: str, state: Dict, background: Optional[List[Awaitable]] = None) -> Dict:
+        """Emergency flow: ask for the location, then log it.
+
+        With `background`, classifying the emergency type is left to the caller to await after the
+        reply is sent (the reply doesn't depend on it); otherwise it's awaited here.
+        """
         if state.get("emergency_step") == "ask_location":
-            location = self.extract_location(message)
+            location = await self.extract_location(message)
             state["emergency_location"] = location
             state["emergency_detected"] = True
             return {
@@ -33,16 +88,23 @@ class RetellHandler:
             }
         else:
             state["emergency_step"] = "ask_location"
-            state["emergency_type"] = self.determine_emergency_type(message)
             state["emergency_detected"] = True
+            classify = self._classify_emergency(message, state)
+            if background is None:
+                await classify
+            else:
+                background.append(classify)
             return {
                 "response": "I understand this is an emergency. Please stay safe. Can you tell me your exact location? What mile marker or exit are you near?",
                 "end_conversation": False
             }
 
-    def determine_emergency_type(self, message: str) -> str:
+    async def _classify_emergency(self, message: str, state: Dict):
+        state["emergency_type"] = await self.determine_emergency_type(message)
+
+    async def determine_emergency_type(self, message: str) -> str:
         try:
-            response = self.openai_client.chat.completions.create(
+            response = await self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -57,15 +119,16 @@ class RetellHandler:
                 ],
                 temperature=0.2
             )
+            self.record_usage("emergency_type", response)
             emergency_type = response.choices[0].message.content.strip()
             return emergency_type if emergency_type in ["Accident", "Breakdown", "Medical", "Other"] else "Other"
         except Exception as e:
-            print(f"OpenAI error in determine_emergency_type: {e}")
+            logger.warning("OpenAI error in determine_emergency_type", extra={"error": str(e)})
             return "Other"
 
-    def extract_location(self, message: str) -> str:
+    async def extract_location(self, message: str) -> str:
         try:
-            response = self.openai_client.chat.completions.create(
+            response = await self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -80,17 +143,19 @@ class RetellHandler:
                 ],
                 temperature=0.2
             )
+            self.record_usage("location", response)
             location = response.choices[0].message.content.strip()
             return location if location and location != "" else "Not specified"
         except Exception as e:
-            print(f"OpenAI error in extract_location: {e}")
+            logger.warning("OpenAI error in extract_location", extra={"error": str(e)})
             return "Not specified"
 
-    def process_check_in(self, message: str, history: list, state: Dict) -> str:
-        lower = message.lower()
+    async def process_check_in(self, message: str, history: list, state: Dict) -> str:
+        # One pass over the message finds every keyword category
+        categories = self.matcher.find_categories(message)
         # Prioritize emergency detection
-        if self.detect_emergency(message):
-            return self.handle_emergency(message, state)["response"]
+        if "emergency" in categories:
+            return (await self.handle_emergency(message, state))["response"]
 
         if len(message.split()) <= 2:
             state["short_responses"] = state.get("short_responses", 0) + 1
@@ -99,73 +164,59 @@ class RetellHandler:
             return "I need more details. Are you driving, delayed, or arrived?"
         state["short_responses"] = 0
 
-        if "repeat" in lower:
+        if "repeat" in categories:
             return "Can you repeat your status? Are you in transit, delayed, or arrived?"
 
-        if any(w in lower for w in ["driving", "transit"]):
+        if "in_transit" in categories:
             return "Got it, you're in transit. What's your current location and ETA?"
 
-        if any(w in lower for w in ["arrived", "destination"]):
+        if "arrived" in categories:
             return "Great, you've arrived. Is the delivery complete?"
 
-        if any(w in lower for w in ["delayed", "late"]):
+        if "delayed" in categories:
             return "Understood, delayed. Current location and new ETA?"
 
         return "Can you clarify your status?"
 
-    def process_conversation(self, last_message: str, history: list, state: Dict) -> Dict:
-        if self.detect_emergency(last_message):
+    def handles_locally(self, message: str, state: Dict) -> bool:
+        """True when process_conversation has a scripted answer; otherwise the turn needs the LLM."""
+        if state.get("emergency_step") or len(message.split()) <= 2:
+            return True
+        return bool(self.matcher.find_categories(message) & SCRIPTED_CATEGORIES)
+
+    async def process_conversation(self, last_message: str, history: list, state: Dict, background: Optional[List[Awaitable]] = None) -> Dict:
+        # The location answer usually has no emergency keyword, so an open emergency keeps its own flow
+        if state.get("emergency_step") == "ask_location" or self.detect_emergency(last_message):
             state["emergency_detected"] = True
-            return self.handle_emergency(last_message, state)
+            return await self.handle_emergency(last_message, state, background)
 
-        response = self.process_check_in(last_message, history, state)
+        response = await self.process_check_in(last_message, history, state)
         return {"response": response, "end_conversation": "Goodbye" in response}
 
-    def extract_structured_data(self, transcript: str, state: Dict = None) -> Dict[str, Any]:
+    async def extract_structured_data(self, transcript: str, state: Dict = None, raise_errors: bool = False) -> Dict[str, Any]:
         try:
             if not state:
                 state = {}
             # Check for emergency in transcript or state
             if state.get("emergency_detected") or self.detect_emergency(transcript):
                 state["emergency_detected"] = True
-                return self.extract_emergency_data(transcript, state)
-            return self.extract_check_in_data(transcript, state)
+                return await self.extract_emergency_data(transcript, state, raise_errors)
+            return await self.extract_check_in_data(transcript, state, raise_errors)
         except Exception as e:
-            print(f"Error in extract_structured_data: {e}")
+            if raise_errors:
+                raise
+            logger.warning("Error in extract_structured_data", extra={"error": str(e)})
             return {
                 "call_outcome": "Status Unknown",
                 "error": str(e)
             }
 
-    def extract_emergency_data(self, transcript: str, state: Dict) -> Dict[str, Any]:
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an assistant that extracts structured data from a call transcript in an emergency scenario. "
-                            "Return a JSON object with the following fields:\n"
-                            "- call_outcome: Always 'Emergency Detected'\n"
-                            "- emergency_type: One of 'Accident', 'Breakdown', 'Medical', or 'Other'\n"
-                            "- emergency_location: The specific location mentioned (e.g., 'M2 Road, Lahore') or 'Not specified'\n"
-                            "- escalation_status: Always 'Escalation Flagged'\n"
-                            "Analyze the transcript and extract the most relevant information. If no clear information is available, use 'Not specified' for location and 'Other' for emergency_type."
-                        )
-                    },
-                    {"role": "user", "content": transcript}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2
-            )
-            data = response.choices[0].message.content
-            import json
-            structured_data = json.loads(data)
-            structured_data["state"] = state
-            return structured_data
-        except Exception as e:
-            print(f"OpenAI error in extract_emergency_data: {e}")
+    def fallback_structured_data(self, transcript: str, state: Dict = None) -> Dict[str, Any]:
+        """Default structured data used when extraction can't reach OpenAI."""
+        if not state:
+            state = {}
+        if state.get("emergency_detected") or self.detect_emergency(transcript):
+            state["emergency_detected"] = True
             return {
                 "call_outcome": "Emergency Detected",
                 "emergency_type": "Other",
@@ -173,40 +224,85 @@ class RetellHandler:
                 "escalation_status": "Escalation Flagged",
                 "state": state
             }
+        return {
+            "call_outcome": "Status Unknown",
+            "driver_status": "Unknown",
+            "current_location": "Not specified",
+            "eta": "Not specified",
+            "state": state
+        }
 
-    def extract_check_in_data(self, transcript: str, state: Dict) -> Dict[str, Any]:
+    @staticmethod
+    def json_request(system_prompt: str, transcript: str) -> Dict[str, Any]:
+        """Chat completion body for a JSON-mode extraction, also used as a Batch API request body."""
+        return {
+            "model": EXTRACTION_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": transcript}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.2
+        }
+
+    async def extract_json(self, extraction_type: str, system_prompt: str, transcript: str) -> Dict[str, Any]:
+        """Run a JSON-mode extraction, served from the extraction cache when the same input was seen before."""
+        key = None
+        if self.cache:
+            key = self.cache.make_key(system_prompt, EXTRACTION_MODEL, transcript)
+            cached = await self.cache.get(key, extraction_type)
+            if cached is not None:
+                return dict(cached)
+
+        response = await self.openai_client.chat.completions.create(**self.json_request(system_prompt, transcript))
+        self.record_usage(extraction_type, response)
+        data = json.loads(response.choices[0].message.content)
+        if self.cache:
+            await self.cache.set(key, extraction_type, EXTRACTION_MODEL, data)
+        return dict(data)
+
+    async def extract_json_chunked(self, extraction_type: str, system_prompt: str, transcript: str) -> Dict[str, Any]:
+        """Map-reduce extraction for long transcripts: windows are extracted concurrently, then merged.
+
+        Short transcripts go straight to extract_json. Windows without any status, emergency,
+        location or ETA cue are skipped before they reach the LLM.
+        """
+        if estimate_tokens(transcript) <= EXTRACTION_CHUNK_THRESHOLD_TOKENS:
+            return await self.extract_json(extraction_type, system_prompt, transcript)
+
+        windows = split_windows(transcript)
+        selected = relevant_windows(windows, self.matcher)
+        semaphore = asyncio.Semaphore(EXTRACTION_WINDOW_CONCURRENCY)
+
+        async def extract_window(window: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.extract_json(extraction_type, system_prompt, window)
+
+        partials = await asyncio.gather(*[extract_window(windows[i]) for i in selected])
+        logger.info(
+            "Chunked extraction",
+            extra={"extraction_type": extraction_type, "windows_sent": len(selected), "windows_total": len(windows)}
+        )
+        return MERGERS[extraction_type](list(partials))
+
+    async def extract_emergency_data(self, transcript: str, state: Dict, raise_errors: bool = False) -> Dict[str, Any]:
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an assistant that extracts structured data from a call transcript in a driver check-in scenario. "
-                            "Return a JSON object with the following fields:\n"
-                            "- call_outcome: One of 'In-Transit Update', 'Arrival Confirmation', or 'Status Unknown'\n"
-                            "- driver_status: One of 'Driving', 'Delayed', 'Arrived', or 'Unknown'\n"
-                            "- current_location: The specific location mentioned (e.g., 'M2 Road, Lahore') or 'Not specified'\n"
-                            "- eta: The estimated time of arrival (e.g., 'Tomorrow, 8:00 AM') or 'Not specified'\n"
-                            "Analyze the transcript and extract the most relevant information. If no clear information is available, use 'Status Unknown' for call_outcome, 'Unknown' for driver_status, and 'Not specified' for other fields."
-                        )
-                    },
-                    {"role": "user", "content": transcript}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2
-            )
-            data = response.choices[0].message.content
-            import json
-            structured_data = json.loads(data)
+            structured_data = await self.extract_json_chunked("emergency", EMERGENCY_EXTRACTION_PROMPT, transcript)
             structured_data["state"] = state
             return structured_data
         except Exception as e:
-            print(f"OpenAI error in extract_check_in_data: {e}")
-            return {
-                "call_outcome": "Status Unknown",
-                "driver_status": "Unknown",
-                "current_location": "Not specified",
-                "eta": "Not specified",
-                "state": state
-            }
\ No newline at end of file
+            if raise_errors:
+                raise
+            logger.warning("OpenAI error in extract_emergency_data", extra={"error": str(e)})
+            return self.fallback_structured_data(transcript, state)
+
+    async def extract_check_in_data(self, transcript: str, state: Dict, raise_errors: bool = False) -> Dict[str, Any]:
+        try:
+            structured_data = await self.extract_json_chunked("check_in", CHECK_IN_EXTRACTION_PROMPT, transcript)
+            structured_data["state"] = state
+            return structured_data
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.warning("OpenAI error in extract_check_in_data", extra={"error": str(e)})
+            return self.fallback_structured_data(transcript, state)
@@ -0,0 +1,153 @@
+import logging
+import os
+from typing import Dict, Any
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from events import commit_configuration_change
+from locks import KeyedLock
+from models import AgentConfiguration, Call
+from metrics import trigger_call_stage_seconds
+from retell_client import retell_client, RetellAPIError
+
+logger = logging.getLogger(__name__)
+
+base_url = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+# retell-llm: Retell hosts the LLM; custom-llm: Retell drives our /llm-websocket endpoint
+RETELL_RESPONSE_ENGINE = os.getenv("RETELL_RESPONSE_ENGINE", "retell-llm")
+LLM_WEBSOCKET_URL = os.getenv("LLM_WEBSOCKET_URL") or base_url.replace("http", "ws", 1).rstrip("/") + "/llm-websocket"
+
+# Per-call values passed to Retell as dynamic variables instead of baked into the agent
+DYNAMIC_VARIABLES = ("driver_name", "load_number")
+
+# One provisioning per configuration at a time, whether it was triggered by start_call or a campaign
+provisioning_locks = KeyedLock()
+
+
+def to_retell_template(text: str) -> str:
+    """Turn our {driver_name}/{load_number} placeholders into Retell {{dynamic_variables}}."""
+    for var in DYNAMIC_VARIABLES:
+        text = text.replace(f"{{{{{var}}}}}", f"{{{var}}}").replace(f"{{{var}}}", f"{{{{{var}}}}}")
+    return text
+
+
+async def create_retell_llm(agent_config: AgentConfiguration) -> str:
+    """Create the Retell-hosted LLM for the config's prompt and begin message; returns its llm_id."""
+    llm_data = {
+        "version": 0,
+        "model": "gpt-4o",
+        "model_temperature": 0.0,
+        "model_high_priority": False,
+        "tool_call_strict_mode": False,
+        "general_prompt": to_retell_template(agent_config.system_prompt),
+        "general_tools": [
+            {
+                "type": "end_call",
+                "name": "end_call",
+                "description": "End the call with user."
+            }
+        ],
+        "states": [],
+        "starting_state": None,
+        "begin_message": to_retell_template(agent_config.initial_message or ""),
+        "default_dynamic_variables": {var: "" for var in DYNAMIC_VARIABLES},
+        "knowledge_base_ids": [],
+        "kb_config": {
+            "top_k": 3,
+            "filter_score": 0.6
+        }
+    }
+    try:
+        with trigger_call_stage_seconds.time("create_llm"):
+            llm_res = await retell_client.create_retell_llm(llm_data)
+    except RetellAPIError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create LLM: {e}") from e
+    llm_id = llm_res.get("llm_id")
+    if not llm_id:
+        raise HTTPException(status_code=500, detail="Retell LLM response missing llm_id")
+    return llm_id
+
+
+async def ensure_retell_agent(agent_config: AgentConfiguration, db: AsyncSession) -> str:
+    """Return a Retell agent_id for the config, creating the LLM and agent only on a cache miss."""
+    if agent_config.retell_agent_id and agent_config.provisioned_hash == agent_config.content_hash(RETELL_RESPONSE_ENGINE):
+        return agent_config.retell_agent_id
+
+    async with provisioning_locks(str(agent_config.id)):
+        # Whoever held the lock before us may have provisioned this content already
+        await db.refresh(agent_config)
+        content_hash = agent_config.content_hash(RETELL_RESPONSE_ENGINE)
+        if agent_config.retell_agent_id and agent_config.provisioned_hash == content_hash:
+            return agent_config.retell_agent_id
+        return await provision_retell_agent(agent_config, content_hash, db)
+
+
+async def provision_retell_agent(agent_config: AgentConfiguration, content_hash: str, db: AsyncSession) -> str:
+    """Create the LLM (unless custom-llm) and agent for the config and store their ids; callers hold its lock."""
+    voice_settings = agent_config.voice_settings or {}
+    if RETELL_RESPONSE_ENGINE == "custom-llm":
+        # Prompt and begin message are served by llm_websocket, so there is no Retell LLM to create
+        llm_id = None
+        response_engine = {"type": "custom-llm", "llm_websocket_url": LLM_WEBSOCKET_URL}
+    else:
+        llm_id = await create_retell_llm(agent_config)
+        response_engine = {"llm_id": llm_id, "type": "retell-llm"}
+
+    agent_data = {
+        "response_engine": response_engine,
+        "voice_id": voice_settings.get("voice_id"),
+        "agent_name": agent_config.name,
+        "language": "en-US",
+        "responsiveness": voice_settings.get("responsiveness"),
+        "interruption_sensitivity": voice_settings.get("interruption_sensitivity"),
+        "enable_backchannel": voice_settings.get("enable_backchannel", False),
+        "backchannel_frequency": voice_settings.get("backchannel_frequency", 0),
+        "backchannel_words": ["yeah", "uh-huh", "okay", "got it", "I see"],
+        "reminder_trigger_ms": 10000,
+        "reminder_max_count": 2,
+        "normalize_for_speech": True,
+        "end_call_after_silence_ms": 10000,
+        "max_call_duration_ms": 600000,
+        "webhook_url": f"{base_url}/retell-webhook"
+    }
+    try:
+        with trigger_call_stage_seconds.time("create_agent"):
+            agent_res = await retell_client.create_agent(agent_data)
+    except RetellAPIError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create agent: {e}") from e
+    agent_id = agent_res.get("agent_id")
+    if not agent_id:
+        raise HTTPException(status_code=500, detail="Retell agent response missing agent_id")
+
+    agent_config.retell_llm_id = llm_id
+    agent_config.retell_agent_id = agent_id
+    agent_config.provisioned_hash = content_hash
+    await commit_configuration_change(db, agent_config.id)
+    logger.info("Provisioned Retell agent", extra={"agent_id": agent_id, "agent_config_id": str(agent_config.id)})
+    return agent_id
+
+
+async def create_web_call(db_call: Call, agent_id: str) -> Dict[str, Any]:
+    """Start a Retell web call for db_call; returns the web call info with call_id and access_token."""
+    web_call_data = {
+        "agent_id": agent_id,
+        "retell_llm_dynamic_variables": {
+            "driver_name": db_call.driver_name,
+            "load_number": db_call.load_number
+        },
+        "metadata": {
+            "our_call_id": str(db_call.id),
+            "driver_name": db_call.driver_name,
+            "load_number": db_call.load_number
+        }
+    }
+    try:
+        with trigger_call_stage_seconds.time("create_web_call"):
+            web_call_info = await retell_client.create_web_call(web_call_data)
+    except RetellAPIError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create web call: {e}") from e
+    if not web_call_info.get("call_id") or not web_call_info.get("access_token"):
+        raise HTTPException(status_code=500, detail="Retell web call response missing call_id or access_token")
+    return web_call_info
@@ -0,0 +1,65 @@
+"""Clients shared by every request and job in a process.
+
+Nothing here is built at import: the database engine, the Retell and OpenAI HTTP clients and the
+RetellHandler are each created on first use and reused afterwards. The API's lifespan and the
+standalone worker call close() on the way out.
+"""
+import logging
+import os
+from typing import TYPE_CHECKING, Optional
+
+import settings  # noqa: F401 - loads .env
+from database import dispose_engine, get_engine
+from extraction_cache import extraction_cache
+from retell_client import retell_client
+from retell_handler import RetellHandler
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+
+class Services:
+    def __init__(self):
+        self._openai: Optional["AsyncOpenAI"] = None
+        self._handler: Optional[RetellHandler] = None
+
+    @property
+    def engine(self):
+        return get_engine()
+
+    @property
+    def retell(self):
+        return retell_client
+
+    @property
+    def openai(self) -> "AsyncOpenAI":
+        if self._openai is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable not set")
+            # Imported here: the SDK is the slowest import in the backend and many processes never call it
+            from openai import AsyncOpenAI
+            self._openai = AsyncOpenAI(api_key=api_key)
+        return self._openai
+
+    @property
+    def handler(self) -> RetellHandler:
+        """The shared handler; use handler.with_keywords() for a call's keyword overrides."""
+        if self._handler is None:
+            self._handler = RetellHandler(self.openai, cache=extraction_cache)
+        return self._handler
+
+    async def close(self):
+        """Close whatever was opened; safe to call more than once."""
+        if self._openai is not None:
+            await self._openai.close()
+        self._openai = None
+        self._handler = None
+        await retell_client.close()
+        await dispose_engine()
+        logger.info("Services closed")
+
+
+services = Services()
@@ -0,0 +1,8 @@
+"""Loads .env into the environment, once per process.
+
+Every module that reads settings at import imports this first; entry points (main, worker,
+migrations, benchmarks) get it through those imports, so load_dotenv never runs twice.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
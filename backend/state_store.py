@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import DataError, DBAPIError, StatementError
+
+from database import AsyncSessionLocal
+from models import Call
+
+logger = logging.getLogger(__name__)
+
+STATE_CACHE_SIZE = int(os.getenv("STATE_CACHE_SIZE", "1000"))
+STATE_FLUSH_INTERVAL_MS = int(os.getenv("STATE_FLUSH_INTERVAL_MS", "250"))
+STATE_FLUSH_BATCH_SIZE = int(os.getenv("STATE_FLUSH_BATCH_SIZE", "500"))
+# Optional shared tier so another process (e.g. after a websocket reconnect) sees the latest state
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL")
+STATE_REDIS_TTL = int(os.getenv("STATE_REDIS_TTL", "86400"))
+STATE_REDIS_PREFIX = "call_state:"
+
+
+def unwritable(error: Exception) -> bool:
+    """True if the state itself was rejected (bad value, unserialisable JSON), so retrying it can't succeed."""
+    return isinstance(error, DataError) or (isinstance(error, StatementError) and not isinstance(error, DBAPIError))
+
+
+def redis_from_url(url: str):
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise RuntimeError("STATE_REDIS_URL is set but the redis package is not installed")
+    return redis.from_url(url, decode_responses=True)
+
+
+class StateStore:
+    """Per-call conversation state: in-memory LRU for active calls, optional Redis, write-behind to Postgres.
+
+    put() never waits on I/O; dirty states are written in bulk every flush_interval_ms. A dirty state
+    evicted from the LRU is kept until it has been flushed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = STATE_CACHE_SIZE,
+        flush_interval_ms: int = STATE_FLUSH_INTERVAL_MS,
+        batch_size: int = STATE_FLUSH_BATCH_SIZE,
+        redis=None,
+    ):
+        self.max_entries = max_entries
+        self.flush_interval_ms = flush_interval_ms
+        self.batch_size = batch_size
+        # Any client with async get/set(ex=) works, e.g. benchmarks.fake_services.FakeRedis
+        self.redis = redis
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task:
+            return
+        if self.redis is None and STATE_REDIS_URL:
+            self.redis = redis_from_url(STATE_REDIS_URL)
+        self._task = asyncio.create_task(self._run())
+        logger.info("State store started", extra={"flush_interval_ms": self.flush_interval_ms, "redis": self.redis is not None})
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Whatever is still dirty would otherwise be lost with the process
+        await self.flush()
+
+    async def get(self, call_id: str, default: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The call's state: memory, then Redis, then `default` (the caller's row) or a SELECT from Postgres.
+
+        Returns a copy; hand it back with put() after changing it.
+        """
+        call_id = str(call_id)
+        state = self._states.get(call_id)
+        if state is None:
+            state = self._dirty.get(call_id)
+        if state is None and self.redis is not None:
+            try:
+                raw = await self.redis.get(STATE_REDIS_PREFIX + call_id)
+                state = json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning("State store Redis read failed", extra={"call_id": call_id, "error": str(e)})
+        if state is None and default is not None:
+            state = default
+        if state is None:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(select(Call.state).where(Call.id == call_id))
+                state = result.scalar_one_or_none()
+        state = dict(state or {})
+        self._remember(call_id, state)
+        return dict(state)
+
+    def put(self, call_id: str, state: Dict[str, Any]):
+        """Record the call's latest state and schedule it for the next flush."""
+        call_id = str(call_id)
+        snapshot = dict(state)
+        self._remember(call_id, snapshot)
+        self._dirty[call_id] = snapshot
+
+    def _remember(self, call_id: str, state: Dict[str, Any]):
+        self._states[call_id] = state
+        self._states.move_to_end(call_id)
+        while len(self._states) > self.max_entries:
+            self._states.popitem(last=False)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_ms / 1000)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("State flush failed")
+
+    async def flush(self):
+        """Write every dirty state to Redis and Postgres.
+
+        States the database can't take (a malformed call id, a value that won't serialise) are dropped and
+        logged; anything else that fails stays dirty for the next round.
+        """
+        if not self._dirty:
+            return
+        batch, self._dirty = self._dirty, {}
+        pending: Dict[uuid.UUID, Dict[str, Any]] = {}
+        malformed = []
+        for call_id, state in batch.items():
+            try:
+                pending[uuid.UUID(call_id)] = state
+            except ValueError:
+                malformed.append(call_id)
+        if malformed:
+            logger.error("Dropped call states with malformed call ids", extra={"call_ids": malformed})
+
+        dropped = []
+        try:
+            if self.redis is not None:
+                await self._write_redis({str(call_id): state for call_id, state in pending.items()})
+            for chunk in self._chunks(list(pending.items())):
+                try:
+                    await self._write(chunk)
+                except Exception as e:
+                    if not unwritable(e):
+                        raise
+                    # One bad state fails the whole executemany; write the rest one at a time
+                    for item in chunk:
+                        try:
+                            await self._write([item])
+                        except Exception as item_error:
+                            if not unwritable(item_error):
+                                raise
+                            dropped.append(str(item[0]))
+                            logger.error("Dropped unwritable call state", extra={"call_id": str(item[0]), "error": str(item_error)})
+                        del pending[item[0]]
+                    continue
+                for call_id, _ in chunk:
+                    del pending[call_id]
+        except Exception:
+            # Newer puts made during the flush win over the states being retried
+            self._dirty = {**{str(call_id): state for call_id, state in pending.items()}, **self._dirty}
+            raise
+        logger.debug("Flushed call states", extra={"count": len(batch) - len(malformed) - len(dropped)})
+
+    async def _write(self, chunk: List):
+        async with AsyncSessionLocal() as db:
+            # ORM bulk UPDATE by primary key: one executemany per chunk
+            await db.execute(update(Call), [{"id": call_id, "state": state} for call_id, state in chunk])
+            await db.commit()
+
+    async def _write_redis(self, batch: Dict[str, Dict[str, Any]]):
+        try:
+            await asyncio.gather(*[
+                self.redis.set(STATE_REDIS_PREFIX + call_id, json.dumps(state, default=str), ex=STATE_REDIS_TTL)
+                for call_id, state in batch.items()
+            ])
+        except Exception as e:
+            # Redis is a cache in front of Postgres; a failed write only costs cross-process freshness
+            logger.warning("State store Redis write failed", extra={"count": len(batch), "error": str(e)})
+
+    def _chunks(self, items: List) -> List[List]:
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+
+state_store = StateStore()
@@ -0,0 +1,98 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import AgentConfiguration, Call
+
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "5"))
+STATS_DAYS = 30
+
+
+def _status_counts():
+    emergency = Call.structured_data["call_outcome"].as_string() == "Emergency Detected"
+    return (
+        func.count().label("total"),
+        func.count().filter(Call.status == "in_progress").label("active"),
+        func.count().filter(Call.status == "completed").label("completed"),
+        func.count().filter(Call.status == "failed").label("failed"),
+        func.count().filter(emergency).label("emergencies"),
+    )
+
+
+def _counts(row) -> Dict[str, int]:
+    return {
+        "total_calls": row.total,
+        "active_calls": row.active,
+        "completed_calls": row.completed,
+        "failed_calls": row.failed,
+        "emergencies": row.emergencies,
+    }
+
+
+async def compute_stats(db: AsyncSession, days: int = STATS_DAYS) -> Dict[str, Any]:
+    """Aggregate dashboard counters with GROUP BY so cost doesn't depend on fetching call rows."""
+    totals = (await db.execute(select(*_status_counts()))).one()
+
+    by_config_rows = await db.execute(
+        select(Call.agent_config_id, AgentConfiguration.name, *_status_counts())
+        .join(AgentConfiguration, AgentConfiguration.id == Call.agent_config_id)
+        .group_by(Call.agent_config_id, AgentConfiguration.name)
+        .order_by(func.count().desc())
+    )
+
+    day = func.date_trunc("day", Call.created_at).label("day")
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    by_day_rows = await db.execute(
+        select(day, *_status_counts())
+        .where(Call.created_at >= since)
+        .group_by(day)
+        .order_by(day)
+    )
+
+    return {
+        **_counts(totals),
+        "by_configuration": [
+            {"agent_config_id": row.agent_config_id, "name": row.name, **_counts(row)}
+            for row in by_config_rows
+        ],
+        "by_day": [
+            {"day": row.day.date().isoformat(), **_counts(row)}
+            for row in by_day_rows
+        ],
+    }
+
+
+class StatsCache:
+    """Short-TTL in-memory cache; status changes invalidate it so counts stay fresh.
+
+    Like ReadCache, invalidate() bumps a version and a computation only fills the cache if no
+    invalidation happened while it ran, so stats racing a status change aren't kept for the TTL.
+    """
+
+    def __init__(self, ttl: float = STATS_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._value: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+
+    async def get(self, db: AsyncSession) -> Dict[str, Any]:
+        now = time.monotonic()
+        if self._value is not None and now < self._expires_at:
+            return self._value
+        version = self.version
+        value = await compute_stats(db)
+        if version == self.version:
+            self._value = value
+            self._expires_at = now + self.ttl
+        return value
+
+    def invalidate(self):
+        self.version += 1
+        self._value = None
+
+
+stats_cache = StatsCache()
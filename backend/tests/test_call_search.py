@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import Call
+from transcripts import replace_utterances
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+async def transcripts(db, agent_config):
+    """Calls keyed by name: three mention a blowout (the first most often), one doesn't."""
+    specs = {
+        "repeated": (NOW, {"call_outcome": "Emergency Detected", "emergency_type": "Blowout"}, [
+            ("agent", "Hi Ana, how is the drive going?"),
+            ("user", "Blowout on I-40! A blowout on the front tire, worst blowout I've had."),
+        ]),
+        "recent": (NOW - timedelta(hours=1), None, [
+            ("agent", "Any problems on the road?"),
+            ("user", "Had a blowout yesterday but the tire is replaced and I'm rolling again."),
+        ]),
+        "old": (NOW - timedelta(days=10), None, [
+            ("user", "Had a blowout yesterday but the tire is replaced and I'm rolling again."),
+        ]),
+        "unrelated": (NOW, None, [
+            ("user", "All good, arriving at the yard tomorrow morning."),
+        ]),
+    }
+    calls = {}
+    for name, (created_at, structured_data, utterances) in specs.items():
+        call = Call(
+            agent_config_id=agent_config.id, driver_name=name, load_number="LD-1", status="completed",
+            created_at=created_at, structured_data=structured_data, utterance_count=len(utterances), state={},
+        )
+        db.add(call)
+        await db.flush()
+        await replace_utterances(db, call.id, [{"role": role, "content": content} for role, content in utterances])
+        calls[name] = str(call.id)
+    await db.commit()
+    return calls
+
+
+async def search(api, **params):
+    response = await api.get("/api/calls/search", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_best_match_first_then_newest(api, transcripts):
+    page = await search(api, q="blowout")
+
+    assert [item["id"] for item in page["items"]] == [transcripts[name] for name in ("repeated", "recent", "old")]
+    assert page["items"][0]["rank"] > page["items"][1]["rank"]
+    assert page["next_offset"] is None
+
+
+async def test_snippet_highlights_the_best_utterance(api, transcripts):
+    item = (await search(api, q="blowout"))["items"][0]
+
+    assert item["snippet"]["seq"] == 1
+    assert item["snippet"]["role"] == "user"
+    assert "<mark>Blowout</mark>" in item["snippet"]["text"]
+
+
+async def test_websearch_phrases(api, transcripts):
+    page = await search(api, q='"front tire"')
+
+    assert [item["id"] for item in page["items"]] == [transcripts["repeated"]]
+
+
+async def test_created_from_excludes_older_calls(api, transcripts):
+    page = await search(api, q="blowout", created_from=(NOW - timedelta(days=7)).isoformat())
+
+    assert transcripts["old"] not in [item["id"] for item in page["items"]]
+    assert len(page["items"]) == 2
+
+
+async def test_pages_follow_next_offset(api, transcripts):
+    first = await search(api, q="blowout", limit=2)
+    second = await search(api, q="blowout", limit=2, offset=first["next_offset"])
+
+    assert first["next_offset"] == 2
+    assert [item["id"] for item in first["items"] + second["items"]] == [
+        transcripts[name] for name in ("repeated", "recent", "old")
+    ]
+    assert second["next_offset"] is None
+
+
+async def test_structured_filter_without_a_query(api, transcripts):
+    page = await search(api, emergency_type="Blowout")
+
+    assert [item["id"] for item in page["items"]] == [transcripts["repeated"]]
+    assert "snippet" not in page["items"][0]
+
+
+async def test_query_or_filter_is_required(api, transcripts):
+    response = await api.get("/api/calls/search", params={"q": "  "})
+
+    assert response.status_code == 400
@@ -0,0 +1,186 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from campaign_dispatcher import CampaignDispatcher, TokenBucket, campaign_dispatcher
+from models import Call, Campaign
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def campaign_call(db, agent_config):
+    campaign = Campaign(agent_config_id=agent_config.id, name="Morning check-ins", total_calls=1)
+    db.add(campaign)
+    await db.flush()
+    call = Call(agent_config_id=agent_config.id, campaign_id=campaign.id, driver_name="Ana", load_number="LD-1", state={})
+    db.add(call)
+    await db.commit()
+    return call
+
+
+def dispatcher(**kwargs) -> CampaignDispatcher:
+    dispatcher = CampaignDispatcher(**{"concurrency": 1, "retry_base_delay": 0, **kwargs})
+    dispatcher.queue = asyncio.Queue()
+    return dispatcher
+
+
+async def call_status(db, call_id) -> str:
+    return (await db.execute(select(Call.status).where(Call.id == call_id))).scalar_one()
+
+
+async def test_a_call_is_dialed_once_by_concurrent_dispatchers(db, campaign_call, fake_retell):
+    # Two processes that both re-queued the call on startup
+    await asyncio.gather(dispatcher()._dispatch(str(campaign_call.id)), dispatcher()._dispatch(str(campaign_call.id)))
+
+    assert len(fake_retell.web_calls) == 1
+    assert await call_status(db, campaign_call.id) == "in_progress"
+
+
+async def test_failed_start_is_released_for_retry(db, campaign_call, fake_retell):
+    dispatch = dispatcher(max_retries=1)
+    # The agent is provisioned first, then create-web-call fails (a POST, so the client doesn't retry it)
+    await dispatch._agent_id(campaign_call)
+    fake_retell.fail_next = [500]
+
+    await dispatch._dispatch(str(campaign_call.id))
+
+    assert await call_status(db, campaign_call.id) == "pending"
+    assert await asyncio.wait_for(dispatch.queue.get(), 1) == str(campaign_call.id)
+
+    await dispatch._dispatch(str(campaign_call.id))
+    assert await call_status(db, campaign_call.id) == "in_progress"
+
+
+async def test_start_fails_after_max_retries(db, campaign_call, fake_retell):
+    dispatch = dispatcher(max_retries=0)
+    fake_retell.fail_next = [500]
+
+    await dispatch._dispatch(str(campaign_call.id))
+
+    assert await call_status(db, campaign_call.id) == "failed"
+    assert dispatch.queue.empty()
+
+
+@pytest.mark.parametrize("status_code", [400, 404, 422])
+async def test_rejected_start_fails_without_retrying(db, campaign_call, fake_retell, status_code):
+    dispatch = dispatcher(max_retries=3)
+    await dispatch._agent_id(campaign_call)
+    fake_retell.fail_next = [status_code]
+
+    await dispatch._dispatch(str(campaign_call.id))
+
+    assert await call_status(db, campaign_call.id) == "failed"
+    assert dispatch.queue.empty()
+
+
+async def test_recovery_fails_interrupted_dispatches(db, campaign_call):
+    await db.execute(
+        update(Call).where(Call.id == campaign_call.id)
+        .values(status="dispatching", updated_at=datetime.now(timezone.utc) - timedelta(minutes=10))
+    )
+    await db.commit()
+    dispatch = dispatcher(stale_dispatch_seconds=300)
+
+    await dispatch._recover()
+
+    assert await call_status(db, campaign_call.id) == "failed"
+    assert dispatch.queue.empty()
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Call ids handed to the dispatcher, which isn't running in these tests."""
+    ids = []
+    monkeypatch.setattr(campaign_dispatcher, "submit", ids.extend)
+    return ids
+
+
+async def test_create_campaign_inserts_pending_calls(api, db, agent_config, submitted):
+    rows = [{"driver_name": f"Driver {i}", "load_number": f"LD-{i}"} for i in range(3)]
+
+    response = await api.post("/api/campaigns", json={"agent_config_id": str(agent_config.id), "name": "Batch", "rows": rows})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_calls"] == 3
+    calls = (await db.execute(select(Call).where(Call.campaign_id == body["campaign_id"]))).scalars().all()
+    assert sorted((c.driver_name, c.load_number, c.status) for c in calls) == [
+        (f"Driver {i}", f"LD-{i}", "pending") for i in range(3)
+    ]
+    assert sorted(submitted) == sorted(str(c.id) for c in calls)
+
+    progress = (await api.get(f"/api/campaigns/{body['campaign_id']}")).json()
+    assert progress["status_counts"] == {"pending": 3}
+    assert progress["status"] == "running"
+
+
+async def test_create_campaign_rejects_too_many_rows(api, agent_config, submitted, monkeypatch):
+    monkeypatch.setattr("main.CAMPAIGN_MAX_ROWS", 2)
+    rows = [{"driver_name": "Ana", "load_number": f"LD-{i}"} for i in range(3)]
+
+    response = await api.post("/api/campaigns", json={"agent_config_id": str(agent_config.id), "rows": rows})
+
+    assert response.status_code == 400
+    assert submitted == []
+
+
+async def test_csv_upload_parses_rows(api, db, agent_config, submitted):
+    # Excel writes a BOM; blank and incomplete rows are skipped and cells are trimmed
+    content = "\ufeffdriver_name,load_number,notes\n Ana , LD-1 ,x\n\nBen,,\nCruz,LD-3,\n".encode("utf-8")
+
+    response = await api.post(
+        "/api/campaigns/upload",
+        data={"agent_config_id": str(agent_config.id)},
+        files={"file": ("drivers.csv", content, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    campaign_id = response.json()["campaign_id"]
+    calls = (await db.execute(select(Call.driver_name, Call.load_number).where(Call.campaign_id == campaign_id))).all()
+    assert sorted(calls) == [("Ana", "LD-1"), ("Cruz", "LD-3")]
+    assert (await db.get(Campaign, campaign_id)).name == "drivers.csv"
+
+
+@pytest.mark.parametrize("content, detail", [
+    (b"driver,load\nAna,LD-1\n", "CSV missing columns: driver_name, load_number"),
+    ("driver_name,load_number\nJosé,LD-1\n".encode("latin-1"), "CSV must be UTF-8 encoded"),
+    (b"driver_name,load_number\n", "Campaign has no rows"),
+])
+async def test_csv_upload_rejects_bad_files(api, agent_config, submitted, content, detail):
+    response = await api.post(
+        "/api/campaigns/upload",
+        data={"agent_config_id": str(agent_config.id)},
+        files={"file": ("drivers.csv", content, "text/csv")},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+    assert submitted == []
+
+
+async def test_csv_upload_rejects_large_files(api, agent_config, submitted, monkeypatch):
+    monkeypatch.setattr("main.CAMPAIGN_MAX_UPLOAD_BYTES", 64)
+    content = ("driver_name,load_number\n" + "Ana,LD-1\n" * 10).encode("utf-8")
+
+    response = await api.post(
+        "/api/campaigns/upload",
+        data={"agent_config_id": str(agent_config.id)},
+        files={"file": ("drivers.csv", content, "text/csv")},
+    )
+
+    assert response.status_code == 413
+    assert submitted == []
+
+
+async def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+
+    # The burst of 2 is immediate; the other 4 wait 1/20 s each
+    assert time.monotonic() - start == pytest.approx(0.2, abs=0.05)
@@ -0,0 +1,63 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from compression import CompressionMiddleware
+from tests.conftest import asgi_client
+
+pytestmark = pytest.mark.anyio
+
+BODY = "check-in " * 200
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+
+    @app.get("/api/large")
+    async def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/api/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/api/events")
+    async def events():
+        async def stream():
+            yield "data: " + BODY + "\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    async with asgi_client(app, "http://app.test", headers={"Accept-Encoding": "gzip"}) as client:
+        yield client
+
+
+async def test_responses_over_the_minimum_size_are_compressed(client):
+    response = await client.get("/api/large")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.text == BODY
+
+
+async def test_responses_under_the_minimum_size_are_not_compressed(client):
+    response = await client.get("/api/small")
+
+    assert "content-encoding" not in response.headers
+    assert response.text == "ok"
+
+
+async def test_event_stream_is_never_compressed(client):
+    response = await client.get("/api/events")
+
+    assert "content-encoding" not in response.headers
+    assert response.text == "data: " + BODY + "\n\n"
+
+
+async def test_clients_without_gzip_get_plain_bodies(client):
+    response = await client.get("/api/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY.encode()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import asyncpg
+import pytest
+from sqlalchemy import func, select
+
+from call_writes import transition_call
+from events import CALL_CHANGED_CHANNEL, CONFIGURATION_CHANGED_CHANNEL, PROCESS_ID, ChangeListener, commit_configuration_change, event_hub
+from jobs import JOB_LISTEN_URL
+from read_cache import read_cache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def subscription():
+    sub = event_hub.subscribe()
+    yield sub
+    event_hub.unsubscribe(sub)
+
+
+@pytest.fixture
+async def notifications(migrated_database):
+    """Payloads NOTIFYed on the call_changed channel, as another process would receive them."""
+    received = asyncio.Queue()
+    conn = await asyncpg.connect(JOB_LISTEN_URL)
+    await conn.add_listener(CALL_CHANGED_CHANNEL, lambda *args: received.put_nowait(json.loads(args[-1])))
+    yield received
+    await conn.close()
+
+
+async def test_committed_changes_are_notified_and_applied_locally(db, call, subscription, notifications):
+    await transition_call(db, call.id, status="completed")
+
+    message = await asyncio.wait_for(notifications.get(), timeout=5)
+    assert message["origin"] == PROCESS_ID
+    assert message["call"]["id"] == str(call.id)
+    assert message["call"]["status"] == "completed"
+    event = subscription.queue.get_nowait()
+    assert (event.type, event.call_id, event.data["status"]) == ("call_updated", str(call.id), "completed")
+
+
+async def test_claims_that_miss_notify_nothing(db, call, notifications):
+    assert await transition_call(db, call.id, from_status="pending", status="dispatching") is None
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(notifications.get(), timeout=0.3)
+
+
+async def test_listener_applies_changes_from_other_processes(db, call, subscription):
+    await read_cache.get_or_load(("call", str(call.id)), lambda: _loaded("cached"))
+    assert ("call", str(call.id)) in read_cache._entries
+    listener = ChangeListener()
+    await listener.start()
+    try:
+        payload = json.dumps({"origin": "worker-host:1", "call": {"id": str(call.id), "status": "completed"}})
+        # The LISTEN connects in the background, so keep notifying until it's heard
+        for _ in range(50):
+            await db.execute(select(func.pg_notify(CALL_CHANGED_CHANNEL, payload)))
+            await db.commit()
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=0.1)
+                break
+            except asyncio.TimeoutError:
+                pass
+        else:
+            pytest.fail("call_changed notification never arrived")
+    finally:
+        await listener.stop()
+
+    assert (event.call_id, event.data["status"]) == (str(call.id), "completed")
+    assert ("call", str(call.id)) not in read_cache._entries
+
+
+async def test_listener_skips_its_own_notifications(subscription):
+    ChangeListener()._call_changed(json.dumps({"origin": PROCESS_ID, "call": {"id": "abc", "status": "completed"}}))
+    ChangeListener()._call_changed("not json")
+
+    assert subscription.queue.empty()
+
+
+async def test_configuration_changes_are_notified_and_applied(db, agent_config):
+    config_id = str(agent_config.id)
+    received = asyncio.Queue()
+    conn = await asyncpg.connect(JOB_LISTEN_URL)
+    await conn.add_listener(CONFIGURATION_CHANGED_CHANNEL, lambda *args: received.put_nowait(json.loads(args[-1])))
+    try:
+        await read_cache.get_or_load(("agent_config", config_id), lambda: _loaded("cached"))
+
+        await commit_configuration_change(db, agent_config.id)
+
+        assert await asyncio.wait_for(received.get(), timeout=5) == {"origin": PROCESS_ID, "id": config_id}
+        assert ("agent_config", config_id) not in read_cache._entries
+    finally:
+        await conn.close()
+
+
+def test_listener_drops_configurations_changed_elsewhere():
+    read_cache._entries[("agent_config", "abc")] = object()
+    read_cache._entries[("configurations",)] = object()
+
+    ChangeListener()._configuration_changed(json.dumps({"origin": "worker-host:1", "id": "abc"}))
+
+    assert ("agent_config", "abc") not in read_cache._entries
+    assert ("configurations",) not in read_cache._entries
+
+
+async def _loaded(value):
+    return value
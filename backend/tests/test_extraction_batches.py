@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+import extraction_worker
+import services
+from events import event_hub
+from extraction_cache import ExtractionCache
+from extraction_batches import BATCH_POLL_KIND, BatchScheduler, poll_extraction_batch
+from extraction_worker import BATCHED_KIND, EXTRACTION_URGENT_PRIORITY, ExtractionJob, enqueue_extraction, extraction_lane
+from jobs import JobDeferred
+from models import Call, Job
+
+pytestmark = pytest.mark.anyio
+
+CHECK_IN = "Agent: Hi Ana, where are you right now?\nUser: On I-10 near exit 42, should deliver tomorrow morning."
+EMERGENCY = "Agent: Hi Ana, how is the drive?\nUser: There's been an accident, I'm pulled over on I-10."
+
+
+@pytest.fixture(autouse=True)
+def extraction_cache(monkeypatch):
+    """An empty in-memory tier for each test, so earlier tests' results aren't served from it."""
+    monkeypatch.setattr(services, "extraction_cache", ExtractionCache())
+
+
+@pytest.fixture
+def batch_lane(monkeypatch):
+    monkeypatch.setattr(extraction_worker, "EXTRACTION_BATCH_ENABLED", True)
+
+
+def check_in(call_id="0" * 32, transcript=CHECK_IN, **kwargs) -> ExtractionJob:
+    return ExtractionJob(call_id=str(call_id), transcript=transcript, **kwargs)
+
+
+async def test_check_ins_are_extracted_in_realtime_by_default(fake_openai):
+    assert extraction_worker.EXTRACTION_BATCH_ENABLED is False
+    assert extraction_lane(check_in()) == "realtime"
+
+
+async def test_check_ins_use_the_batch_lane_when_enabled(fake_openai, batch_lane):
+    assert extraction_lane(check_in()) == "batch"
+
+
+async def test_emergencies_are_urgent(fake_openai, batch_lane):
+    assert extraction_lane(check_in(transcript=EMERGENCY)) == "urgent"
+    # Flagged during the conversation, even if the transcript doesn't say so
+    assert extraction_lane(check_in(state={"emergency_detected": True})) == "urgent"
+
+
+async def test_emergency_overrides_apply_to_lane_selection(fake_openai, batch_lane):
+    job = check_in(transcript="Agent: Anything else?\nUser: I've got a flat tire.", keyword_overrides={"emergency": ["flat tire"]})
+
+    assert extraction_lane(job) == "urgent"
+
+
+async def test_long_check_ins_stay_realtime(fake_openai, batch_lane, monkeypatch):
+    monkeypatch.setattr(extraction_worker, "EXTRACTION_CHUNK_THRESHOLD_TOKENS", 5)
+
+    assert extraction_lane(check_in()) == "realtime"
+
+
+async def test_lanes_are_queued_as_their_job_kinds(db, call, fake_openai, batch_lane):
+    for transcript in (CHECK_IN, EMERGENCY):
+        await enqueue_extraction(db, check_in(call.id, transcript))
+    await db.commit()
+
+    jobs = (await db.execute(select(Job.kind, Job.priority).order_by(Job.priority))).all()
+    assert jobs == [(BATCHED_KIND, 0), ("extract", EXTRACTION_URGENT_PRIORITY)]
+
+
+@pytest.fixture
+async def calls(db, call, agent_config, batch_lane):
+    """Three in-progress calls with check-ins waiting in the batch lane."""
+    calls = [call] + [
+        Call(agent_config_id=agent_config.id, driver_name=name, load_number=f"LD-{i}", status="in_progress", state={})
+        for i, name in enumerate(("Ben", "Cy"), start=2)
+    ]
+    db.add_all(calls[1:])
+    await db.commit()
+    for c in calls:
+        await enqueue_extraction(db, check_in(c.id, state={"driver": c.driver_name}))
+    await db.commit()
+    return calls
+
+
+async def run_batch(db, fake_openai):
+    """Submit the waiting check-ins as one batch and poll it until it's written back."""
+    assert await BatchScheduler(min_size=1).submit_ready()
+    poll = (await db.scalars(select(Job).where(Job.kind == BATCH_POLL_KIND))).one()
+    for _ in range(50):
+        try:
+            return await poll_extraction_batch(poll)
+        except JobDeferred:
+            await asyncio.sleep(0.02)
+    pytest.fail("batch never completed")
+
+
+async def test_batch_results_are_written_back(db, calls, fake_openai, batch_lane):
+    sub = event_hub.subscribe()
+    try:
+        await run_batch(db, fake_openai)
+    finally:
+        event_hub.unsubscribe(sub)
+
+    assert fake_openai.batch_requests == 3
+    assert fake_openai.requests == 0
+    rows = (await db.scalars(select(Call).order_by(Call.driver_name).execution_options(populate_existing=True))).all()
+    for row in rows:
+        assert row.structured_data_status == "done"
+        assert row.structured_data["call_outcome"] == "In-Transit Update"
+        assert row.structured_data["state"] == {"driver": row.driver_name}
+    # Only the poll job is left, for its worker to delete
+    assert (await db.scalars(select(Job.kind))).all() == [BATCH_POLL_KIND]
+    updated = set()
+    while not sub.queue.empty():
+        updated.add(sub.queue.get_nowait().call_id)
+    assert updated == {str(c.id) for c in calls}
+
+
+async def test_unanswered_check_ins_move_to_realtime(db, calls, fake_openai, batch_lane):
+    failing = (await db.scalars(select(Job).where(Job.payload["call_id"].astext == str(calls[0].id)))).one()
+    fake_openai.failing_custom_ids.add(str(failing.id))
+
+    await run_batch(db, fake_openai)
+
+    jobs = (await db.execute(select(Job.id, Job.kind, Job.status).where(Job.kind != BATCH_POLL_KIND))).all()
+    assert jobs == [(failing.id, "extract", "queued")]
+    statuses = dict((await db.execute(select(Call.id, Call.structured_data_status))).all())
+    assert statuses == {calls[0].id: None, calls[1].id: "done", calls[2].id: "done"}
+
+
+async def test_cached_check_ins_skip_the_batch(db, calls, fake_openai, batch_lane):
+    await run_batch(db, fake_openai)
+    await enqueue_extraction(db, check_in(calls[0].id, state={"driver": "Ana"}))
+    await db.commit()
+
+    # Same transcript as before, answered from the extraction cache without a new batch
+    assert await BatchScheduler(min_size=1).submit_ready()
+
+    assert fake_openai.batch_requests == 3
+    assert (await db.scalars(select(Job.kind).where(Job.kind != BATCH_POLL_KIND))).all() == []
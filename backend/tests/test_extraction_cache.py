@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from extraction_cache import ExtractionCache
+from metrics import extraction_cache_requests_total
+
+pytestmark = pytest.mark.anyio
+
+RESULT = {"call_outcome": "In-Transit Update", "current_location": "I-10 exit 42"}
+
+
+@pytest.fixture
+def lookups():
+    """Lookups counted since the test started, as {(extraction_type, tier, result): count}."""
+    before = extraction_cache_requests_total.snapshot()
+
+    def counted():
+        after = extraction_cache_requests_total.snapshot()
+        return {key: value - before.get(key, 0) for key, value in after.items() if value != before.get(key, 0)}
+
+    return counted
+
+
+def key(transcript: str) -> str:
+    return ExtractionCache.make_key("prompt", "gpt-4o-mini", transcript)
+
+
+def test_keys_depend_on_every_part():
+    keys = {
+        ExtractionCache.make_key("prompt", "gpt-4o-mini", "transcript"),
+        ExtractionCache.make_key("prompt", "gpt-4o", "transcript"),
+        ExtractionCache.make_key("other prompt", "gpt-4o-mini", "transcript"),
+        # The separator keeps shifted boundaries apart
+        ExtractionCache.make_key("promptgpt-4o-mini", "", "transcript"),
+    }
+
+    assert len(keys) == 4
+
+
+async def test_memory_hit(lookups):
+    cache = ExtractionCache(persist=False)
+    await cache.set(key("a"), "check_in", "gpt-4o-mini", RESULT)
+
+    assert await cache.get(key("a"), "check_in") == RESULT
+    assert await cache.get(key("b"), "check_in") is None
+    assert lookups() == {("check_in", "memory", "hit"): 1, ("check_in", "memory", "miss"): 1}
+
+
+async def test_database_tier_serves_other_processes(db, lookups):
+    await ExtractionCache().set(key("a"), "check_in", "gpt-4o-mini", RESULT)
+    other_process = ExtractionCache()
+
+    assert await other_process.get(key("a"), "check_in") == RESULT
+    # Now in this process's memory tier too
+    assert await other_process.get(key("a"), "check_in") == RESULT
+    assert await other_process.get(key("b"), "check_in") is None
+    assert lookups() == {
+        ("check_in", "memory", "hit"): 1,
+        ("check_in", "memory", "miss"): 2,
+        ("check_in", "db", "hit"): 1,
+        ("check_in", "db", "miss"): 1,
+    }
+
+
+async def test_bulk_lookups_split_across_tiers(db, lookups):
+    await ExtractionCache().set_many({key("a"): RESULT, key("b"): RESULT}, "check_in", "gpt-4o-mini")
+    cache = ExtractionCache()
+    await cache.set(key("c"), "check_in", "gpt-4o-mini", RESULT)
+
+    found = await cache.get_many([key("a"), key("b"), key("c"), key("d")], "check_in")
+
+    assert set(found) == {key("a"), key("b"), key("c")}
+    assert lookups() == {
+        ("check_in", "memory", "hit"): 1,
+        ("check_in", "memory", "miss"): 3,
+        ("check_in", "db", "hit"): 2,
+        ("check_in", "db", "miss"): 1,
+    }
+
+
+async def test_least_recently_used_entries_are_evicted_by_size():
+    size = len(json.dumps(RESULT))
+    cache = ExtractionCache(max_bytes=2 * size, persist=False)
+    await cache.set(key("a"), "check_in", "gpt-4o-mini", RESULT)
+    await cache.set(key("b"), "check_in", "gpt-4o-mini", RESULT)
+    # Touching a makes b the least recently used
+    await cache.get(key("a"), "check_in")
+
+    await cache.set(key("c"), "check_in", "gpt-4o-mini", RESULT)
+
+    assert len(cache) == 2
+    assert await cache.get(key("b"), "check_in") is None
+    assert await cache.get(key("a"), "check_in") == RESULT
+    assert await cache.get(key("c"), "check_in") == RESULT
+
+
+async def test_results_larger_than_the_cache_are_not_kept_in_memory():
+    cache = ExtractionCache(max_bytes=10, persist=False)
+
+    await cache.set(key("a"), "check_in", "gpt-4o-mini", RESULT)
+
+    assert len(cache) == 0
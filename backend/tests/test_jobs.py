@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from database import AsyncSessionLocal
+from jobs import HANDLERS, JobKind, JobWorker, enqueue_job
+from models import Call, Job
+from webhook_jobs import process_webhook_event
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def slow_job(monkeypatch):
+    """Registers a "slow" job kind that runs for a second."""
+    async def run(job):
+        await asyncio.sleep(1)
+
+    monkeypatch.setitem(HANDLERS, "slow", JobKind(run))
+
+
+async def test_lease_is_renewed_while_a_job_runs(db, slow_job):
+    await enqueue_job(db, "slow", {})
+    await db.commit()
+    worker = JobWorker(visibility_timeout=0.3)
+    job = await worker._claim()
+
+    running = asyncio.create_task(worker._process(job))
+    # Well past the visibility timeout, but the lease keeps being renewed
+    await asyncio.sleep(0.6)
+    other = JobWorker(visibility_timeout=0.3)
+    other.worker_id = "other-host:1"
+    assert await other._claim() is None
+    await running
+
+    assert await db.scalar(select(func.count()).select_from(Job)) == 0
+
+
+async def test_abandoned_job_is_claimed_again(db, slow_job):
+    await enqueue_job(db, "slow", {})
+    await db.commit()
+    worker = JobWorker(visibility_timeout=0.2)
+    first = await worker._claim()
+
+    await asyncio.sleep(0.3)
+    reclaimed = await worker._claim()
+
+    assert reclaimed.id == first.id
+    assert reclaimed.attempts == 2
+
+
+async def test_webhook_fetches_the_call_before_locking_its_row(db, call, fake_retell, fake_openai):
+    fake_retell.web_calls[call.retell_call_id] = {}
+    fake_retell.latency_ms = 300
+
+    processing = asyncio.create_task(
+        process_webhook_event(db, "call_ended", {"call_id": call.retell_call_id}, str(call.id))
+    )
+    await asyncio.sleep(0.1)
+    # get_call is still in flight, and the row isn't locked meanwhile
+    async with AsyncSessionLocal() as other:
+        locked = await other.scalar(select(Call.id).where(Call.id == call.id).with_for_update(nowait=True))
+        await other.commit()
+    assert locked == call.id
+    assert not processing.done()
+    await processing
+
+    async with AsyncSessionLocal() as other:
+        stored = await other.get(Call, call.id)
+    assert stored.status == "completed"
+    assert stored.utterance_count > 0
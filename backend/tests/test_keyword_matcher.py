@@ -0,0 +1,54 @@
+import pytest
+
+from keyword_matcher import KeywordMatcher, get_matcher
+
+
+@pytest.mark.parametrize("text", [
+    "There's been an accident on I-40",
+    "Two accidents backed up traffic behind me",
+    "Another truck crashed into the barrier",
+    "My truck had a breakdown near exit 12",
+    "The truck broke down outside Flagstaff",
+    "I'm broken down on the shoulder",
+    "Had a blowout, front tire",
+    "The trailer is on fire",
+    "Somebody call 911",
+    "I need help",
+])
+def test_emergency_keywords_match_inflected_forms(text):
+    assert get_matcher().matches(text, "emergency")
+
+
+@pytest.mark.parametrize("text", [
+    "Everything is fine, driving through Albuquerque",
+    "I'll call dispatch later about the paperwork",
+])
+def test_routine_updates_are_not_emergencies(text):
+    assert not get_matcher().matches(text, "emergency")
+
+
+def test_status_keywords_stay_whole_word():
+    matcher = get_matcher()
+
+    assert matcher.find_categories("Running late, should arrive at noon") == {"delayed"}
+    assert "delayed" not in matcher.find_categories("I'll talk to you later")
+
+
+@pytest.mark.parametrize("text", [
+    "The new dispatcher was really helpful",
+    "Dispatch is helping me find parking",
+    "They fired the night shift at the yard",
+    "The firewall blocked the ELD app again",
+    "Picking up at Fireside Foods",
+    "No issues, rolling along",
+    "My back is hurting from the seat",
+])
+def test_words_that_only_start_with_a_keyword_are_not_emergencies(text):
+    assert not get_matcher().matches(text, "emergency")
+
+
+def test_overrides_replace_a_category():
+    matcher = get_matcher({"emergency": ["jackknife", "jackknifed"]})
+
+    assert matcher.matches("Trailer jackknifed on the ramp", "emergency")
+    assert not matcher.matches("There's been an accident", "emergency")
@@ -0,0 +1,34 @@
+import uuid
+
+import pytest
+
+from llm_websocket import LLMSession
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_load_call_by_our_call_id(call, fake_openai):
+    session = LLMSession(websocket=None, retell_call_id="call_other")
+
+    await session.load_call({"metadata": {"our_call_id": str(call.id)}})
+
+    assert session.our_call_id == str(call.id)
+    assert session.begin_message == "Hi Ana, this is dispatch."
+
+
+@pytest.mark.parametrize("our_call_id", [str(uuid.uuid4()), "not-a-uuid"])
+async def test_unknown_call_leaves_no_call_id(call, fake_openai, our_call_id):
+    session = LLMSession(websocket=None, retell_call_id="call_unknown")
+
+    await session.load_call({"metadata": {"our_call_id": our_call_id}})
+
+    assert session.our_call_id is None
+    assert session.begin_message == ""
+
+
+async def test_malformed_our_call_id_falls_back_to_the_retell_call_id(call, fake_openai):
+    session = LLMSession(websocket=None, retell_call_id=call.retell_call_id)
+
+    await session.load_call({"metadata": {"our_call_id": "not-a-uuid"}})
+
+    assert session.our_call_id == str(call.id)
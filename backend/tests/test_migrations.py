@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from benchmarks.explain_indexes import QUERIES, index_names
+from models import Base
+from transcripts import utterances_from_text
+
+pytestmark = pytest.mark.anyio
+
+HOT_PATH_INDEXES = {
+    "ix_calls_retell_call_id", "ix_calls_created_at_id", "ix_calls_status_created_at",
+    "ix_calls_agent_config_id", "ix_calls_driver_name", "ix_calls_load_number",
+}
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic(*args):
+    subprocess.run([sys.executable, "-m", "alembic", *args], cwd=BACKEND_DIR, check=True, capture_output=True)
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(Config(os.path.join(BACKEND_DIR, "alembic.ini"))).get_current_head()
+
+
+async def calls_indexes(db) -> dict:
+    conn = await db.connection()
+    indexes = await conn.run_sync(lambda sync: inspect(sync).get_indexes("calls"))
+    return {index["name"]: index for index in indexes}
+
+
+async def test_database_is_at_head(db):
+    assert (await db.execute(text("SELECT version_num FROM alembic_version"))).scalar_one() == head_revision()
+
+
+async def test_models_match_the_migrations(db):
+    conn = await db.connection()
+    diff = await conn.run_sync(lambda sync: compare_metadata(MigrationContext.configure(sync), Base.metadata))
+    assert diff == []
+
+
+async def test_hot_path_indexes_exist(db):
+    indexes = await calls_indexes(db)
+
+    assert HOT_PATH_INDEXES <= indexes.keys()
+    assert indexes["ix_calls_retell_call_id"]["unique"]
+    assert indexes["ix_calls_created_at_id"]["column_names"] == ["created_at", "id"]
+
+
+@pytest.mark.parametrize("label, query, expected", QUERIES, ids=[label for label, _, _ in QUERIES])
+async def test_hot_path_queries_use_their_index(db, label, query, expected):
+    # Sequential scans are off so the plan doesn't depend on the (empty) table's size
+    await db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {query}"))).scalar()
+
+    assert expected in index_names(plan[0]["Plan"])
+
+
+async def test_index_migration_round_trips(db):
+    await db.close()
+    try:
+        alembic("downgrade", "0002")
+        assert not HOT_PATH_INDEXES & (await calls_indexes(db)).keys()
+        await db.rollback()
+    finally:
+        alembic("upgrade", "head")
+
+    assert HOT_PATH_INDEXES <= (await calls_indexes(db)).keys()
+
+
+LEGACY_TRANSCRIPT = "\n".join([
+    "Agent: Hi Ana, this is dispatch. What's your status?",
+    "User: I'm on I-40 near exit 12.",
+    "Traffic is stopped: there's a wreck ahead.",
+    "",
+    "Agent: Thanks. Any ETA?",
+    "Dispatch note: driver sounded tired",
+    "User: Tomorrow, 8 AM",
+])
+
+
+async def test_transcript_backfill_matches_the_parser(db):
+    await db.close()
+    try:
+        alembic("downgrade", "0004")
+        await db.execute(text(
+            "INSERT INTO agent_configurations (id, name, system_prompt, initial_message, voice_settings) "
+            "VALUES ('00000000-0000-0000-0000-00000000000a', 'Check-in', 'prompt', 'hi', '{}')"
+        ))
+        await db.execute(
+            text(
+                "INSERT INTO calls (id, agent_config_id, driver_name, load_number, status, transcript, state) "
+                "VALUES ('00000000-0000-0000-0000-00000000000b', '00000000-0000-0000-0000-00000000000a', "
+                "'Ana', 'LD-1', 'completed', :transcript, '{}')"
+            ),
+            {"transcript": LEGACY_TRANSCRIPT},
+        )
+        await db.commit()
+
+        alembic("upgrade", "0005")
+        rows = (await db.execute(text(
+            "SELECT role, content FROM call_utterances WHERE call_id = '00000000-0000-0000-0000-00000000000b' ORDER BY seq"
+        ))).all()
+        assert [{"role": role, "content": content} for role, content in rows] == [
+            {"role": ut["role"], "content": ut["content"]} for ut in utterances_from_text(LEGACY_TRANSCRIPT)
+        ]
+        transcript_sql = "SELECT transcript FROM calls WHERE id = '00000000-0000-0000-0000-00000000000b'"
+        assert (await db.execute(text(transcript_sql))).scalar_one() == LEGACY_TRANSCRIPT
+        await db.rollback()
+
+        alembic("upgrade", "0009")
+        assert (await db.execute(text(transcript_sql))).scalar_one() is None
+        await db.rollback()
+    finally:
+        alembic("upgrade", "head")
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from call_writes import transition_call
+from read_cache import ReadCache
+
+pytestmark = pytest.mark.anyio
+
+CONFIGURATION = {
+    "name": "Driver check-in",
+    "system_prompt": "You are dispatch checking in with {driver_name} about load {load_number}.",
+    "initial_message": "Hi {driver_name}, this is dispatch.",
+    "voice_settings": {"voice_id": "11labs-Adrian"},
+}
+
+
+async def test_unchanged_configurations_are_not_modified(api, agent_config):
+    first = await api.get("/api/configurations")
+    etag = first.headers["etag"]
+
+    again = await api.get("/api/configurations", headers={"If-None-Match": etag})
+
+    assert etag.startswith('W/"')
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+
+async def test_strong_form_of_the_etag_also_matches(api, agent_config):
+    etag = (await api.get("/api/configurations")).headers["etag"]
+
+    assert (await api.get("/api/configurations", headers={"If-None-Match": etag[2:]})).status_code == 304
+    assert (await api.get("/api/configurations", headers={"If-None-Match": '"other", ' + etag})).status_code == 304
+
+
+async def test_writing_a_configuration_invalidates_its_etag(api, agent_config):
+    etag = (await api.get("/api/configurations")).headers["etag"]
+
+    await api.put(f"/api/configurations/{agent_config.id}", json={**CONFIGURATION, "name": "Renamed"})
+    response = await api.get("/api/configurations", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [config["name"] for config in response.json()] == ["Renamed"]
+
+
+async def test_call_transition_invalidates_call_details(db, api, call):
+    url = f"/api/calls/{call.id}"
+    etag = (await api.get(url)).headers["etag"]
+    assert (await api.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    await transition_call(db, call.id, status="completed")
+    response = await api.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+async def test_compressed_bodies_keep_the_weak_etag(api, agent_config):
+    await api.post("/api/configurations", json={**CONFIGURATION, "system_prompt": "x" * 2000})
+
+    response = await api.get("/api/configurations", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].startswith('W/"')
+
+
+async def test_load_racing_an_invalidation_is_not_cached():
+    cache = ReadCache()
+    loading = asyncio.Event()
+
+    async def load():
+        loading.set()
+        await asyncio.sleep(0.05)
+        return "before the write"
+
+    task = asyncio.create_task(cache.get_or_load(("call", "abc"), load))
+    await loading.wait()
+    cache.invalidate(("call", "abc"))
+
+    assert (await task).value == "before the write"
+    assert len(cache) == 0
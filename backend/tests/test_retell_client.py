@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from retell_client import RetellAPIError, RetellClient, retell_client, retry_after_seconds
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def client(fake_retell, monkeypatch):
+    monkeypatch.setattr(retell_client, "max_retries", 2)
+    monkeypatch.setattr(retell_client, "retry_base_delay", 0)
+    return retell_client
+
+
+async def test_get_call_retries_server_errors(client, fake_retell):
+    created = await client.create_web_call({"agent_id": "agent_1", "metadata": {}})
+    fake_retell.fail_next = [503, 502]
+
+    call = await client.get_call(created["call_id"])
+
+    assert call["call_id"] == created["call_id"]
+    assert fake_retell.requests.count(f"/v2/get-call/{created['call_id']}") == 3
+
+
+async def test_get_call_gives_up_after_max_retries(client, fake_retell):
+    fake_retell.fail_next = [503, 503, 503, 503]
+
+    with pytest.raises(RetellAPIError) as error:
+        await client.get_call("call_missing")
+
+    assert error.value.status_code == 503
+    assert len(fake_retell.requests) == 3
+    assert fake_retell.fail_next == [503]
+
+
+async def test_post_is_not_retried_on_server_error(client, fake_retell):
+    fake_retell.fail_next = [500]
+
+    with pytest.raises(RetellAPIError) as error:
+        await client.create_agent({"voice_id": "11labs-Adrian"})
+
+    assert error.value.endpoint == "create-agent"
+    assert fake_retell.requests == ["/create-agent"]
+
+
+async def test_post_is_retried_on_rate_limit(client, fake_retell):
+    fake_retell.fail_next = [429]
+
+    agent = await client.create_agent({"voice_id": "11labs-Adrian"})
+
+    assert agent["voice_id"] == "11labs-Adrian"
+    assert fake_retell.requests == ["/create-agent", "/create-agent"]
+
+
+async def test_post_is_retried_when_connect_fails(fake_retell):
+    attempts = []
+    inner = httpx.ASGITransport(app=fake_retell.app)
+
+    class RefuseFirstConnect(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            attempts.append(request.url.path)
+            if len(attempts) == 1:
+                raise httpx.ConnectError("connection refused", request=request)
+            return await inner.handle_async_request(request)
+
+    client = RetellClient(api_key="key_test", max_retries=2, retry_base_delay=0)
+    client._client = httpx.AsyncClient(transport=RefuseFirstConnect(), base_url="http://retell.test")
+
+    llm = await client.create_retell_llm({"general_prompt": "hi"})
+
+    assert llm["llm_id"].startswith("llm_")
+    assert attempts == ["/create-retell-llm", "/create-retell-llm"]
+    await client.close()
+
+
+async def test_one_pooled_client_until_closed():
+    client = RetellClient(api_key="key_test", base_url="http://retell.test", max_connections=7, max_keepalive_connections=3)
+
+    first = client.client
+    assert client.client is first
+    assert first.headers["Authorization"] == "Bearer key_test"
+
+    await client.close()
+    assert client._client is None
+    assert client.client is not first
+    await client.close()
+
+
+async def test_retry_after_is_honoured_up_to_the_cap(client, fake_retell, monkeypatch):
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr("retell_client.asyncio.sleep", sleep)
+    fake_retell.fail_next = [429]
+    fake_retell.retry_after = "2"
+
+    await client.create_agent({"voice_id": "11labs-Adrian"})
+
+    assert slept == [2.0]
+
+
+async def test_retry_after_beyond_the_cap_fails_without_waiting(client, fake_retell, monkeypatch):
+    monkeypatch.setattr(client, "max_backoff", 5.0)
+    fake_retell.fail_next = [429]
+    fake_retell.retry_after = "600"
+
+    with pytest.raises(RetellAPIError) as error:
+        await client.create_agent({"voice_id": "11labs-Adrian"})
+
+    assert error.value.status_code == 429
+    assert fake_retell.requests == ["/create-agent"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("3", 3.0),
+    (None, None),
+    ("soon", None),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+])
+def test_retry_after_forms(value, expected):
+    assert retry_after_seconds(value) == expected
+
+
+def test_retry_after_http_date_counts_from_now():
+    value = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+
+    assert retry_after_seconds(value) == pytest.approx(30, abs=2)
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from models import AgentConfiguration
+from retell_provisioning import RETELL_RESPONSE_ENGINE, ensure_retell_agent
+
+pytestmark = pytest.mark.anyio
+
+
+def trigger(config_id, driver="Ana"):
+    return {"agent_config_id": str(config_id), "driver_name": driver, "load_number": "LD-1"}
+
+
+async def test_cached_agent_is_reused_without_calling_retell(db, agent_config, fake_retell):
+    agent_config.retell_agent_id = "agent_cached"
+    agent_config.provisioned_hash = agent_config.content_hash(RETELL_RESPONSE_ENGINE)
+    await db.commit()
+
+    assert await ensure_retell_agent(agent_config, db) == "agent_cached"
+    assert fake_retell.requests == []
+
+
+async def test_agent_is_provisioned_once_and_then_reused(db, agent_config, fake_retell):
+    agent_id = await ensure_retell_agent(agent_config, db)
+
+    assert agent_id.startswith("agent_")
+    assert fake_retell.requests == ["/create-retell-llm", "/create-agent"]
+    stored = await db.get(AgentConfiguration, agent_config.id, populate_existing=True)
+    assert (stored.retell_agent_id, stored.provisioned_hash) == (agent_id, agent_config.content_hash(RETELL_RESPONSE_ENGINE))
+
+    assert await ensure_retell_agent(agent_config, db) == agent_id
+    assert len(fake_retell.requests) == 2
+
+
+async def test_changed_prompt_provisions_a_new_agent(api, agent_config, fake_retell):
+    first = await api.post("/api/calls/trigger", json=trigger(agent_config.id))
+    assert first.status_code == 200
+    config = (await api.get("/api/configurations")).json()[0]
+    old_agent = config["retell_agent_id"]
+
+    config["system_prompt"] = "You are dispatch. Ask {driver_name} for an ETA on load {load_number}."
+    updated = await api.put(f"/api/configurations/{agent_config.id}", json=config)
+    assert updated.json()["retell_agent_id"] is None
+    second = await api.post("/api/calls/trigger", json=trigger(agent_config.id))
+
+    assert second.status_code == 200
+    assert fake_retell.requests.count("/create-agent") == 2
+    new_agent = (await api.get("/api/configurations")).json()[0]["retell_agent_id"]
+    assert new_agent not in (None, old_agent)
+
+
+async def test_concurrent_calls_provision_one_agent(api, agent_config, fake_retell):
+    responses = await asyncio.gather(*(
+        api.post("/api/calls/trigger", json=trigger(agent_config.id, f"Driver {i}")) for i in range(5)
+    ))
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert fake_retell.requests.count("/create-retell-llm") == 1
+    assert fake_retell.requests.count("/create-agent") == 1
+    assert fake_retell.requests.count("/v2/create-web-call") == 5
+    agents = {body["agent_id"] for body in fake_retell.web_calls.values()}
+    assert len(agents) == 1
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from benchmarks.fake_services import FakeRedis
+from models import Call
+from state_store import STATE_REDIS_PREFIX, STATE_REDIS_TTL, StateStore
+
+pytestmark = pytest.mark.anyio
+
+
+async def stored_state(db, call_id):
+    return (await db.execute(select(Call.state).where(Call.id == call_id))).scalar_one()
+
+
+async def test_flush_writes_dirty_states(db, call):
+    store = StateStore()
+    store.put(call.id, {"stage": "eta"})
+
+    await store.flush()
+
+    assert store.dirty_count == 0
+    assert await stored_state(db, call.id) == {"stage": "eta"}
+
+
+async def test_malformed_call_id_is_dropped(db, call):
+    store = StateStore()
+    store.put("not-a-uuid", {"stage": "eta"})
+    store.put(call.id, {"stage": "location"})
+
+    await store.flush()
+
+    assert store.dirty_count == 0
+    assert await stored_state(db, call.id) == {"stage": "location"}
+
+
+async def test_unserialisable_state_is_dropped_and_the_rest_written(db, call, agent_config):
+    other = Call(agent_config_id=agent_config.id, driver_name="Ben", load_number="LD-2", state={})
+    db.add(other)
+    await db.commit()
+    store = StateStore()
+    store.put(call.id, {"stage": "eta", "seen_at": object()})
+    store.put(other.id, {"stage": "location"})
+
+    await store.flush()
+
+    assert store.dirty_count == 0
+    assert await stored_state(db, other.id) == {"stage": "location"}
+    assert await stored_state(db, call.id) == {}
+
+    # Nothing left behind to fail the next flush
+    store.put(call.id, {"stage": "done"})
+    await store.flush()
+    assert await stored_state(db, call.id) == {"stage": "done"}
+
+
+async def test_database_errors_keep_states_dirty(call, monkeypatch):
+    store = StateStore()
+    store.put(call.id, {"stage": "eta"})
+
+    async def unavailable(chunk):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(store, "_write", unavailable)
+    with pytest.raises(ConnectionError):
+        await store.flush()
+
+    assert store.dirty_count == 1
+
+
+class BrokenRedis:
+    async def get(self, key):
+        raise ConnectionError("redis unavailable")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis unavailable")
+
+
+async def test_flush_shares_states_through_redis(db, call):
+    redis = FakeRedis()
+    store = StateStore(redis=redis)
+    store.put(call.id, {"stage": "eta"})
+
+    await store.flush()
+
+    key = STATE_REDIS_PREFIX + str(call.id)
+    assert json.loads(redis.values[key]) == {"stage": "eta"}
+    assert redis.expiry[key] == STATE_REDIS_TTL
+    assert await stored_state(db, call.id) == {"stage": "eta"}
+
+
+async def test_another_process_reads_the_state_from_redis(call):
+    redis = FakeRedis()
+    await redis.set(STATE_REDIS_PREFIX + str(call.id), json.dumps({"stage": "location"}))
+    other_process = StateStore(redis=redis)
+
+    # Redis is newer than the caller's copy of the row
+    assert await other_process.get(call.id, default={"stage": "greeting"}) == {"stage": "location"}
+
+
+async def test_redis_miss_falls_back_to_postgres(db, call):
+    store = StateStore()
+    store.put(call.id, {"stage": "eta"})
+    await store.flush()
+
+    assert await StateStore(redis=FakeRedis()).get(call.id) == {"stage": "eta"}
+
+
+async def test_redis_failures_fall_back_to_postgres(db, call):
+    store = StateStore(redis=BrokenRedis())
+    store.put(call.id, {"stage": "eta"})
+
+    await store.flush()
+
+    assert store.dirty_count == 0
+    assert await stored_state(db, call.id) == {"stage": "eta"}
+    assert await StateStore(redis=BrokenRedis()).get(call.id) == {"stage": "eta"}
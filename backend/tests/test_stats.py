@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import stats
+from call_writes import transition_call
+from models import AgentConfiguration, Call
+from stats import StatsCache, compute_stats
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime.now(timezone.utc)
+EMERGENCY = {"call_outcome": "Emergency Detected", "emergency_type": "Accident"}
+
+
+@pytest.fixture
+async def calls(db, agent_config):
+    other = AgentConfiguration(
+        name="Emergency line", system_prompt="You take emergency reports.", initial_message="Dispatch here.", voice_settings={},
+    )
+    db.add(other)
+    await db.flush()
+    specs = [
+        (agent_config, "completed", NOW, None),
+        (agent_config, "completed", NOW, EMERGENCY),
+        (agent_config, "in_progress", NOW, None),
+        (agent_config, "failed", NOW - timedelta(days=1), None),
+        (other, "completed", NOW - timedelta(days=1), EMERGENCY),
+        # Counted in the totals, but older than the by_day window
+        (other, "completed", NOW - timedelta(days=stats.STATS_DAYS + 5), None),
+    ]
+    db.add_all([
+        Call(agent_config_id=config.id, driver_name="Ana", load_number="LD-1", status=status,
+             created_at=created_at, structured_data=structured_data, state={})
+        for config, status, created_at, structured_data in specs
+    ])
+    await db.commit()
+    return agent_config, other
+
+
+async def test_counts_are_aggregated(db, calls):
+    agent_config, other = calls
+
+    result = await compute_stats(db)
+
+    assert {key: result[key] for key in ("total_calls", "active_calls", "completed_calls", "failed_calls", "emergencies")} == {
+        "total_calls": 6, "active_calls": 1, "completed_calls": 4, "failed_calls": 1, "emergencies": 2,
+    }
+    by_config = {row["agent_config_id"]: row for row in result["by_configuration"]}
+    assert (by_config[agent_config.id]["total_calls"], by_config[agent_config.id]["emergencies"]) == (4, 1)
+    assert (by_config[other.id]["name"], by_config[other.id]["completed_calls"]) == ("Emergency line", 2)
+    assert [row["total_calls"] for row in result["by_day"]] == [2, 3]
+    assert sum(row["emergencies"] for row in result["by_day"]) == 2
+
+
+async def test_status_changes_refresh_the_cached_stats(db, api, call):
+    assert (await api.get("/api/stats")).json()["active_calls"] == 1
+
+    await transition_call(db, call.id, status="completed")
+
+    assert (await api.get("/api/stats")).json()["completed_calls"] == 1
+
+
+async def test_stats_computed_across_an_invalidation_are_not_cached(monkeypatch):
+    computing = asyncio.Event()
+    results = iter(({"total_calls": 1}, {"total_calls": 2}))
+
+    async def compute(db):
+        computing.set()
+        await asyncio.sleep(0.05)
+        return next(results)
+
+    monkeypatch.setattr(stats, "compute_stats", compute)
+    cache = StatsCache(ttl=60)
+    racing = asyncio.create_task(cache.get(None))
+    await computing.wait()
+    cache.invalidate()
+
+    assert (await racing)["total_calls"] == 1
+    assert (await cache.get(None))["total_calls"] == 2
@@ -0,0 +1,109 @@
+import pytest
+
+from keyword_matcher import get_matcher
+from transcript_chunks import (
+    NOT_SPECIFIED, estimate_tokens, merge_check_in, merge_emergency, relevant_windows, split_utterance, split_windows,
+)
+
+
+def transcript(turns: int, words: int = 10) -> str:
+    return "\n".join(
+        f"{'Agent' if i % 2 == 0 else 'User'}: turn {i} " + " ".join(["word"] * words) for i in range(turns)
+    )
+
+
+def test_short_transcript_is_one_window():
+    text = transcript(4)
+
+    assert split_windows(text, max_tokens=2000) == [text]
+
+
+@pytest.mark.parametrize("overlap", [0, 2])
+def test_windows_split_on_utterance_boundaries_within_the_limit(overlap):
+    text = transcript(40)
+    lines = text.split("\n")
+
+    windows = split_windows(text, max_tokens=60, overlap=overlap)
+
+    assert len(windows) > 1
+    for window in windows:
+        assert estimate_tokens(window) <= 60
+        assert all(line in lines for line in window.split("\n"))
+    # Every utterance appears, in order (each turn's text is unique)
+    assert list(dict.fromkeys(line for window in windows for line in window.split("\n"))) == lines
+
+
+def test_consecutive_windows_share_the_overlap():
+    windows = split_windows(transcript(40), max_tokens=60, overlap=2)
+
+    for previous, following in zip(windows, windows[1:]):
+        assert following.split("\n")[:2] == previous.split("\n")[-2:]
+
+
+def test_overlap_is_dropped_when_it_would_not_fit():
+    text = "\n".join(["Agent: " + "a " * 40, "User: " + "b " * 40, "Agent: " + "c " * 90])
+
+    windows = split_windows(text, max_tokens=50, overlap=2)
+
+    assert all(estimate_tokens(window) <= 50 for window in windows)
+    assert windows[-1].startswith("Agent: c")
+
+
+def test_oversized_utterance_is_split_and_keeps_its_role():
+    long_turn = "User: " + " ".join(f"word{i}" for i in range(400))
+
+    pieces = split_utterance(long_turn, max_tokens=50)
+
+    assert len(pieces) > 1
+    assert all(piece.startswith("User: ") and estimate_tokens(piece) <= 50 for piece in pieces)
+    assert " ".join(piece[len("User: "):] for piece in pieces) == long_turn[len("User: "):]
+    windows = split_windows("Agent: where are you?\n" + long_turn, max_tokens=50, overlap=1)
+    assert all(estimate_tokens(window) <= 50 for window in windows)
+
+
+def test_unbroken_text_is_cut_at_the_limit():
+    pieces = split_utterance("x" * 1000, max_tokens=50)
+
+    assert "".join(pieces) == "x" * 1000
+    assert all(estimate_tokens(piece) <= 50 for piece in pieces)
+
+
+def test_relevant_windows_skip_small_talk_but_keep_the_last():
+    windows = ["Agent: how's the family?", "User: I'm at exit 42 on the interstate", "Agent: nice weather", "User: bye"]
+
+    assert relevant_windows(windows, get_matcher()) == [1, 3]
+
+
+def test_latest_specific_check_in_values_win():
+    merged = merge_check_in([
+        {"call_outcome": "In-Transit Update", "driver_status": "Driving", "current_location": "I-10 exit 12", "eta": "6 PM"},
+        {"call_outcome": "Status Unknown", "driver_status": "Unknown", "current_location": "I-10 exit 42", "eta": NOT_SPECIFIED},
+        {"call_outcome": "In-Transit Update", "driver_status": "Delayed", "current_location": NOT_SPECIFIED},
+    ])
+
+    assert merged == {
+        "call_outcome": "In-Transit Update",
+        "driver_status": "Delayed",
+        "current_location": "I-10 exit 42",
+        "eta": "6 PM",
+    }
+
+
+def test_unknown_everywhere_falls_back_to_defaults():
+    assert merge_check_in([{}, {"eta": NOT_SPECIFIED}]) == {
+        "call_outcome": "Status Unknown",
+        "driver_status": "Unknown",
+        "current_location": NOT_SPECIFIED,
+        "eta": NOT_SPECIFIED,
+    }
+
+
+def test_emergency_merge_always_escalates():
+    merged = merge_emergency([{"emergency_type": "Breakdown", "emergency_location": "Mile 88"}, {"emergency_type": "Other"}])
+
+    assert merged == {
+        "call_outcome": "Emergency Detected",
+        "emergency_type": "Breakdown",
+        "emergency_location": "Mile 88",
+        "escalation_status": "Escalation Flagged",
+    }
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import func, select
+
+from models import Call, Job, WebhookEvent
+from webhook_jobs import run_webhook_job
+
+pytestmark = pytest.mark.anyio
+
+TRANSCRIPT = "Agent: Hi Ana, where are you right now?\nUser: On I-10 near exit 42, should deliver tomorrow morning."
+
+
+def webhook(call, event="call_ended", transcript=TRANSCRIPT):
+    return {"event": event, "call": {"call_id": call.retell_call_id, "call_status": "ended", "transcript": transcript}}
+
+
+async def count(db, model, *where):
+    return await db.scalar(select(func.count()).select_from(model).where(*where))
+
+
+async def run_webhook_jobs(db):
+    """Process the queued retell_webhook jobs, as the job worker would."""
+    for job in (await db.scalars(select(Job).where(Job.kind == "retell_webhook").order_by(Job.created_at))).all():
+        await run_webhook_job(job)
+        await db.delete(job)
+    await db.commit()
+
+
+async def test_redelivered_webhook_is_recorded_once(db, api, call):
+    first = await api.post("/retell-webhook", json=webhook(call))
+    again = await api.post("/retell-webhook", json=webhook(call))
+
+    assert first.json() == {"status": "queued"}
+    assert again.json() == {"status": "duplicate"}
+    assert await count(db, WebhookEvent) == 1
+    assert await count(db, Job, Job.kind == "retell_webhook") == 1
+
+
+async def test_redelivered_webhook_is_extracted_once(db, api, call, fake_openai):
+    for _ in range(2):
+        await api.post("/retell-webhook", json=webhook(call))
+    await run_webhook_jobs(db)
+
+    assert await count(db, Job, Job.kind == "extract") == 1
+    stored = await db.scalar(select(Call).where(Call.id == call.id).execution_options(populate_existing=True))
+    assert stored.status == "completed"
+    assert stored.structured_data_status == "pending"
+
+
+async def test_call_analyzed_with_the_same_transcript_is_not_extracted_again(db, api, call, fake_openai):
+    await api.post("/retell-webhook", json=webhook(call, "call_ended"))
+    await run_webhook_jobs(db)
+    # A different event is a new ledger entry, but its transcript_hash matches the stored one
+    assert (await api.post("/retell-webhook", json=webhook(call, "call_analyzed"))).json() == {"status": "queued"}
+    await run_webhook_jobs(db)
+
+    assert await count(db, WebhookEvent) == 2
+    assert await count(db, Job, Job.kind == "extract") == 1
+
+
+async def test_changed_transcript_is_extracted_again(db, api, call, fake_openai):
+    await api.post("/retell-webhook", json=webhook(call, "call_ended"))
+    await run_webhook_jobs(db)
+    await api.post("/retell-webhook", json=webhook(call, "call_analyzed", TRANSCRIPT + "\nAgent: Drive safe."))
+    await run_webhook_jobs(db)
+
+    assert await count(db, Job, Job.kind == "extract") == 2
@@ -0,0 +1,125 @@
+import os
+from typing import Dict, Any, List
+
+from keyword_matcher import KeywordMatcher
+
+EXTRACTION_WINDOW_TOKENS = int(os.getenv("EXTRACTION_WINDOW_TOKENS", "2000"))
+EXTRACTION_CHUNK_THRESHOLD_TOKENS = int(os.getenv("EXTRACTION_CHUNK_THRESHOLD_TOKENS", "4000"))
+EXTRACTION_WINDOW_OVERLAP = int(os.getenv("EXTRACTION_WINDOW_OVERLAP", "2"))
+
+NOT_SPECIFIED = "Not specified"
+
+# Cues for location/ETA talk; windows with none of these and no status/emergency keyword are skipped
+RELEVANCE_MATCHER = KeywordMatcher({
+    "location": [
+        "mile", "marker", "exit", "highway", "interstate", "freeway", "road", "route", "street",
+        "located", "location", "city", "town"
+    ],
+    "eta": [
+        "eta", "arrive", "arriving", "arrival", "minutes", "hours", "hour", "tomorrow", "tonight",
+        "a.m.", "p.m.", "o'clock", "morning", "afternoon"
+    ],
+    "delivery": ["delivered", "delivery", "unloaded", "unloading", "dock", "yard"],
+})
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text is close enough for budgeting windows
+    return len(text) // 4 + 1
+
+
+def split_utterance(utterance: str, max_tokens: int) -> List[str]:
+    """An utterance too long for one window, cut on whitespace into pieces that each fit.
+
+    Every piece keeps the "Role: " label, so the model still knows who said it.
+    """
+    if estimate_tokens(utterance) <= max_tokens:
+        return [utterance]
+    role, sep, content = utterance.partition(": ")
+    if not sep or " " in role:
+        role, content = "", utterance
+    prefix = f"{role}: " if role else ""
+    # estimate_tokens(text) <= max_tokens holds for up to 4 * max_tokens - 1 characters
+    budget = max(1, 4 * max_tokens - 1 - len(prefix))
+    pieces = []
+    while len(content) > budget:
+        cut = content.rfind(" ", 0, budget + 1)
+        if cut <= 0:
+            cut = budget
+        pieces.append(prefix + content[:cut].rstrip())
+        content = content[cut:].lstrip()
+    if content:
+        pieces.append(prefix + content)
+    return pieces
+
+
+def split_windows(transcript: str, max_tokens: int = EXTRACTION_WINDOW_TOKENS, overlap: int = EXTRACTION_WINDOW_OVERLAP) -> List[str]:
+    """Split a "Role: content" transcript on utterance boundaries into token-bounded windows.
+
+    Consecutive windows share the last `overlap` utterances so answers aren't cut from their questions,
+    as far as they fit. An utterance longer than a whole window is split across windows.
+    """
+    utterances = [line for line in transcript.split("\n") if line.strip()]
+    windows: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for utterance in utterances:
+        for piece in split_utterance(utterance, max_tokens):
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                windows.append("\n".join(current))
+                current = current[-overlap:] if overlap else []
+                current_tokens = sum(estimate_tokens(u) for u in current)
+                # Shared context never pushes the next window over the limit
+                while current and current_tokens + tokens > max_tokens:
+                    current_tokens -= estimate_tokens(current.pop(0))
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        windows.append("\n".join(current))
+    return windows
+
+
+def relevant_windows(windows: List[str], matcher: KeywordMatcher) -> List[int]:
+    """Indexes of windows worth sending to the LLM; the final window is always kept."""
+    keep = [
+        i for i, window in enumerate(windows)
+        if matcher.find_categories(window) or RELEVANCE_MATCHER.find_categories(window)
+    ]
+    if windows and (not keep or keep[-1] != len(windows) - 1):
+        keep.append(len(windows) - 1)
+    return keep
+
+
+def _latest(partials: List[Dict[str, Any]], field: str, unknown: tuple) -> Any:
+    for partial in reversed(partials):
+        value = partial.get(field)
+        if value and value not in unknown:
+            return value
+    return None
+
+
+def merge_check_in(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-window check-in results in transcript order: the latest specific value wins."""
+    return {
+        "call_outcome": _latest(partials, "call_outcome", ("Status Unknown",)) or "Status Unknown",
+        "driver_status": _latest(partials, "driver_status", ("Unknown",)) or "Unknown",
+        "current_location": _latest(partials, "current_location", (NOT_SPECIFIED,)) or NOT_SPECIFIED,
+        "eta": _latest(partials, "eta", (NOT_SPECIFIED,)) or NOT_SPECIFIED,
+    }
+
+
+def merge_emergency(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-window emergency results; the call escalates if any window saw an emergency."""
+    return {
+        "call_outcome": "Emergency Detected",
+        "emergency_type": _latest(partials, "emergency_type", ("Other",)) or "Other",
+        "emergency_location": _latest(partials, "emergency_location", (NOT_SPECIFIED,)) or NOT_SPECIFIED,
+        "escalation_status": "Escalation Flagged",
+    }
+
+
+MERGERS = {
+    "check_in": merge_check_in,
+    "emergency": merge_emergency,
+}
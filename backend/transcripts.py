@@ -0,0 +1,71 @@
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import CallUtterance
+
+NO_TRANSCRIPT = "No transcript available"
+
+
+def _ms(seconds: Optional[float]) -> Optional[int]:
+    return int(round(seconds * 1000)) if seconds is not None else None
+
+
+def utterances_from_retell(transcript_object: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Retell's transcript_object as utterance rows; word timings (seconds) become start_ms/end_ms."""
+    utterances = []
+    for ut in transcript_object or []:
+        words = ut.get("words") or []
+        utterances.append({
+            "role": (ut.get("role") or "agent").lower(),
+            "content": ut.get("content", ""),
+            "start_ms": _ms(words[0].get("start")) if words else None,
+            "end_ms": _ms(words[-1].get("end")) if words else None,
+        })
+    return utterances
+
+
+def utterances_from_text(transcript: str) -> List[Dict[str, Any]]:
+    """Parse a flattened "Role: content" transcript; lines without a role continue the previous utterance."""
+    utterances = []
+    for line in (transcript or "").split("\n"):
+        role, sep, content = line.partition(": ")
+        if sep and role and " " not in role:
+            utterances.append({"role": role.lower(), "content": content, "start_ms": None, "end_ms": None})
+        elif utterances and line.strip():
+            utterances[-1]["content"] += "\n" + line
+    return utterances
+
+
+def flatten(utterances: List[Dict[str, Any]]) -> str:
+    """The "Role: content" text used for extraction and downloads."""
+    return "\n".join(f"{ut['role'].capitalize()}: {ut['content']}" for ut in utterances)
+
+
+def transcript_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+async def replace_utterances(db: AsyncSession, call_id, utterances: List[Dict[str, Any]]):
+    """Swap the call's stored utterances in the current transaction (no commit)."""
+    await db.execute(delete(CallUtterance).where(CallUtterance.call_id == call_id))
+    if utterances:
+        await db.execute(
+            insert(CallUtterance),
+            [{"call_id": call_id, "seq": seq, **ut} for seq, ut in enumerate(utterances)]
+        )
+
+
+async def load_utterances(db: AsyncSession, call_id, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Utterances with seq >= offset in transcript order; the primary key serves the range scan."""
+    query = (
+        select(CallUtterance.seq, CallUtterance.role, CallUtterance.content, CallUtterance.start_ms, CallUtterance.end_ms)
+        .where(CallUtterance.call_id == call_id, CallUtterance.seq >= offset)
+        .order_by(CallUtterance.seq)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return [dict(row._mapping) for row in result]
@@ -0,0 +1,100 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from call_writes import transition_call
+from database import AsyncSessionLocal
+from events import commit_call_changes
+from extraction_worker import ExtractionJob, enqueue_extraction
+from jobs import job_handler
+from locks import call_locks
+from metrics import calls_in_flight, webhook_stage_seconds
+from models import Call, Job
+from retell_client import retell_client
+from state_store import state_store
+from transcripts import NO_TRANSCRIPT, flatten, replace_utterances, transcript_hash, utterances_from_retell, utterances_from_text
+
+logger = logging.getLogger(__name__)
+
+
+async def mark_call_failed(job: Job, error: str):
+    async with AsyncSessionLocal() as db:
+        await transition_call(db, job.payload["call_id"], status="failed", transcript=f"Failed to process call webhook: {error[:200]}")
+
+
+@job_handler("retell_webhook", on_dead=mark_call_failed)
+async def run_webhook_job(job: Job):
+    payload = job.payload
+    # The row lock serialises events for the same call across processes; this one within the process
+    async with call_locks(payload["retell_call_id"]):
+        with calls_in_flight.track_inprogress("webhook"):
+            async with AsyncSessionLocal() as db:
+                await process_webhook_event(db, payload["event"], payload["call"], payload["call_id"])
+
+
+async def process_webhook_event(db: AsyncSession, event: str, call_data: Dict[str, Any], call_id: str):
+    """Store the call's transcript and queue its extraction; Retell API errors propagate so the job is retried."""
+    retell_call_id = call_data.get("call_id")
+    transcript_obj = call_data.get("transcript_object")
+    transcript_text = call_data.get("transcript", None)
+    duration_ms = call_data.get("duration_ms", 0)
+    call_status = call_data.get("call_status", "ended")
+
+    # Fetched before the row is locked, so a slow Retell response doesn't hold the lock or a pooled connection
+    if not transcript_obj and not transcript_text and event == "call_ended":
+        with webhook_stage_seconds.time("get_call"):
+            call_info = await retell_client.get_call(retell_call_id)
+        transcript_obj = call_info.get("transcript_object", [])
+        duration_ms = call_info.get("duration_ms", 0)
+
+    with webhook_stage_seconds.time("lock"):
+        result = await db.execute(
+            select(Call)
+            .options(selectinload(Call.agent_config))
+            .where(Call.id == call_id)
+            .with_for_update(of=Call)
+        )
+        db_call = result.scalar_one_or_none()
+    if not db_call:
+        logger.warning("Call disappeared before its webhook was processed", extra={"call_id": call_id, "event": event})
+        return
+
+    utterances = utterances_from_retell(transcript_obj) if transcript_obj else utterances_from_text(transcript_text)
+    transcript = flatten(utterances) or NO_TRANSCRIPT
+    new_hash = transcript_hash(transcript)
+
+    # call_ended and call_analyzed usually carry the same transcript; store and extract it only once
+    transcript_changed = db_call.transcript_hash != new_hash
+    already_extracted = not transcript_changed and db_call.structured_data_status in ("pending", "done")
+
+    # A live conversation's latest state may not have been flushed to the row yet
+    state = await state_store.get(db_call.id, default=db_call.state)
+    db_call.status = "completed" if call_status == "ended" else call_status
+    if transcript_changed:
+        await replace_utterances(db, db_call.id, utterances)
+        db_call.utterance_count = len(utterances)
+        # The hot calls row only keeps a note when there is nothing to page through
+        db_call.transcript = None if utterances else NO_TRANSCRIPT
+        db_call.transcript_hash = new_hash
+    lane = None
+    if not already_extracted:
+        db_call.structured_data_status = "pending"
+        with webhook_stage_seconds.time("enqueue_extraction"):
+            lane = await enqueue_extraction(db, ExtractionJob(
+                call_id=str(db_call.id),
+                transcript=transcript,
+                state=state,
+                keyword_overrides=db_call.agent_config.keyword_overrides if db_call.agent_config else None
+            ))
+    db_call.duration_ms = duration_ms
+    db_call.updated_at = datetime.now()
+    with webhook_stage_seconds.time("store_transcript"):
+        await commit_call_changes(db, db_call)
+    logger.info(
+        "Call updated from webhook",
+        extra={"call_id": str(db_call.id), "status": db_call.status, "utterances": len(utterances), "extraction_lane": lane}
+    )
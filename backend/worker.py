@@ -0,0 +1,51 @@
+"""Standalone job worker: `python -m worker` from backend/.
+
+Consumes the same jobs table as the API process. Start as many as the load needs, on any host
+that can reach the database; set JOB_WORKER_IN_PROCESS=false on the API to leave all jobs to them.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+import settings  # noqa: F401 - loads .env
+from logging_config import configure_logging
+
+# Set up logging before the modules below log at import
+configure_logging()
+
+from jobs import JobWorker
+from services import services
+from state_store import state_store
+import webhook_jobs  # noqa: F401 - registers the retell_webhook and extract job handlers
+from extraction_batches import batch_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+async def main(concurrency: int = None):
+    worker = JobWorker(concurrency=concurrency)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await state_store.start()
+    await worker.start()
+    await batch_scheduler.start()
+    try:
+        await stopping.wait()
+    finally:
+        logger.info("Job worker stopping", extra={"worker_id": worker.worker_id})
+        # Jobs cut off here are claimed again once their visibility timeout expires
+        await batch_scheduler.stop()
+        await worker.stop()
+        await state_store.stop()
+        await services.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run durable job consumers")
+    parser.add_argument("--concurrency", type=int, help="Concurrent jobs in this process (default JOB_CONCURRENCY)")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
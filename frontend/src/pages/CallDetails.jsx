@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef, useCallback } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { 
   ArrowLeft, 
@@ -19,27 +19,100 @@ import {
   Activity
 } from 'lucide-react'
 import api from '../services/api'
+import { subscribeToCallEvents } from '../services/events'
 import toast from 'react-hot-toast'
 import { format } from 'date-fns'
 
+const TRANSCRIPT_PAGE_SIZE = 200
+
+const formatRole = (role) => role ? role.charAt(0).toUpperCase() + role.slice(1) : 'Unknown'
+
+const flattenUtterances = (utterances) =>
+  utterances.map((ut) => `${formatRole(ut.role)}: ${ut.content}`).join('\n')
+
 const CallDetails = () => {
   const { id } = useParams()
   const navigate = useNavigate()
   const [call, setCall] = useState(null)
   const [loading, setLoading] = useState(true)
   const [refreshing, setRefreshing] = useState(false)
+  // Transcript pages are fetched separately so long calls render as they scroll in
+  const [utterances, setUtterances] = useState([])
+  const [nextOffset, setNextOffset] = useState(null)
+  const [loadingTranscript, setLoadingTranscript] = useState(false)
+  const transcriptRef = useRef({ callId: null, count: 0, loading: false })
+  const transcriptContainerRef = useRef(null)
+  const sentinelRef = useRef(null)
 
   useEffect(() => {
     fetchCallDetails()
     
-    // Auto-refresh every 15 seconds to catch delayed webhook updates
-    const interval = setInterval(() => {
-      refreshCallDetails()
-    }, 15000)
+    // Live updates for this call; polls every 15 seconds only if the stream drops
+    return subscribeToCallEvents({
+      callId: id,
+      onEvent: () => refreshCallDetails(),
+      onPoll: () => refreshCallDetails()
+    })
+  }, [id])
 
-    return () => clearInterval(interval)
+  const loadTranscriptPage = useCallback(async (offset) => {
+    if (transcriptRef.current.loading) return
+    transcriptRef.current.loading = true
+    setLoadingTranscript(true)
+    try {
+      const response = await api.get(`/calls/${id}/transcript`, {
+        params: { offset, limit: TRANSCRIPT_PAGE_SIZE }
+      })
+      const { items, next_offset } = response.data
+      setUtterances((prev) => (offset === 0 ? items : [...prev, ...items]))
+      setNextOffset(next_offset)
+    } catch (error) {
+      console.error('Failed to fetch transcript:', error)
+    } finally {
+      transcriptRef.current.loading = false
+      setLoadingTranscript(false)
+    }
   }, [id])
 
+  // Start over from the first page whenever the call or its stored transcript changes
+  useEffect(() => {
+    if (!call) return
+    const count = call.utterance_count || 0
+    if (transcriptRef.current.callId === call.id && transcriptRef.current.count === count) return
+    transcriptRef.current.callId = call.id
+    transcriptRef.current.count = count
+    setUtterances([])
+    setNextOffset(null)
+    if (count > 0) loadTranscriptPage(0)
+  }, [call, loadTranscriptPage])
+
+  // Fetch the next page when the end of the transcript scrolls into view
+  useEffect(() => {
+    if (nextOffset === null || !sentinelRef.current) return
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) loadTranscriptPage(nextOffset)
+      },
+      { root: transcriptContainerRef.current, rootMargin: '200px' }
+    )
+    observer.observe(sentinelRef.current)
+    return () => observer.disconnect()
+  }, [nextOffset, loadTranscriptPage])
+
+  const fetchFullTranscript = async () => {
+    if (!call.utterance_count) return call.transcript || ''
+    let all = [...utterances]
+    let offset = nextOffset
+    while (offset !== null) {
+      const response = await api.get(`/calls/${id}/transcript`, {
+        params: { offset, limit: 1000 }
+      })
+      all = all.concat(response.data.items)
+      offset = response.data.next_offset
+    }
+    return flattenUtterances(all)
+  }
+
   const fetchCallDetails = async () => {
     try {
       const response = await api.get(`/calls/${id}`)
@@ -75,6 +148,8 @@ const CallDetails = () => {
         return { icon: AlertTriangle, color: 'text-red-500', bgColor: 'bg-red-100' }
       case 'pending':
         return { icon: Clock, color: 'text-yellow-500', bgColor: 'bg-yellow-100' }
+      case 'dispatching':
+        return { icon: Clock, color: 'text-indigo-500', bgColor: 'bg-indigo-100' }
       default:
         return { icon: Clock, color: 'text-gray-400', bgColor: 'bg-gray-100' }
     }
@@ -122,12 +197,28 @@ const CallDetails = () => {
     })
   }
 
-  const downloadTranscript = () => {
-    if (!call.transcript) {
+  const copyTranscript = async () => {
+    try {
+      copyToClipboard(await fetchFullTranscript(), 'Transcript')
+    } catch (error) {
+      toast.error('Failed to load transcript')
+    }
+  }
+
+  const downloadTranscript = async () => {
+    if (!hasTranscript) {
       toast.error('No transcript available')
       return
     }
 
+    let transcript
+    try {
+      transcript = await fetchFullTranscript()
+    } catch (error) {
+      toast.error('Failed to load transcript')
+      return
+    }
+
     const content = `Call Transcript
 Driver: ${call.driver_name || 'Unknown'}
 Load: ${call.load_number || 'N/A'}
@@ -136,7 +227,7 @@ Status: ${formatStatus(call.status)}
 Configuration: ${call.agent_config?.name || 'Unknown'}
 Outcome: ${getOutcomeDisplay(call)}
 
-${call.transcript}`
+${transcript}`
 
     const blob = new Blob([content], { type: 'text/plain' })
     const url = window.URL.createObjectURL(blob)
@@ -180,6 +271,7 @@ ${call.transcript}`
   const statusInfo = getStatusIcon(call.status)
   const StatusIcon = statusInfo.icon
   const isEmergency = call.structured_data?.call_outcome === 'Emergency Detected'
+  const hasTranscript = call.utterance_count > 0 || !!call.transcript
 
   return (
     <div className="p-6 max-w-6xl mx-auto">
@@ -224,7 +316,7 @@ ${call.transcript}`
               Refresh
             </button>
             
-            {call.transcript && (
+            {hasTranscript && (
               <button
                 onClick={downloadTranscript}
                 className="flex items-center px-3 py-2 border border-gray-300 rounded-md text-sm font-medium text-gray-700 bg-white hover:bg-gray-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 transition-colors"
@@ -255,6 +347,7 @@ ${call.transcript}`
                 call.status === 'completed' ? 'bg-green-100 text-green-800 border-green-200' :
                 call.status === 'in_progress' ? 'bg-blue-100 text-blue-800 border-blue-200' :
                 call.status === 'failed' ? 'bg-red-100 text-red-800 border-red-200' :
+                call.status === 'dispatching' ? 'bg-indigo-100 text-indigo-800 border-indigo-200' :
                 'bg-yellow-100 text-yellow-800 border-yellow-200'
               }`}>
                 {formatStatus(call.status)}
@@ -460,7 +553,7 @@ ${call.transcript}`
           )}
 
           {/* Call Transcript */}
-          {call.transcript ? (
+          {hasTranscript ? (
             <div className="bg-white rounded-lg shadow p-6">
               <div className="flex items-center justify-between mb-4">
                 <h2 className="text-lg font-semibold text-gray-900 flex items-center">
@@ -469,7 +562,7 @@ ${call.transcript}`
                 </h2>
                 <div className="flex space-x-2">
                   <button
-                    onClick={() => copyToClipboard(call.transcript, 'Transcript')}
+                    onClick={copyTranscript}
                     className="text-gray-400 hover:text-gray-600 transition-colors"
                   >
                     <Copy className="h-4 w-4" />
@@ -482,10 +575,36 @@ ${call.transcript}`
                   </button>
                 </div>
               </div>
-              <div className="bg-gray-50 rounded-lg p-4 max-h-96 overflow-y-auto">
-                <pre className="whitespace-pre-wrap text-sm text-gray-700 font-mono leading-relaxed">
-                  {call.transcript}
-                </pre>
+              <div ref={transcriptContainerRef} className="bg-gray-50 rounded-lg p-4 max-h-96 overflow-y-auto">
+                {call.utterance_count > 0 ? (
+                  <div className="space-y-2 text-sm text-gray-700 leading-relaxed">
+                    {utterances.map((ut) => (
+                      <div key={ut.seq} className="whitespace-pre-wrap">
+                        <span className={`font-semibold ${ut.role === 'agent' ? 'text-blue-700' : 'text-gray-900'}`}>
+                          {formatRole(ut.role)}:
+                        </span>{' '}
+                        {ut.content}
+                      </div>
+                    ))}
+                    {nextOffset !== null && (
+                      <div ref={sentinelRef} className="text-center py-2">
+                        <button
+                          onClick={() => loadTranscriptPage(nextOffset)}
+                          disabled={loadingTranscript}
+                          className="text-xs text-gray-500 hover:text-gray-700 disabled:opacity-50 transition-colors"
+                        >
+                          {loadingTranscript
+                            ? 'Loading...'
+                            : `Load more (${utterances.length} of ${call.utterance_count})`}
+                        </button>
+                      </div>
+                    )}
+                  </div>
+                ) : (
+                  <pre className="whitespace-pre-wrap text-sm text-gray-700 font-mono leading-relaxed">
+                    {call.transcript}
+                  </pre>
+                )}
               </div>
             </div>
           ) : (
@@ -1,50 +1,192 @@
-import React, { useState, useEffect, useMemo } from 'react'
+import React, { useState, useEffect, useMemo, useRef } from 'react'
 import { Search, Filter, Phone, ExternalLink, Download, RefreshCw, Calendar, AlertTriangle, CheckCircle, Clock, User } from 'lucide-react'
 import { Link } from 'react-router-dom'
 import api from '../services/api'
+import { coalesce, subscribeToCallEvents } from '../services/events'
 import toast from 'react-hot-toast'
-import { format, isToday, isYesterday, subDays } from 'date-fns'
+import { format, isToday, isYesterday, startOfDay, subDays } from 'date-fns'
+
+const PAGE_SIZE = 100
+const SEARCH_PAGE_SIZE = 50
+const SEARCH_DEBOUNCE_MS = 300
+// Live events update rows in place; stats and new rows are refetched at most this often
+const LIVE_REFETCH_MS = 1500
+
+// created_from / created_to for the date filter; the server compares them with created_at
+const dateRange = (dateFilter) => {
+  const now = new Date()
+  switch (dateFilter) {
+    case 'today':
+      return { created_from: startOfDay(now).toISOString() }
+    case 'yesterday':
+      return { created_from: startOfDay(subDays(now, 1)).toISOString(), created_to: startOfDay(now).toISOString() }
+    case 'week':
+      return { created_from: subDays(now, 7).toISOString() }
+    case 'month':
+      return { created_from: subDays(now, 30).toISOString() }
+    default:
+      return {}
+  }
+}
+
+// What the search box matches: transcript text through /calls/search, or a call list filter
+const SEARCH_FIELDS = {
+  transcript: { label: 'Transcripts', placeholder: 'Search transcripts, e.g. I-40 blowout...' },
+  driver_name: { label: 'Driver name', placeholder: 'Exact driver name, e.g. Mike Johnson' },
+  load_number: { label: 'Load number', placeholder: 'Exact load number, e.g. 7891-B' }
+}
+
+// One page of calls matching the filters: transcript search for a transcript query, the call list otherwise.
+// `cursor` is the list's next_cursor or the search's next_offset.
+const fetchCallPage = async ({ query, field, status, configId, date }, cursor = null) => {
+  const params = { ...dateRange(date) }
+  if (status !== 'all') params.status = status
+  if (configId !== 'all') params.agent_config_id = configId
+  if (query && field !== 'transcript') params[field] = query
+
+  if (query && field === 'transcript') {
+    const response = await api.get('/calls/search', {
+      params: { ...params, q: query, limit: SEARCH_PAGE_SIZE, offset: cursor || 0 }
+    })
+    return { items: response.data?.items || [], next: response.data?.next_offset ?? null }
+  }
+  const response = await api.get('/calls', { params: { ...params, limit: PAGE_SIZE, cursor: cursor || undefined } })
+  return { items: response.data?.items || [], next: response.data?.next_cursor || null }
+}
 
 const Calls = () => {
   const [calls, setCalls] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [serverStats, setServerStats] = useState(null)
   const [loading, setLoading] = useState(true)
   const [refreshing, setRefreshing] = useState(false)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [configurations, setConfigurations] = useState([])
   const [searchTerm, setSearchTerm] = useState('')
+  const [searchQuery, setSearchQuery] = useState('')
+  const [searchField, setSearchField] = useState('transcript')
   const [statusFilter, setStatusFilter] = useState('all')
-  const [scenarioFilter, setScenarioFilter] = useState('all')
+  const [configFilter, setConfigFilter] = useState('all')
   const [dateFilter, setDateFilter] = useState('all')
   const [sortBy, setSortBy] = useState('created_at')
   const [sortOrder, setSortOrder] = useState('desc')
+  const callsRef = useRef(calls)
+  callsRef.current = calls
+  const filters = { query: searchQuery, field: searchField, status: statusFilter, configId: configFilter, date: dateFilter }
+  // The event subscription outlives renders, so it reads the current filters through a ref
+  const filtersRef = useRef(filters)
+  filtersRef.current = filters
+  // Responses for filters that have since changed are dropped
+  const requestSeq = useRef(0)
+  const scheduleStats = useRef(coalesce(() => fetchStats(), LIVE_REFETCH_MS)).current
+  const scheduleCalls = useRef(coalesce(() => fetchCalls(), LIVE_REFETCH_MS)).current
 
   useEffect(() => {
-    fetchCalls()
-    
-    // Auto-refresh every 15 seconds to catch delayed webhook updates
-    const interval = setInterval(() => {
-      refreshCalls()
-    }, 15000)
+    fetchConfigurations()
 
-    return () => clearInterval(interval)
+    // Live updates from the backend; polls every 15 seconds only if the stream drops
+    const unsubscribe = subscribeToCallEvents({
+      onEvent: applyCallUpdate,
+      onPoll: () => refreshCalls()
+    })
+    return () => {
+      unsubscribe()
+      scheduleStats.cancel()
+      scheduleCalls.cancel()
+    }
   }, [])
 
+  useEffect(() => {
+    const timer = setTimeout(() => setSearchQuery(searchTerm.trim()), SEARCH_DEBOUNCE_MS)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
+
+  // Filters are applied by the server, so any change starts again from the first page
+  useEffect(() => {
+    fetchCalls()
+  }, [searchQuery, searchField, statusFilter, configFilter, dateFilter])
+
+  const applyCallUpdate = (update) => {
+    scheduleStats()
+    const current = callsRef.current.find(call => String(call.id) === update.id)
+    // New calls aren't in the list yet: reload the first page once the burst settles
+    if (!current) {
+      scheduleCalls()
+      return
+    }
+    setCalls(prev => prev.map(call =>
+      String(call.id) === update.id ? { ...call, ...update, id: call.id } : call
+    ))
+    // The event carries no structured_data, so a finished extraction fetches just that call
+    if (update.structured_data_status === 'done' && current.structured_data_status !== 'done') {
+      fetchCallResult(update.id)
+    }
+  }
+
+  const fetchCallResult = async (callId) => {
+    try {
+      const response = await api.get(`/calls/${callId}`)
+      const { structured_data, structured_data_status } = response.data
+      setCalls(prev => prev.map(call =>
+        String(call.id) === callId ? { ...call, structured_data, structured_data_status } : call
+      ))
+    } catch (error) {
+      console.error('Failed to fetch call result:', error)
+    }
+  }
+
+  const fetchStats = async () => {
+    try {
+      const statsRes = await api.get('/stats')
+      setServerStats(statsRes.data)
+    } catch (error) {
+      console.error('Failed to fetch call stats:', error)
+    }
+  }
+
+  const fetchConfigurations = async () => {
+    try {
+      const response = await api.get('/configurations')
+      setConfigurations(response.data || [])
+    } catch (error) {
+      console.error('Failed to fetch configurations:', error)
+    }
+  }
+
   const fetchCalls = async () => {
+    const seq = ++requestSeq.current
     try {
-      const response = await api.get('/calls')
-      setCalls(response.data || [])
+      const [page, statsRes] = await Promise.all([
+        fetchCallPage(filtersRef.current),
+        api.get('/stats')
+      ])
+      setServerStats(statsRes.data)
+      if (seq !== requestSeq.current) return
+      setCalls(page.items)
+      setNextCursor(page.next)
     } catch (error) {
       console.error('Failed to fetch calls:', error)
+      if (seq !== requestSeq.current) return
       toast.error('Failed to load calls')
       setCalls([])
+      setNextCursor(null)
     } finally {
       setLoading(false)
     }
   }
 
   const refreshCalls = async () => {
+    const seq = ++requestSeq.current
     setRefreshing(true)
     try {
-      const response = await api.get('/calls')
-      setCalls(response.data || [])
+      const [page, statsRes] = await Promise.all([
+        fetchCallPage(filtersRef.current),
+        api.get('/stats')
+      ])
+      setServerStats(statsRes.data)
+      if (seq !== requestSeq.current) return
+      setCalls(page.items)
+      setNextCursor(page.next)
       toast.success('Calls refreshed')
     } catch (error) {
       toast.error('Failed to refresh calls')
@@ -53,46 +195,36 @@ const Calls = () => {
     }
   }
 
-  // Filter and sort calls
+  const loadMoreCalls = async () => {
+    if (nextCursor === null) return
+    const seq = requestSeq.current
+    setLoadingMore(true)
+    try {
+      const page = await fetchCallPage(filtersRef.current, nextCursor)
+      if (seq !== requestSeq.current) return
+      setCalls(prev => [...prev, ...page.items])
+      setNextCursor(page.next)
+    } catch (error) {
+      toast.error('Failed to load more calls')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  // Search results carry only the configuration id
+  const configNames = useMemo(
+    () => Object.fromEntries(configurations.map(config => [String(config.id), config.name])),
+    [configurations]
+  )
+  const configName = (call) => call.agent_config?.name || configNames[String(call.agent_config_id)] || 'Unknown'
+
+  // Filtering happens on the server; the loaded pages are only re-sorted here. Search results keep their rank order.
   const filteredAndSortedCalls = useMemo(() => {
-    let filtered = calls.filter(call => {
-      const matchesSearch = 
-        (call.driver_name || '').toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (call.load_number || '').toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (call.agent_config?.name || '').toLowerCase().includes(searchTerm.toLowerCase())
-      
-      const matchesStatus = statusFilter === 'all' || call.status === statusFilter
-      
-      const matchesScenario = scenarioFilter === 'all' || 
-        (call.agent_config?.scenario_type || '') === scenarioFilter
-      
-      let matchesDate = true
-      if (dateFilter !== 'all') {
-        const callDate = new Date(call.created_at)
-        const now = new Date()
-        
-        switch (dateFilter) {
-          case 'today':
-            matchesDate = isToday(callDate)
-            break
-          case 'yesterday':
-            matchesDate = isYesterday(callDate)
-            break
-          case 'week':
-            matchesDate = callDate >= subDays(now, 7)
-            break
-          case 'month':
-            matchesDate = callDate >= subDays(now, 30)
-            break
-          default:
-            matchesDate = true
-        }
-      }
-      
-      return matchesSearch && matchesStatus && matchesScenario && matchesDate
-    })
+    const filtered = [...calls]
+    if (searchQuery && searchField === 'transcript' && sortBy === 'created_at' && sortOrder === 'desc') {
+      return filtered
+    }
 
-    // Sort calls
     filtered.sort((a, b) => {
       let aValue, bValue
       
@@ -122,29 +254,25 @@ const Calls = () => {
     })
 
     return filtered
-  }, [calls, searchTerm, statusFilter, scenarioFilter, dateFilter, sortBy, sortOrder])
-
-  // Statistics
-  const stats = useMemo(() => {
-    const total = calls.length
-    const completed = calls.filter(call => call.status === 'completed').length
-    const inProgress = calls.filter(call => call.status === 'in_progress').length
-    const failed = calls.filter(call => call.status === 'failed').length
-    // Adjust for scenario-specific outcomes (e.g., check_in doesn't use "Emergency Detected")
-    const emergencies = calls.filter(call => 
-      call.agent_config?.scenario_type === 'emergency' && 
-      call.structured_data?.emergency_detected === true
-    ).length
-    
-    return { total, completed, inProgress, failed, emergencies }
-  }, [calls])
+  }, [calls, searchQuery, searchField, sortBy, sortOrder])
+
+  // Statistics cover all calls, not just the loaded pages
+  const stats = {
+    total: serverStats?.total_calls || 0,
+    completed: serverStats?.completed_calls || 0,
+    inProgress: serverStats?.active_calls || 0,
+    failed: serverStats?.failed_calls || 0,
+    emergencies: serverStats?.emergencies || 0
+  }
 
   const getStatusBadge = (status) => {
     const badges = {
       completed: { class: 'bg-green-100 text-green-800 border-green-200', icon: CheckCircle },
       in_progress: { class: 'bg-blue-100 text-blue-800 border-blue-200', icon: Clock },
       failed: { class: 'bg-red-100 text-red-800 border-red-200', icon: AlertTriangle },
-      pending: { class: 'bg-yellow-100 text-yellow-800 border-yellow-200', icon: Clock }
+      pending: { class: 'bg-yellow-100 text-yellow-800 border-yellow-200', icon: Clock },
+      // Campaign calls being started
+      dispatching: { class: 'bg-indigo-100 text-indigo-800 border-indigo-200', icon: Clock }
     }
     return badges[status] || { class: 'bg-gray-100 text-gray-800 border-gray-200', icon: Clock }
   }
@@ -192,15 +320,14 @@ const Calls = () => {
 
   const exportCalls = () => {
     const csvContent = [
-      ['Date', 'Driver', 'Load', 'Status', 'Outcome', 'Configuration', 'Scenario', 'Duration'].join(','),
+      ['Date', 'Driver', 'Load', 'Status', 'Outcome', 'Configuration', 'Duration'].join(','),
       ...filteredAndSortedCalls.map(call => [
         format(new Date(call.created_at), 'yyyy-MM-dd HH:mm:ss'),
         call.driver_name || '',
         call.load_number || '',
         call.status || '',
         getOutcomeDisplay(call),
-        call.agent_config?.name || '',
-        call.agent_config?.scenario_type || '',
+        configName(call),
         call.duration_ms ? `${(call.duration_ms / 1000).toFixed(1)}s` : ''
       ].join(','))
     ].join('\n')
@@ -218,7 +345,7 @@ const Calls = () => {
   const clearFilters = () => {
     setSearchTerm('')
     setStatusFilter('all')
-    setScenarioFilter('all')
+    setConfigFilter('all')
     setDateFilter('all')
     setSortBy('created_at')
     setSortOrder('desc')
@@ -245,9 +372,9 @@ const Calls = () => {
             <h1 className="text-3xl font-bold text-gray-900">Call History</h1>
             <p className="text-gray-600 mt-2">
               Review all voice agent interactions and their outcomes
-              {filteredAndSortedCalls.length !== calls.length && (
+              {(searchQuery || statusFilter !== 'all' || configFilter !== 'all' || dateFilter !== 'all') && (
                 <span className="ml-2 text-sm">
-                  ({filteredAndSortedCalls.length} of {calls.length} calls shown)
+                  ({calls.length}{nextCursor !== null ? '+' : ''} matching calls loaded)
                 </span>
               )}
             </p>
@@ -324,12 +451,22 @@ const Calls = () => {
       {/* Filters */}
       <div className="bg-white rounded-lg shadow mb-6 p-6">
         <div className="flex flex-col lg:flex-row gap-4">
-          <div className="flex-1">
-            <div className="relative">
+          <div className="flex-1 flex gap-2">
+            <select
+              value={searchField}
+              onChange={(e) => setSearchField(e.target.value)}
+              aria-label="Search by"
+              className="px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+            >
+              {Object.entries(SEARCH_FIELDS).map(([value, { label }]) => (
+                <option key={value} value={value}>{label}</option>
+              ))}
+            </select>
+            <div className="relative flex-1">
               <Search className="absolute left-3 top-3 h-4 w-4 text-gray-400" />
               <input
                 type="text"
-                placeholder="Search by driver name, load number, or configuration..."
+                placeholder={SEARCH_FIELDS[searchField].placeholder}
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
                 className="w-full pl-10 pr-4 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
@@ -347,15 +484,17 @@ const Calls = () => {
               <option value="in_progress">In Progress</option>
               <option value="failed">Failed</option>
               <option value="pending">Pending</option>
+              <option value="dispatching">Dispatching</option>
             </select>
             <select
-              value={scenarioFilter}
-              onChange={(e) => setScenarioFilter(e.target.value)}
+              value={configFilter}
+              onChange={(e) => setConfigFilter(e.target.value)}
               className="px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
             >
-              <option value="all">All Scenarios</option>
-              <option value="check_in">Check-in</option>
-              <option value="emergency">Emergency</option>
+              <option value="all">All Configurations</option>
+              {configurations.map(config => (
+                <option key={config.id} value={config.id}>{config.name}</option>
+              ))}
             </select>
             <select
               value={dateFilter}
@@ -383,7 +522,7 @@ const Calls = () => {
               <option value="driver_name-desc">Driver Z-A</option>
               <option value="status-asc">Status A-Z</option>
             </select>
-            {(searchTerm || statusFilter !== 'all' || scenarioFilter !== 'all' || dateFilter !== 'all') && (
+            {(searchTerm || statusFilter !== 'all' || configFilter !== 'all' || dateFilter !== 'all') && (
               <button
                 onClick={clearFilters}
                 className="px-3 py-2 text-sm text-gray-600 hover:text-gray-800 transition-colors"
@@ -441,7 +580,7 @@ const Calls = () => {
                           </div>
                         </td>
                         <td className="px-6 py-4 whitespace-nowrap">
-                          <div className="text-sm text-gray-900">{call.agent_config?.name || 'Unknown'}</div>
+                          <div className="text-sm text-gray-900">{configName(call)}</div>
                      
                         </td>
                         <td className="px-6 py-4 whitespace-nowrap">
@@ -507,7 +646,7 @@ const Calls = () => {
                   <div className="space-y-2 mb-3">
                     <div className="flex justify-between text-sm">
                       <span className="text-gray-500">Configuration:</span>
-                      <span className="text-gray-900">{call.agent_config?.name || 'Unknown'}</span>
+                      <span className="text-gray-900">{configName(call)}</span>
                     </div>
                     <div className="flex justify-between text-sm">
                       <span className="text-gray-500">Scenario:</span>
@@ -544,6 +683,19 @@ const Calls = () => {
               )
             })}
           </div>
+
+          {nextCursor !== null && (
+            <div className="mt-6 flex justify-center">
+              <button
+                onClick={loadMoreCalls}
+                disabled={loadingMore}
+                className="flex items-center px-4 py-2 border border-gray-300 rounded-md text-sm font-medium text-gray-700 bg-white hover:bg-gray-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 disabled:opacity-50 transition-colors"
+              >
+                <RefreshCw className={`h-4 w-4 mr-2 ${loadingMore ? 'animate-spin' : ''}`} />
+                Load More
+              </button>
+            </div>
+          )}
         </>
       ) : (
         <div className="bg-white rounded-lg shadow">
@@ -551,12 +703,12 @@ const Calls = () => {
             <Phone className="mx-auto h-12 w-12 text-gray-400" />
             <h3 className="mt-2 text-sm font-medium text-gray-900">No calls found</h3>
             <p className="mt-1 text-sm text-gray-500">
-              {searchTerm || statusFilter !== 'all' || scenarioFilter !== 'all' || dateFilter !== 'all'
+              {searchTerm || statusFilter !== 'all' || configFilter !== 'all' || dateFilter !== 'all'
                 ? 'Try adjusting your filters to see more results'
                 : 'No calls have been made yet. Trigger your first test call!'
               }
             </p>
-            {(searchTerm || statusFilter !== 'all' || scenarioFilter !== 'all' || dateFilter !== 'all') && (
+            {(searchTerm || statusFilter !== 'all' || configFilter !== 'all' || dateFilter !== 'all') && (
               <button
                 onClick={clearFilters}
                 className="mt-4 inline-flex items-center px-4 py-2 border border-transparent rounded-md shadow-sm text-sm font-medium text-white bg-blue-600 hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 transition-colors"
@@ -1,10 +1,15 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { Plus, Phone, Settings, TrendingUp, Clock, CheckCircle, AlertTriangle } from 'lucide-react'
 import { Link } from 'react-router-dom'
 import api from '../services/api'
+import { coalesce, subscribeToCallEvents } from '../services/events'
 import toast from 'react-hot-toast'
 import TriggerCallModal from '../components/TriggerCallModal'
 
+const RECENT_CALLS = 5
+// Live events update rows in place; stats and new rows are refetched at most this often
+const LIVE_REFETCH_MS = 1500
+
 const Dashboard = () => {
   const [stats, setStats] = useState({
     totalCalls: 0,
@@ -16,39 +21,77 @@ const Dashboard = () => {
   const [configurations, setConfigurations] = useState([])
   const [showTriggerModal, setShowTriggerModal] = useState(false)
   const [loading, setLoading] = useState(true)
+  const recentCallsRef = useRef(recentCalls)
+  recentCallsRef.current = recentCalls
+  const scheduleStats = useRef(coalesce(() => fetchStats(), LIVE_REFETCH_MS)).current
+  const scheduleRecentCalls = useRef(coalesce(() => fetchRecentCalls(), LIVE_REFETCH_MS)).current
 
   useEffect(() => {
     fetchDashboardData()
     
-    // Auto-refresh every 15 seconds to catch delayed webhook updates
-    const interval = setInterval(() => {
-      fetchDashboardData()
-    }, 15000)
-
-    return () => clearInterval(interval)
+    // Live updates from the backend; polls every 15 seconds only if the stream drops
+    const unsubscribe = subscribeToCallEvents({
+      onEvent: applyCallUpdate,
+      onPoll: () => fetchDashboardData()
+    })
+    return () => {
+      unsubscribe()
+      scheduleStats.cancel()
+      scheduleRecentCalls.cancel()
+    }
   }, [])
 
+  const applyCallUpdate = (update) => {
+    scheduleStats()
+    const current = recentCallsRef.current.find(call => String(call.id) === update.id)
+    // A new call pushes the oldest off the list; a finished extraction brings structured_data the event lacks
+    if (!current || (update.structured_data_status === 'done' && current.structured_data_status !== 'done')) {
+      scheduleRecentCalls()
+    }
+    setRecentCalls(prev => prev.map(call =>
+      String(call.id) === update.id ? { ...call, ...update, id: call.id } : call
+    ))
+  }
+
+  // Counts are aggregated server-side
+  const applyStats = (data) => {
+    setStats({
+      totalCalls: data?.total_calls || 0,
+      activeCalls: data?.active_calls || 0,
+      completedCalls: data?.completed_calls || 0,
+      emergencies: data?.emergencies || 0
+    })
+  }
+
+  const fetchStats = async () => {
+    try {
+      const statsRes = await api.get('/stats')
+      applyStats(statsRes.data)
+    } catch (error) {
+      console.error('Failed to fetch call stats:', error)
+    }
+  }
+
+  const fetchRecentCalls = async () => {
+    try {
+      const callsRes = await api.get('/calls', { params: { limit: RECENT_CALLS } })
+      setRecentCalls(callsRes.data?.items || [])
+    } catch (error) {
+      console.error('Failed to fetch recent calls:', error)
+    }
+  }
+
   const fetchDashboardData = async () => {
     try {
-      const [callsRes, configsRes] = await Promise.all([
-        api.get('/calls'),
+      const [statsRes, callsRes, configsRes] = await Promise.all([
+        api.get('/stats'),
+        api.get('/calls', { params: { limit: RECENT_CALLS } }),
         api.get('/configurations') // Updated endpoint
       ])
       
-      const calls = callsRes.data || []
-      setRecentCalls(calls.slice(0, 5))
+      setRecentCalls(callsRes.data?.items || [])
       setConfigurations(configsRes.data || [])
-      
-      // Calculate stats
-      const totalCalls = calls.length
-      const activeCalls = calls.filter(call => call.status === 'in_progress').length
-      const completedCalls = calls.filter(call => call.status === 'completed').length
-      const emergencies = calls.filter(call => 
-        call.agent_config?.scenario_type === 'emergency' && 
-        call.structured_data?.emergency_detected === true
-      ).length
-      
-      setStats({ totalCalls, activeCalls, completedCalls, emergencies })
+      applyStats(statsRes.data)
     } catch (error) {
       console.error('Failed to fetch dashboard data:', error)
       toast.error('Failed to load dashboard data')
@@ -65,6 +108,10 @@ const Dashboard = () => {
         return <Clock className="h-5 w-5 text-blue-500" />
       case 'failed':
         return <AlertTriangle className="h-5 w-5 text-red-500" />
+      case 'pending':
+        return <Clock className="h-5 w-5 text-yellow-500" />
+      case 'dispatching':
+        return <Clock className="h-5 w-5 text-indigo-500" />
       default:
         return <Clock className="h-5 w-5 text-gray-400" />
     }
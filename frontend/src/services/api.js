@@ -1,8 +1,50 @@
 import axios from 'axios'
 
+// Last body and ETag per GET URL; revalidated with If-None-Match so an unchanged resource costs a 304
+const MAX_CONDITIONAL_ENTRIES = 200
+const conditionalCache = new Map()
+
 const api = axios.create({
   baseURL: '/api',
   timeout: 30000,
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+})
+
+const cacheKey = (config) => api.getUri(config)
+
+api.interceptors.request.use((config) => {
+  if ((config.method || 'get').toLowerCase() === 'get') {
+    const cached = conditionalCache.get(cacheKey(config))
+    if (cached) {
+      config.headers['If-None-Match'] = cached.etag
+    }
+  }
+  return config
+})
+
+api.interceptors.response.use((response) => {
+  const { config } = response
+  if ((config.method || 'get').toLowerCase() !== 'get') {
+    return response
+  }
+  const key = cacheKey(config)
+  if (response.status === 304) {
+    const cached = conditionalCache.get(key)
+    if (cached) {
+      return { ...response, status: 200, data: cached.data }
+    }
+    return response
+  }
+  const etag = response.headers.etag
+  if (etag) {
+    // Re-insert so the Map's order doubles as least-recently-used
+    conditionalCache.delete(key)
+    conditionalCache.set(key, { etag, data: response.data })
+    if (conditionalCache.size > MAX_CONDITIONAL_ENTRIES) {
+      conditionalCache.delete(conditionalCache.keys().next().value)
+    }
+  }
+  return response
 })
 
-export default api
\ No newline at end of file
+export default api
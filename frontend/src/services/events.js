@@ -0,0 +1,52 @@
+// Subscribe to server-sent call updates, polling only while the stream is unavailable.
+export const subscribeToCallEvents = ({ callId, onEvent, onPoll, pollInterval = 15000 }) => {
+  let pollTimer = null
+
+  const startPolling = () => {
+    if (!pollTimer && onPoll) {
+      pollTimer = setInterval(onPoll, pollInterval)
+    }
+  }
+
+  const stopPolling = () => {
+    if (pollTimer) {
+      clearInterval(pollTimer)
+      pollTimer = null
+    }
+  }
+
+  if (typeof EventSource === 'undefined') {
+    startPolling()
+    return stopPolling
+  }
+
+  // EventSource reconnects on its own and sends Last-Event-ID so missed updates are replayed
+  const url = callId ? `/api/events?call_id=${encodeURIComponent(callId)}` : '/api/events'
+  const source = new EventSource(url)
+  source.addEventListener('call_updated', (e) => onEvent(JSON.parse(e.data)))
+  source.onopen = stopPolling
+  source.onerror = startPolling
+
+  return () => {
+    source.close()
+    stopPolling()
+  }
+}
+
+// Run fn at most once per `wait` ms however many times this is called; bursts of events share one refetch
+export const coalesce = (fn, wait) => {
+  let timer = null
+  const scheduled = () => {
+    if (!timer) {
+      timer = setTimeout(() => {
+        timer = null
+        fn()
+      }, wait)
+    }
+  }
+  scheduled.cancel = () => {
+    clearTimeout(timer)
+    timer = null
+  }
+  return scheduled
+}